@@ -0,0 +1,52 @@
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns a long-lived event loop running on a daemon thread.
+    Sync callers (CLI, desktop UI) share it, so pooled HTTP
+    connections survive between calls.
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="jarvis-aio", daemon=True
+            ).start()
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Runs a coroutine on the background loop and blocks for its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, background_loop())
+    return future.result(timeout)
+
+
+def iterate_sync(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """Drives an async generator on the background loop, yielding its items to a sync caller."""
+    items: "queue.Queue" = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(("item", item))
+        except BaseException as e:
+            items.put(("error", e))
+        else:
+            items.put(("end", None))
+
+    asyncio.run_coroutine_threadsafe(pump(), background_loop())
+    while True:
+        kind, value = items.get()
+        if kind == "end":
+            return
+        if kind == "error":
+            raise value
+        yield value
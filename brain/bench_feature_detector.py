@@ -0,0 +1,100 @@
+"""
+Benchmark: FeatureDetector vs the previous five-scan summarizer.
+
+    python -m brain.bench_feature_detector [size_mb]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+from .feature_detector import FeatureDetector
+
+
+def legacy_summarize(path: str) -> list:
+    """The original ProjectContextLoader._summarize_file, kept for comparison."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+
+    summary = []
+    if "<html" in content.lower():
+        summary.append("HTML document")
+    if "three" in content.lower():
+        summary.append("Uses Three.js")
+    if "particle" in content.lower():
+        summary.append("Contains particle system")
+    if "shapes" in content:
+        summary.append("Defines shapes object for layouts")
+    if "settarget" in content.lower():
+        summary.append("Uses setTarget() for particle positioning")
+    return summary
+
+
+FEATURE_LINE = "<HTML> import * as THREE from 'three'; particle.setTarget(shapes);\n"
+
+
+def make_source(size: int, features: str = "end", seed: int = 0) -> str:
+    """Code-like filler; `features` puts every keyword at the "start", "end" or nowhere (None)."""
+    rng = random.Random(seed)
+    words = ["const", "let", "function", "return", "for", "if", "value", "items", "index", "render"]
+    lines = []
+    total = 0
+    while total < size:
+        line = " ".join(rng.choice(words) for _ in range(8)) + ";\n"
+        lines.append(line)
+        total += len(line)
+    if features == "start":
+        lines.insert(0, FEATURE_LINE)
+    elif features == "end":
+        lines.append(FEATURE_LINE)
+    return "".join(lines)
+
+
+def _time(fn, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(fn, path: str) -> int:
+    tracemalloc.start()
+    try:
+        fn(path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(size: int = 4 * 1024 * 1024, repeat: int = 3) -> dict:
+    detector = FeatureDetector()
+    results = {}
+    for features in ("start", "end", None):
+        fd, path = tempfile.mkstemp(suffix=".js")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(make_source(size, features))
+            assert legacy_summarize(path) == detector.detect_file(path)
+            results[f"features_{features or 'none'}"] = {
+                "legacy_s": _time(legacy_summarize, path, repeat),
+                "detector_s": _time(detector.detect_file, path, repeat),
+                "legacy_peak": _peak_memory(legacy_summarize, path),
+                "detector_peak": _peak_memory(detector.detect_file, path),
+            }
+        finally:
+            os.remove(path)
+    return results
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    for case, r in run(int(size_mb * 1024 * 1024)).items():
+        print(
+            f"{case:>14}: legacy {r['legacy_s'] * 1000:8.1f} ms {r['legacy_peak'] / 2**20:6.1f} MiB | "
+            f"detector {r['detector_s'] * 1000:8.1f} ms {r['detector_peak'] / 2**20:6.1f} MiB | "
+            f"x{r['legacy_s'] / r['detector_s']:.1f}"
+        )
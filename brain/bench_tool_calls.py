@@ -0,0 +1,114 @@
+"""
+Benchmark: ToolCallScanner vs the previous greedy-regex extraction.
+
+    python -m brain.bench_tool_calls [size_kb]
+"""
+import re
+import sys
+import json
+import time
+import random
+from typing import List, Optional
+
+from .tool_calls import ToolCallScanner, scan_tool_calls
+
+
+def legacy_extract(text: str) -> Optional[dict]:
+    """The original ModelRouter._extract_tool_call, kept for comparison."""
+    try:
+        if '"read_file"' not in text:
+            return None
+        match = re.search(r'\{.*"tool":\s*"read_file".*\}', text, re.DOTALL)
+        if match:
+            call = json.loads(match.group(0))
+            if call.get("path"):
+                return call
+    except Exception:
+        pass
+    return None
+
+
+CODE_LINES = [
+    "function update(p) { if (p.t) { p.x += (p.tx - p.x) * 0.1; } }\n",
+    "const shapes = { sphere: [], cube: { size: 2 }, \"label\": \"a {b}\" };\n",
+    "Use {braces} and \"quotes\" freely, e.g. obj = {\"a\": 1} or { unbalanced\n",
+    "The key \"tool\" is mentioned here in prose, and so is read_file.\n",
+    "for (let i = 0; i < n; i++) { particles[i].setTarget(shapes.cube); }\n",
+]
+
+
+def make_output(size: int, calls: List[dict], seed: int = 0) -> str:
+    """Model-like output: prose and code full of braces, with `calls` spread through it."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        line = rng.choice(CODE_LINES)
+        parts.append(line)
+        total += len(line)
+    for i, call in enumerate(calls):
+        parts.insert(rng.randrange(len(parts) + 1), f"\n{json.dumps(call)}\n" if i % 2 else json.dumps(call))
+    return "".join(parts)
+
+
+def chunked(text: str, rng: random.Random, max_len: int = 64) -> List[str]:
+    """`text` cut at random points, like streamed tokens."""
+    out = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, max_len)
+        out.append(text[pos:pos + step])
+        pos += step
+    return out
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(size: int = 64 * 1024, repeat: int = 3) -> dict:
+    """
+    - call: output ending in a tool call (legacy grabs the wrong span)
+    - mention: "read_file" named in prose, no call (legacy backtracks from every "{")
+    - stream: the scanner on 4x the size, fed as stream chunks (stays linear)
+    """
+    call = {"tool": "read_file", "path": "particles.js"}
+    with_call = make_output(size, []) + json.dumps(call)
+    mention = make_output(size, []) + 'Reply with the "read_file" tool if needed.'
+    chunks = chunked(make_output(size * 4, [call]), random.Random(1))
+
+    def stream():
+        scanner = ToolCallScanner()
+        for chunk in chunks:
+            scanner.feed(chunk)
+        return scanner.calls
+
+    assert scan_tool_calls(with_call) == [call] and stream() == [call]
+    assert scan_tool_calls(mention) == []
+    return {
+        "call": {
+            "legacy_s": _time(lambda: legacy_extract(with_call), repeat),
+            "legacy_found": legacy_extract(with_call) == call,
+            "scanner_s": _time(lambda: scan_tool_calls(with_call), repeat),
+        },
+        "mention": {
+            "legacy_s": _time(lambda: legacy_extract(mention), repeat),
+            "scanner_s": _time(lambda: scan_tool_calls(mention), repeat),
+        },
+        "stream_4x_s": _time(stream, repeat),
+    }
+
+
+if __name__ == "__main__":
+    size_kb = float(sys.argv[1]) if len(sys.argv) > 1 else 64
+    r = run(int(size_kb * 1024))
+    for case in ("call", "mention"):
+        c = r[case]
+        found = f" (found call: {c['legacy_found']})" if "legacy_found" in c else ""
+        print(f"{case:>8}: legacy {c['legacy_s'] * 1000:9.1f} ms{found} | scanner {c['scanner_s'] * 1000:7.1f} ms")
+    print(f"  stream: scanner on {4 * size_kb:g} KiB in chunks {r['stream_4x_s'] * 1000:7.1f} ms")
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Health state for one provider/model.
+    - CLOSED: calls flow; outcomes are kept for `window` seconds
+    - OPEN: failure rate over the window reached `failure_rate` (with at least
+      `min_calls` calls) -> calls are skipped for `cooldown` seconds
+    - HALF_OPEN: after the cooldown a single probe call is let through;
+      success closes the breaker, failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 3,
+        window: float = 60.0,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may be made now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+                logger.info(f"Circuit {self.name}: half-open, probing")
+
+            if self.state == HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                logger.info(f"Circuit {self.name}: closed")
+                self.state = CLOSED
+                self.probe_in_flight = False
+                self._outcomes.clear()
+            self._add(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._add(False)
+
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open()
+
+    def release(self):
+        """Call was abandoned (e.g. cancelled hedge); frees the probe slot."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _add(self, ok: bool):
+        now = self.clock()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self):
+        logger.warning(f"Circuit {self.name}: open for {self.cooldown:.0f}s")
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown - (self.clock() - self.opened_at))
+            return {
+                "state": self.state,
+                "calls": calls,
+                "failures": failures,
+                "retry_in": round(retry_in, 1),
+            }
+
+
+class BreakerRegistry:
+    """
+    One CircuitBreaker per key, created on first use.
+    Defaults come from env:
+      JARVIS_BREAKER_FAILURE_RATE (0.5), JARVIS_BREAKER_MIN_CALLS (3),
+      JARVIS_BREAKER_WINDOW (60s), JARVIS_BREAKER_COOLDOWN (30s)
+    """
+
+    def __init__(self, **overrides):
+        self.settings = {
+            "failure_rate": float(os.environ.get("JARVIS_BREAKER_FAILURE_RATE", 0.5)),
+            "min_calls": int(os.environ.get("JARVIS_BREAKER_MIN_CALLS", 3)),
+            "window": float(os.environ.get("JARVIS_BREAKER_WINDOW", 60)),
+            "cooldown": float(os.environ.get("JARVIS_BREAKER_COOLDOWN", 30)),
+        }
+        self.settings.update(overrides)
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                name = "/".join(key) if isinstance(key, tuple) else str(key)
+                breaker = self._breakers[key] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.snapshot() for b in breakers}
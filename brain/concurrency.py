@@ -0,0 +1,84 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when the request queue is full (maps to HTTP 503)."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of requests running at once.
+    - Up to `max_concurrent` run in parallel
+    - Up to `max_queue` more wait for a slot (FIFO)
+    - Anything beyond that, or waiting longer than `queue_timeout`,
+      is rejected immediately with OverloadedError (backpressure)
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent if max_concurrent is not None else int(os.environ.get("JARVIS_MAX_CONCURRENCY", 8))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("JARVIS_MAX_QUEUE", 32))
+        # 0 = never wait: reject at once unless a slot is free
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.environ.get("JARVIS_QUEUE_TIMEOUT", 30))
+
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self):
+        # Admitted = running + queued; counted synchronously so bursts
+        # arriving in the same loop tick are bounded too
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            logger.warning(f"Rejecting request: {self.active} active, {self.waiting} queued")
+            raise OverloadedError("Server busy, request queue is full.")
+
+        if self.queue_timeout <= 0:
+            # wait_for(timeout=0) would fail even with a free slot
+            if self._sem.locked():
+                raise OverloadedError("Server busy, no free slot.")
+            await self._sem.acquire()
+            self.active += 1
+            return
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise OverloadedError("Server busy, timed out waiting in queue.")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._sem.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
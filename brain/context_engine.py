@@ -1,5 +1,17 @@
+import io
 import os
-from typing import List, Set, Optional
+import logging
+import threading
+from itertools import islice
+from typing import Callable, Dict, List, Set, Optional
+
+from .project_index import ProjectIndex
+from .symbol_index import SymbolIndex
+from .fs_watcher import ProjectWatcher, FULL_RESCAN
+from .file_cache import FileCache
+from .token_budget import truncate
+
+logger = logging.getLogger(__name__)
 
 class ContextEngine:
     """
@@ -15,18 +27,40 @@ class ContextEngine:
         self.active_files: Set[str] = set()
         self.focus_file: Optional[str] = None
         self.project_summary: str = ""
+        # Changes whenever any indexed file is added, removed or modified
+        self.index_fingerprint: str = ""
 
         self.ignore_patterns = {
             ".git", "__pycache__", "venv", "node_modules",
             ".env", "dist", "build", ".idea", ".vscode",
             "package-lock.json"
         }
+        self.ignore_suffixes = ('.pyc', '.exe', '.dll', '.png', '.jpg', '.zip')
+
+        # Persistent, incrementally refreshed index (path -> size/mtime/hash)
+        self.index: Optional[ProjectIndex] = None
+        self._index_lock = threading.RLock()
+        # Where functions/classes/object keys are defined (name -> file + lines)
+        self.symbols: Optional[SymbolIndex] = None
+
+        # Decoded file contents, shared with MCPRead
+        self.file_cache = FileCache()
+        # Token budget for the active file in prompts
+        self.active_file_tokens = int(os.environ.get("JARVIS_ACTIVE_FILE_TOKENS", 3000))
+
+        # Optional live updates (see watch()); listeners get each change dict
+        self.watcher: Optional[ProjectWatcher] = None
+        self.change_listeners: List[Callable[[Dict[str, List[str]]], None]] = []
 
     def set_project(self, path: str) -> str:
         abs_path = os.path.abspath(path)
         if not os.path.isdir(abs_path):
             return f"Error: Invalid project path '{path}'."
 
+        if self.watcher and self.watcher.root != abs_path:
+            self.unwatch()
+        if self.project_root != abs_path:
+            self.file_cache.clear()
         self.project_root = abs_path
         self._build_index()
         self.active_files.clear()
@@ -35,19 +69,144 @@ class ContextEngine:
         return f"Project set to: {self.project_root}\nIndexed {len(self.file_index)} files."
 
     def _build_index(self):
-        self.file_index = []
-        for root, dirs, files in os.walk(self.project_root):
-            dirs[:] = [d for d in dirs if d not in self.ignore_patterns]
+        """Loads the persisted index for this root and refreshes only what changed."""
+        with self._index_lock:
+            if self.index is None or self.index.root != self.project_root:
+                self.index = ProjectIndex(
+                    self.project_root,
+                    ignore_names=self.ignore_patterns,
+                    ignore_suffixes=self.ignore_suffixes,
+                )
+                self.index.load()
+                self.symbols = SymbolIndex(self.project_root)
+                self.symbols.load()
+
+            changes = self.index.refresh()
+            self.index.save()
+            if self.symbols.refresh(self.file_hashes()):
+                self.symbols.save()
+
+            self.file_index = self.index.paths()
+            self.index_fingerprint = self.index.fingerprint
+        return changes
+
+    def refresh_index(self) -> dict:
+        """Re-syncs the index with disk; returns added/modified/removed paths."""
+        if not self.project_root:
+            return {"added": [], "modified": [], "removed": []}
+        return self._build_index()
+
+    # ---------------- symbols ---------------- #
+
+    def find_symbol(self, name: str, path: Optional[str] = None) -> List[tuple]:
+        """[(rel_path, {"name", "kind", "line", "end", "parent"?}), ...]"""
+        if self.symbols is None:
+            return []
+        return self.symbols.find(name, path)
+
+    def read_symbol(self, name: str, path: Optional[str] = None, max_lines: int = 200) -> Optional[str]:
+        """Source of the first definition of `name` (not the whole file)."""
+        hits = self.find_symbol(name, path)
+        if not hits:
+            return None
+        rel_path, sym = hits[0]
+        end = min(sym["end"], sym["line"] + max_lines - 1)
+        text = self._read_lines(rel_path, sym["line"], end)
+        if text is None:
+            return None
+        if end < sym["end"]:
+            text += f"\n...[{sym['end'] - end} more lines]"
+        return text
+
+    def symbol_definitions(self, text: str, limit: int = 3, max_lines: int = 200) -> List[tuple]:
+        """[(rel_path, symbol, source)] for symbols named in `text` (e.g. a user message)."""
+        if self.symbols is None:
+            return []
+        out = []
+        for rel_path, sym in self.symbols.mentioned(text, limit):
+            end = min(sym["end"], sym["line"] + max_lines - 1)
+            source = self._read_lines(rel_path, sym["line"], end)
+            if source:
+                out.append((rel_path, dict(sym, end=end), source))
+        return out
+
+    def _read_lines(self, rel_path: str, start: int, end: int) -> Optional[str]:
+        full_path = os.path.abspath(os.path.join(self.project_root, rel_path))
+        if not full_path.startswith(self.project_root):
+            return None
+        try:
+            text = self.file_cache.read(full_path)
+            if text is not None:
+                # Split on "\n" only, like file iteration (splitlines also breaks on \f, \x85, ...)
+                return "".join(islice(io.StringIO(text), start - 1, end))
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                return "".join(islice(f, start - 1, end))
+        except Exception:
+            return None
+
+    def file_hashes(self) -> Dict[str, str]:
+        """rel path -> content hash for every indexed file."""
+        with self._index_lock:
+            if self.index is None:
+                return {}
+            return {p: entry["hash"] for p, entry in self.index.files.items()}
 
-            for file in files:
-                if file in self.ignore_patterns:
-                    continue
-                if file.endswith(('.pyc', '.exe', '.dll', '.png', '.jpg', '.zip')):
-                    continue
+    # ---------------- live updates ---------------- #
 
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, self.project_root)
-                self.file_index.append(rel_path)
+    def watch(self, debounce: Optional[float] = None, backend: Optional[str] = None) -> bool:
+        """
+        Keeps the index live from filesystem events (inotify, else polling).
+        Bursts are debounced (JARVIS_WATCH_DEBOUNCE, default 0.5s) and only
+        the touched paths are re-stat'ed/re-hashed.
+        """
+        if not self.project_root:
+            return False
+        if self.watcher:
+            return True
+
+        self.watcher = ProjectWatcher(
+            self.project_root,
+            on_change=self._on_fs_events,
+            ignore_names=self.ignore_patterns,
+            ignore_suffixes=self.ignore_suffixes,
+            debounce=debounce if debounce is not None else float(os.environ.get("JARVIS_WATCH_DEBOUNCE", 0.5)),
+            poll_interval=float(os.environ.get("JARVIS_WATCH_POLL_INTERVAL", 2.0)),
+            backend=backend or os.environ.get("JARVIS_WATCH_BACKEND", "auto"),
+        )
+        self.watcher.start()
+        return True
+
+    def unwatch(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _on_fs_events(self, paths: Set[str]):
+        with self._index_lock:
+            if self.index is None:
+                return
+            if FULL_RESCAN in paths:
+                changes = self.index.refresh()
+            else:
+                changes = self.index.update_paths(paths)
+            for rel_path in changes["modified"] + changes["removed"]:
+                self.file_cache.invalidate(os.path.join(self.project_root, rel_path))
+            if not any(changes.values()):
+                return
+            self.index.save()
+            if self.symbols.update(changes, self.file_hashes()) or changes["removed"]:
+                self.symbols.save()
+            self.file_index = self.index.paths()
+            self.index_fingerprint = self.index.fingerprint
+
+        logger.info(
+            f"Index updated: +{len(changes['added'])} ~{len(changes['modified'])} -{len(changes['removed'])}"
+        )
+        for listener in list(self.change_listeners):
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error(f"Index change listener failed: {e}")
 
     # 🔒 Explicit file activation only
     def activate_file(self, rel_path: str) -> bool:
@@ -62,13 +221,14 @@ class ContextEngine:
         self.focus_file = rel_path
         return True
 
-    def read_active_context(self) -> str:
+    def read_active_context(self, max_tokens: Optional[int] = None) -> str:
         if not self.focus_file:
             return ""
 
         content = self._read_file_safe(self.focus_file)
         if not content:
             return ""
+        content = truncate(content, max_tokens if max_tokens is not None else self.active_file_tokens)
 
         return (
             "## ACTIVE FILE CONTEXT ##\n"
@@ -79,14 +239,17 @@ class ContextEngine:
         )
 
     def _read_file_safe(self, rel_path: str) -> Optional[str]:
+        """Whole file (callers budget it), or None if unreadable / outside the project."""
         full_path = os.path.abspath(os.path.join(self.project_root, rel_path))
         if not full_path.startswith(self.project_root):
             return None
 
         try:
-            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                data = f.read()
-                return data[:10000] + "\n...[TRUNCATED]" if len(data) > 10000 else data
+            data = self.file_cache.read(full_path)
+            if data is None:
+                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                    data = f.read()
+            return data
         except Exception:
             return None
 
@@ -1,26 +1,213 @@
+import os
 import re
+from typing import List, Optional
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
 
 class DiffValidationError(Exception):
     pass
 
+
+class HunkStats:
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.added = 0
+        self.removed = 0
+        self.context = 0
+
+    @property
+    def header(self) -> str:
+        return f"@@ -{self.old_start},{self.old_count} +{self.new_start},{self.new_count} @@"
+
+    @property
+    def old_remaining(self) -> int:
+        return self.old_count - self.removed - self.context
+
+    @property
+    def new_remaining(self) -> int:
+        return self.new_count - self.added - self.context
+
+
+class FileStats:
+    def __init__(self, old_path: str, new_path: str):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks: List[HunkStats] = []
+
+    @property
+    def added(self) -> int:
+        return sum(h.added for h in self.hunks)
+
+    @property
+    def removed(self) -> int:
+        return sum(h.removed for h in self.hunks)
+
+
+class DiffStats:
+    def __init__(self):
+        self.files: List[FileStats] = []
+        self.added = 0
+        self.removed = 0
+
+    @property
+    def hunks(self) -> int:
+        return sum(len(f.hunks) for f in self.files)
+
+
 class DiffValidator:
-    def validate(self, diff: str) -> None:
-        if not diff.strip().startswith("---"):
-            raise DiffValidationError("Not a unified diff")
+    """
+    Validates a unified diff in one pass, whole (`validate`) or while it
+    streams in (`feed` chunks, then `close`). Policy:
+    - removed lines may not exceed `max_removed_ratio` x added lines
+      (JARVIS_DIFF_MAX_REMOVED_RATIO, default 5)
+    - added + removed lines may not exceed `max_changed_lines`
+      (JARVIS_DIFF_MAX_LINES, default 300); checked as lines arrive, so a
+      runaway rewrite fails before the model finishes it
+    - with `strict_counts` (JARVIS_DIFF_STRICT_COUNTS, default on) every
+      hunk body must match the line counts of its @@ header
+    """
+
+    def __init__(self, max_removed_ratio: Optional[float] = None, max_changed_lines: Optional[int] = None,
+                 strict_counts: Optional[bool] = None):
+        if max_removed_ratio is None:
+            max_removed_ratio = float(os.environ.get("JARVIS_DIFF_MAX_REMOVED_RATIO", "5"))
+        if max_changed_lines is None:
+            max_changed_lines = int(os.environ.get("JARVIS_DIFF_MAX_LINES", "300"))
+        if strict_counts is None:
+            strict_counts = os.environ.get("JARVIS_DIFF_STRICT_COUNTS", "1") != "0"
+        self.max_removed_ratio = max_removed_ratio
+        self.max_changed_lines = max_changed_lines
+        self.strict_counts = strict_counts
+        self.reset()
+
+    def reset(self):
+        self.stats = DiffStats()
+        self._buffer = ""
+        self._started = False
+        self._pending_old: Optional[str] = None  # "---" line waiting for its "+++"
+        self._hunk: Optional[HunkStats] = None
 
-        if "+++" not in diff or "@@" not in diff:
-            raise DiffValidationError("Malformed diff")
+    def validate(self, diff: str) -> DiffStats:
+        self.reset()
+        self.feed(diff)
+        return self.close()
 
-        lines = diff.splitlines()
-        
-        # stricter counting avoiding headers
-        added = sum(1 for l in lines if l.startswith("+") and not l.startswith("+++"))
-        removed = sum(1 for l in lines if l.startswith("-") and not l.startswith("---"))
+    def feed(self, chunk: str):
+        """Checks every line completed by `chunk`; raises as soon as the diff is invalid."""
+        text = self._buffer + chunk
+        lines = text.split("\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            self._line(line.rstrip("\r"))
 
-        if added > 0 and removed > added * 5: # Allow some leeway but block massive deletions
+    def close(self) -> DiffStats:
+        """Checks the rest of the diff and the whole-diff policy; returns the stats."""
+        if self._buffer:
+            self._line(self._buffer.rstrip("\r"))
+            self._buffer = ""
+        if not self._started:
+            raise DiffValidationError("Not a unified diff")
+        self._end_hunk()
+        if self._pending_old is not None or not self.stats.files or not all(f.hunks for f in self.stats.files):
+            raise DiffValidationError("Malformed diff: missing '+++' header or @@ hunk")
+
+        stats = self.stats
+        # Allow some leeway but block massive deletions
+        if stats.added > 0 and stats.removed > stats.added * self.max_removed_ratio:
             raise DiffValidationError("Diff removes too much code")
+        return stats
+
+    # ---------------- line state machine ---------------- #
 
-        # hard block full rewrites (heuristic)
-        # If > 200 lines, it's risky.
-        if added + removed > 300: # Bumped slightly for safety
+    def _line(self, line: str):
+        if not self._started:
+            if not line.strip():
+                return
+            if not line.strip().startswith("---"):
+                raise DiffValidationError("Not a unified diff")
+            self._started = True
+            line = line.strip()
+
+        if self._pending_old is not None:
+            if not line.startswith("+++"):
+                raise DiffValidationError(f"Malformed diff: '---' not followed by '+++' ({line[:60]!r})")
+            self.stats.files.append(FileStats(self._pending_old, line[3:].strip()))
+            self._pending_old = None
+            return
+
+        hunk = self._hunk
+        if hunk is not None and (hunk.old_remaining > 0 or hunk.new_remaining > 0):
+            if self._hunk_line(hunk, line):
+                return
+        elif hunk is not None and line.startswith("\\"):
+            return  # "\ No newline at end of file"
+
+        if line.startswith("@@"):
+            self._start_hunk(line)
+        elif line.startswith("---"):
+            self._end_hunk()
+            self._pending_old = line[3:].strip()
+        elif line.startswith(("+", "-")):
+            if hunk is not None and not self.strict_counts:
+                self._hunk_line(hunk, line)
+            elif hunk is not None:
+                raise DiffValidationError(f"Hunk {hunk.header} has more lines than its header counts")
+            else:
+                raise DiffValidationError("Malformed diff: changed lines outside a @@ hunk")
+        else:
+            # Blank or prose line ("diff --git", "index ...") between sections
+            self._end_hunk()
+
+    def _hunk_line(self, hunk: HunkStats, line: str) -> bool:
+        """Counts one body line of `hunk`; False when `line` is not a body line."""
+        marker = line[:1]
+        # Without trusted counts, "--- "/"+++ " starts the next file instead
+        if not self.strict_counts and line.startswith(("--- ", "+++ ")):
+            return False
+        if marker == "+":
+            hunk.added += 1
+            self.stats.added += 1
+        elif marker == "-":
+            hunk.removed += 1
+            self.stats.removed += 1
+        elif marker in (" ", ""):
+            # Models drop the space of empty context lines
+            hunk.context += 1
+        elif marker == "\\":
+            return True
+        else:
+            return False
+        if self.strict_counts and (hunk.old_remaining < 0 or hunk.new_remaining < 0):
+            raise DiffValidationError(f"Hunk {hunk.header} has more lines than its header counts")
+        if self.stats.added + self.stats.removed > self.max_changed_lines:
             raise DiffValidationError("Diff too large — likely rewrite")
+        return True
+
+    def _start_hunk(self, line: str):
+        self._end_hunk()
+        if not self.stats.files:
+            raise DiffValidationError("Malformed diff: @@ hunk before '---' / '+++' headers")
+        m = _HUNK_HEADER.match(line)
+        if not m:
+            raise DiffValidationError(f"Malformed hunk header: {line[:60]!r}")
+        old_start, old_count, new_start, new_count = m.groups()
+        self._hunk = HunkStats(
+            int(old_start), 1 if old_count is None else int(old_count),
+            int(new_start), 1 if new_count is None else int(new_count),
+        )
+        self.stats.files[-1].hunks.append(self._hunk)
+
+    def _end_hunk(self):
+        hunk = self._hunk
+        self._hunk = None
+        if hunk is None or not self.strict_counts:
+            return
+        if hunk.old_remaining > 0 or hunk.new_remaining > 0:
+            raise DiffValidationError(
+                f"Hunk {hunk.header} line counts do not match its body "
+                f"(-{hunk.removed + hunk.context} +{hunk.added + hunk.context})"
+            )
@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Chunk overlap for regex rules, whose match length is unknown
+REGEX_OVERLAP = 256
+
+
+class Rule:
+    """
+    One summary feature: `label` is reported if any of `patterns` occurs.
+    Patterns are literals unless `regex=True`.
+    """
+
+    def __init__(self, label: str, patterns: Iterable[str], ignore_case: bool = True, regex: bool = False):
+        self.label = label
+        self.patterns = list(patterns)
+        self.ignore_case = ignore_case
+        self.regex = regex
+        if not self.patterns:
+            raise ValueError(f"Rule '{label}' has no patterns")
+
+    def source(self) -> str:
+        parts = self.patterns if self.regex else [re.escape(p) for p in self.patterns]
+        body = "|".join(parts)
+        return f"(?i:{body})" if self.ignore_case else f"(?:{body})"
+
+    def max_length(self) -> int:
+        return REGEX_OVERLAP if self.regex else max(len(p) for p in self.patterns)
+
+    def to_dict(self) -> Dict:
+        return {"label": self.label, "patterns": self.patterns, "ignore_case": self.ignore_case, "regex": self.regex}
+
+
+DEFAULT_RULES = [
+    Rule("HTML document", ["<html"]),
+    Rule("Uses Three.js", ["three"]),
+    Rule("Contains particle system", ["particle"]),
+    Rule("Defines shapes object for layouts", ["shapes"], ignore_case=False),
+    Rule("Uses setTarget() for particle positioning", ["settarget"]),
+]
+
+
+class FeatureDetector:
+    """
+    Finds every rule's features in one pass over a file.
+    Rules are compiled once into a matcher:
+    - literal patterns are grouped by case handling, so each chunk is
+      lowercased once for all case-insensitive rules (not once per rule)
+      and searched with C substring search
+    - regex rules are combined into a single alternation pattern
+    Files are read in chunks with an overlap of the longest pattern, so
+    matches spanning chunk borders are kept and big files never sit in
+    memory whole. A rule that matched is not searched for again, and
+    reading stops once every rule has matched.
+
+    (A combined regex over the literals too was measured ~10x slower than
+    this: `re` tries each alternative at every position.)
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None, chunk_size: int = CHUNK_SIZE):
+        self.rules: List[Rule] = []
+        self.chunk_size = chunk_size
+        self.fingerprint = ""
+        for rule in (rules if rules is not None else DEFAULT_RULES):
+            self.add_rule(rule)
+
+    @classmethod
+    def from_env(cls) -> "FeatureDetector":
+        """Default rules plus user rules from the JSON file in JARVIS_SUMMARY_RULES."""
+        rules = list(DEFAULT_RULES)
+        path = os.environ.get("JARVIS_SUMMARY_RULES")
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    rules += [Rule(**spec) for spec in json.load(f)]
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Ignoring summary rules from {path}: {e}")
+        return cls(rules)
+
+    def add_rule(self, rule: Rule):
+        self.rules.append(rule)
+        self._compile()
+
+    def _compile(self):
+        # (needle, rule index) per matching mode
+        self._folded: List[Tuple[str, int]] = []
+        self._exact: List[Tuple[str, int]] = []
+        regex_rules = []
+        for i, rule in enumerate(self.rules):
+            if rule.regex:
+                regex_rules.append((i, rule.source()))
+            elif rule.ignore_case:
+                self._folded += [(p.lower(), i) for p in rule.patterns]
+            else:
+                self._exact += [(p, i) for p in rule.patterns]
+
+        self._regex_rules = frozenset(i for i, _ in regex_rules)
+        self._regex = _compile_regex(tuple(regex_rules)) if regex_rules else None
+        self._all = frozenset(range(len(self.rules)))
+
+        # Summaries cached under the old rule set must not be reused
+        self.fingerprint = hashlib.sha1(
+            json.dumps([r.to_dict() for r in self.rules]).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def _overlap(self, remaining: FrozenSet[int]) -> int:
+        return max(self.rules[i].max_length() for i in remaining) - 1
+
+    # ---------------- detection ---------------- #
+
+    def detect_text(self, text: str) -> List[str]:
+        return self._labels(self._scan([text]))
+
+    def detect_file(self, path: str) -> List[str]:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return self._labels(self._scan(iter(lambda: f.read(self.chunk_size), "")))
+
+    def _scan(self, chunks: Iterable[str]) -> FrozenSet[int]:
+        found = set()
+        tail = ""
+
+        for chunk in chunks:
+            window = tail + chunk
+
+            folded = None
+            for needle, i in self._folded:
+                if i not in found:
+                    if folded is None:
+                        folded = window.lower()
+                    if needle in folded:
+                        found.add(i)
+            for needle, i in self._exact:
+                if i not in found and needle in window:
+                    found.add(i)
+            if self._regex is not None and not self._regex_rules <= found:
+                for match in self._regex.finditer(window):
+                    found.add(int(match.lastgroup[1:]))
+                    if self._regex_rules <= found:
+                        break
+
+            remaining = self._all - found
+            if not remaining:
+                break
+            overlap = self._overlap(remaining)
+            tail = window[-overlap:] if overlap > 0 else ""
+
+        return frozenset(found)
+
+    def _labels(self, found: FrozenSet[int]) -> List[str]:
+        return [self.rules[i].label for i in sorted(found)]
+
+
+@lru_cache(maxsize=64)
+def _compile_regex(sources: Tuple[Tuple[int, str], ...]) -> re.Pattern:
+    return re.compile("|".join(f"(?P<r{i}>{src})" for i, src in sources))
@@ -0,0 +1,95 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileCache:
+    """
+    LRU cache of decoded (utf-8) file contents, shared by the file readers.
+    - budgeted by total file bytes (`max_bytes`); least recently read files
+      are evicted first
+    - an entry is valid while the file's mtime and size are unchanged, so a
+      stale read costs one stat; the watcher may also `invalidate` paths
+    - files above `max_file_bytes` are not cached (`read` returns None and
+      the caller reads the part it needs itself)
+
+    Env: JARVIS_FILE_CACHE_MB (32), JARVIS_FILE_CACHE_MAX_FILE_MB (2)
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_file_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or int(float(os.environ.get("JARVIS_FILE_CACHE_MB", 32)) * 1024 * 1024)
+        self.max_file_bytes = max_file_bytes or int(
+            float(os.environ.get("JARVIS_FILE_CACHE_MAX_FILE_MB", 2)) * 1024 * 1024
+        )
+        self.max_file_bytes = min(self.max_file_bytes, self.max_bytes)
+
+        # abs path -> ((mtime_ns, size), text)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def read(self, path: str) -> Optional[str]:
+        """
+        Whole decoded file, or None if it is too big to cache.
+        Raises OSError like open() when the file cannot be read.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if st.st_size > self.max_file_bytes:
+            self.invalidate(path)
+            return None
+
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+
+        with self._lock:
+            self._drop(path)
+            self._entries[path] = (stamp, text)
+            self.size += stamp[1]
+            while self.size > self.max_bytes and self._entries:
+                _, ((_, evicted), _) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+        return text
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._drop(os.path.abspath(path))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _drop(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.size -= entry[0][1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+            }
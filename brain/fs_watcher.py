@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marker path: events were lost, caller should do a full refresh
+FULL_RESCAN = "*"
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyUnavailable(Exception):
+    pass
+
+
+class _Filter:
+    def __init__(self, root: str, ignore_names: Iterable[str], ignore_suffixes: Iterable[str]):
+        self.root = os.path.abspath(root)
+        self.ignore_names = set(ignore_names)
+        self.ignore_suffixes = tuple(ignore_suffixes)
+
+    def ignored(self, rel_path: str) -> bool:
+        parts = rel_path.split(os.sep)
+        return any(p in self.ignore_names for p in parts) or rel_path.endswith(self.ignore_suffixes)
+
+    def walk_dirs(self, rel_dir: str = ""):
+        """Yields rel paths of every non-ignored directory under rel_dir (inclusive)."""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            yield current
+            try:
+                with os.scandir(os.path.join(self.root, current)) as it:
+                    for entry in it:
+                        if entry.name not in self.ignore_names and entry.is_dir(follow_symlinks=False):
+                            stack.append(os.path.join(current, entry.name))
+            except OSError:
+                continue
+
+
+class InotifyBackend(_Filter):
+    """Linux inotify through libc (no extra dependency); one watch per directory."""
+
+    def __init__(self, root, ignore_names=(), ignore_suffixes=()):
+        super().__init__(root, ignore_names, ignore_suffixes)
+        if not sys.platform.startswith("linux"):
+            raise InotifyUnavailable("inotify is Linux only")
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise InotifyUnavailable(os.strerror(ctypes.get_errno()))
+
+        self.watches: Dict[int, str] = {}
+        for rel_dir in self.walk_dirs():
+            self._add_watch(rel_dir)
+
+    def _add_watch(self, rel_dir: str):
+        path = os.path.join(self.root, rel_dir).encode()
+        wd = self.libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                self.close()
+                raise InotifyUnavailable("inotify watch limit reached")
+            return  # directory vanished meanwhile
+        self.watches[wd] = rel_dir
+
+    def poll(self, timeout: float) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: Set[str] = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT.size: offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                changed.add(FULL_RESCAN)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None:
+                continue
+            name = raw_name.rstrip(b"\0").decode("utf-8", "surrogateescape")
+            rel_path = os.path.join(rel_dir, name) if name else rel_dir
+            if not rel_path or self.ignored(rel_path):
+                continue
+
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New subtree: watch it and report its contents
+                for sub in self.walk_dirs(rel_path):
+                    self._add_watch(sub)
+            changed.add(rel_path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingBackend(_Filter):
+    """Portable fallback: periodic stat walk diffed against the previous one."""
+
+    def __init__(self, root, ignore_names=(), ignore_suffixes=(), interval: float = 2.0):
+        super().__init__(root, ignore_names, ignore_suffixes)
+        self.interval = interval
+        self.snapshot = self._scan()
+        self.next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for rel_dir in self.walk_dirs():
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                    for entry in it:
+                        if entry.name in self.ignore_names or entry.name.endswith(self.ignore_suffixes):
+                            continue
+                        if entry.is_file(follow_symlinks=False):
+                            st = entry.stat()
+                            state[os.path.join(rel_dir, entry.name)] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+        return state
+
+    def poll(self, timeout: float) -> Set[str]:
+        wait = self.next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            return set()
+
+        self.next_scan = time.monotonic() + self.interval
+        current = self._scan()
+        previous, self.snapshot = self.snapshot, current
+        changed = {p for p in current.keys() | previous.keys() if current.get(p) != previous.get(p)}
+        return changed
+
+    def close(self):
+        pass
+
+
+class ProjectWatcher:
+    """
+    Background thread turning filesystem events into debounced batches.
+    `on_change(paths)` gets the set of changed rel paths (files or dirs,
+    possibly FULL_RESCAN) once no new event arrived for `debounce` seconds.
+
+    backend: "auto" (inotify, else polling), "inotify" or "poll".
+    """
+
+    def __init__(
+        self,
+        root: str,
+        on_change: Callable[[Set[str]], None],
+        ignore_names: Iterable[str] = (),
+        ignore_suffixes: Iterable[str] = (),
+        debounce: float = 0.5,
+        poll_interval: float = 2.0,
+        backend: str = "auto",
+    ):
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.ignore_names = set(ignore_names)
+        self.ignore_suffixes = tuple(ignore_suffixes)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend_name = backend
+
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.backend = self._make_backend()
+        self._thread = threading.Thread(target=self._run, name="jarvis-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self.backend:
+            self.backend.close()
+
+    def _make_backend(self):
+        args = (self.root, self.ignore_names, self.ignore_suffixes)
+        if self.backend_name in ("auto", "inotify"):
+            try:
+                backend = InotifyBackend(*args)
+                logger.info(f"Watching {self.root} with inotify ({len(backend.watches)} dirs)")
+                return backend
+            except (InotifyUnavailable, OSError, AttributeError) as e:
+                if self.backend_name == "inotify":
+                    raise
+                logger.info(f"inotify unavailable ({e}), polling every {self.poll_interval}s")
+        return PollingBackend(*args, interval=self.poll_interval)
+
+    def _run(self):
+        pending: Set[str] = set()
+        last_event = 0.0
+        while not self._stop.is_set():
+            try:
+                changed = self.backend.poll(timeout=min(self.debounce, 0.5))
+            except OSError as e:
+                logger.error(f"Watcher error: {e}")
+                changed = {FULL_RESCAN}
+
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_event = now
+
+            if pending and now - last_event >= self.debounce:
+                batch, pending = pending, set()
+                try:
+                    self.on_change(batch)
+                except Exception as e:
+                    logger.error(f"Watcher callback failed: {e}")
@@ -0,0 +1,134 @@
+import os
+import asyncio
+import logging
+import weakref
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Default endpoints + timeouts for every provider the router talks to.
+DEFAULT_PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "groq": {"base_url": "https://api.groq.com/openai/v1", "timeout": 30.0},
+    "deepseek": {"base_url": "https://api.deepseek.com", "timeout": 60.0},
+    "openrouter": {"base_url": "https://openrouter.ai/api/v1", "timeout": 45.0},
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    try:
+        return int(value) if value else default
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return default
+
+
+class ProviderClientPool:
+    """
+    Shared async HTTP layer for all LLM providers.
+    - One keep-alive connection pool per provider (no handshake per call)
+    - HTTP/2 when the `h2` package is installed
+    - Clients are bound to the event loop that created them, so the same
+      pool can be used from uvicorn's loop and from background loops.
+
+    Limits come from env vars (per-provider override first):
+      GROQ_MAX_CONNECTIONS / JARVIS_HTTP_MAX_CONNECTIONS (default 20)
+      GROQ_MAX_KEEPALIVE   / JARVIS_HTTP_MAX_KEEPALIVE   (default 10)
+      JARVIS_HTTP2=0 disables HTTP/2
+    """
+
+    def __init__(
+        self,
+        providers: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.providers: Dict[str, Dict[str, Any]] = {}
+        for name, cfg in (providers or DEFAULT_PROVIDERS).items():
+            self.register(name, **cfg)
+
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        if http2 is None:
+            http2 = os.environ.get("JARVIS_HTTP2", "1") != "0"
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        # loop -> {provider: AsyncClient}
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def register(self, name: str, base_url: str, timeout: float = 30.0):
+        self.providers[name] = {"base_url": base_url.rstrip("/"), "timeout": timeout}
+
+    def _limits(self, name: str) -> httpx.Limits:
+        prefix = name.upper()
+        max_conn = self.max_connections or _env_int(
+            f"{prefix}_MAX_CONNECTIONS", _env_int("JARVIS_HTTP_MAX_CONNECTIONS", 20)
+        )
+        max_keepalive = self.max_keepalive or _env_int(
+            f"{prefix}_MAX_KEEPALIVE", _env_int("JARVIS_HTTP_MAX_KEEPALIVE", 10)
+        )
+        return httpx.Limits(
+            max_connections=max_conn,
+            max_keepalive_connections=min(max_keepalive, max_conn),
+            keepalive_expiry=60.0,
+        )
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """Returns the pooled client for a provider on the running loop."""
+        if name not in self.providers:
+            raise KeyError(f"Unknown provider: {name}")
+
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        client = clients.get(name)
+        if client is None or client.is_closed:
+            cfg = self.providers[name]
+            client = httpx.AsyncClient(
+                base_url=cfg["base_url"],
+                timeout=cfg["timeout"],
+                limits=self._limits(name),
+                http2=self.http2,
+            )
+            clients[name] = client
+        return client
+
+    async def post_json(
+        self,
+        name: str,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        kwargs: Dict[str, Any] = {"json": payload, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return await self.client(name).post(path, **kwargs)
+
+    def stream_post(
+        self,
+        name: str,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """Async context manager yielding a streaming response (body not preloaded)."""
+        return self.client(name).stream("POST", path, json=payload, headers=headers)
+
+    async def aclose(self):
+        """Closes the clients owned by the running loop."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
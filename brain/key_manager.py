@@ -1,25 +1,136 @@
 import os
+import re
 import time
+import asyncio
 import logging
-from typing import List, Dict
+import contextlib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Optional, Mapping
+
+from .key_store import SharedKeyStore, SharedTokenBucket, key_id
 
 logger = logging.getLogger(__name__)
 
+
+class KeyExhaustedError(RuntimeError):
+    """No key of a provider can take a request soon enough."""
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens/second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header: delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Rate limit reset durations like '7.66s', '2m59.56s', '120ms' or plain seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+
 class KeyManager:
     """
     Manages API keys for a specific provider.
-    Rotates keys on 429 (Rate Limit), 403 (Permission), or Network Failure (0).
+    - Thread/async safe: in-memory state changes happen under one lock;
+      shared-store I/O runs outside it, and off the event loop in `acquire`
+      and the async variants the router uses (`arelease`, ...)
+    - Optional per-key budgets from env: {PREFIX}_RPM (requests/min) and
+      {PREFIX}_TPM (tokens/min), enforced with token buckets so requests
+      wait or move to another key *before* the provider returns 429
+    - Concurrent requests are spread by least load (in-flight count)
+    - Failures cool a key down for the provider's Retry-After when given,
+      otherwise 429 -> 60s, 403 -> 5m, network/5xx (0) -> 10s
+    - Only rate limits (429/403, exhausted headers, budgets) block a key;
+      a network/5xx cooldown just makes it the last choice, since
+      provider health is the circuit breaker's job
+    - With a SharedKeyStore (JARVIS_SHARED_KEY_STATE) cooldowns and budgets
+      are shared by all worker processes on the machine
     """
 
-    def __init__(self, provider_prefix: str):
+    def __init__(self, provider_prefix: str, store: Optional[SharedKeyStore] = None):
         self.provider_prefix = provider_prefix.upper()
         self.keys = self._load_keys()
         if not self.keys:
             raise RuntimeError(f"No keys found for {self.provider_prefix} (checked {self.provider_prefix}_KEY_*)")
-        
+
         self.current_index = 0
         # Timestamp until which a key is blacklisted
         self.blacklist_until: Dict[str, float] = {}
+        # Network/5xx cooldowns: avoided while any other key is free, never blocking
+        self.soft_until: Dict[str, float] = {}
+        self.in_flight: Dict[str, int] = {k: 0 for k in self.keys}
+
+        self.store = store if store is not None else SharedKeyStore.from_env()
+
+        rpm = float(os.environ.get(f"{self.provider_prefix}_RPM", 0) or 0)
+        tpm = float(os.environ.get(f"{self.provider_prefix}_TPM", 0) or 0)
+        self.rpm_buckets = {k: self._bucket(k, "rpm", rpm) for k in self.keys} if rpm > 0 else {}
+        self.tpm_buckets = {k: self._bucket(k, "tpm", tpm) for k in self.keys} if tpm > 0 else {}
+
+        # Longest we wait for a budget to free up before giving up on this provider
+        self.max_wait = float(os.environ.get("JARVIS_KEY_MAX_WAIT", 2.0))
+
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str, kind: str, per_minute: float):
+        if self.store:
+            return SharedTokenBucket(self.store, self.provider_prefix, key, kind, per_minute, per_minute / 60.0)
+        return TokenBucket(per_minute, per_minute / 60.0)
 
     def _load_keys(self) -> List[str]:
         """
@@ -31,35 +142,71 @@ class KeyManager:
         for k, v in os.environ.items():
             if k.startswith(prefix) and v.strip():
                 candidates.append((k, v.strip()))
-        
+
         # Sort by variable name (e.g. KEY_1 before KEY_2)
         candidates.sort(key=lambda x: x[0])
         return [c[1] for c in candidates]
 
-    def get_key(self) -> str:
-        """Returns the current valid key, skipping blacklisted ones."""
-        attempts = 0
-        while attempts < len(self.keys):
-            key = self.keys[self.current_index]
-            if self._is_blacklisted(key):
-                self._rotate()
-                attempts += 1
-                continue
-            return key
-        
-        # If all are blacklisted, just return the current one to try anyway
-        return self.keys[self.current_index]
+    async def acquire(self, tokens: int = 0) -> str:
+        """
+        Reserves the least-loaded key whose budgets allow the request
+        (`tokens` = estimated prompt + completion tokens).
+        Waits up to `max_wait` for a budget to refill; raises
+        KeyExhaustedError if no key frees up in time.
+        Every acquire must be paired with `release`.
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            key, wait = await self._offload(self._try_acquire, tokens)
+            if key is not None:
+                return key
+
+            if time.monotonic() + wait > deadline:
+                raise KeyExhaustedError(
+                    f"All {self.provider_prefix} keys are rate limited or over budget (next free in {wait:.1f}s)"
+                )
+            await asyncio.sleep(min(wait, 0.5))
+
+    def release(self, key: str, estimated_tokens: int = 0, used_tokens: Optional[int] = None):
+        """Ends a reservation; reconciles the token budget with actual usage."""
+        with self._lock:
+            self.in_flight[key] = max(0, self.in_flight.get(key, 0) - 1)
+        bucket = self.tpm_buckets.get(key)
+        if bucket is not None and used_tokens is not None:
+            diff = used_tokens - estimated_tokens
+            # A shared bucket is one store transaction; only local ones need the lock
+            with contextlib.nullcontext() if self.store else self._lock:
+                if diff > 0:
+                    bucket.consume(diff)
+                else:
+                    bucket.refund(-diff)
+
+    async def arelease(self, key: str, estimated_tokens: int = 0, used_tokens: Optional[int] = None):
+        await self._offload(self.release, key, estimated_tokens, used_tokens)
 
-    def report_failure(self, key: str, status: int = 0):
+    async def areport_failure(self, key: str, status: int = 0, retry_after: Optional[float] = None):
+        await self._offload(self.report_failure, key, status, retry_after)
+
+    async def aobserve_headers(self, key: str, headers: Mapping[str, str]):
+        await self._offload(self.observe_headers, key, headers)
+
+    async def _offload(self, fn, *args):
+        """Runs `fn` in a worker thread when it touches the shared store."""
+        if self.store:
+            # SQLite may wait on other workers' write locks: keep it off the event loop
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def report_failure(self, key: str, status: int = 0, retry_after: Optional[float] = None):
         """
         Reports a failure.
-        status=429 -> Rate limit (blacklist 60s)
+        status=429 -> Rate limit (blacklist Retry-After or 60s)
         status=403 -> Forbidden (blacklist 5m)
         status=0   -> Network/Unknown (rotate, short backoff)
         """
         should_rotate = False
         cooldown = 0
-        
+
         if status == 429:
             should_rotate = True
             cooldown = 60
@@ -69,17 +216,150 @@ class KeyManager:
         elif status == 0 or status >= 500:
             # Network error or server error
             should_rotate = True
-            cooldown = 10 
-        
+            cooldown = 10
+
+        if retry_after is not None and should_rotate:
+            cooldown = retry_after
+
         if should_rotate:
-            logger.warning(f"Key failure for {self.provider_prefix} (status={status}). Rotating.")
-            if cooldown > 0:
-                self.blacklist_until[key] = time.time() + cooldown
-            self._rotate()
+            logger.warning(f"Key failure for {self.provider_prefix} (status={status}). Cooling down {cooldown:.0f}s.")
+            self.cool_down(key, cooldown, hard=status in (429, 403))
 
-    def _rotate(self):
-        self.current_index = (self.current_index + 1) % len(self.keys)
+    def observe_headers(self, key: str, headers: Mapping[str, str]):
+        """
+        Reads x-ratelimit-* response headers (Groq/OpenRouter style).
+        A key with no requests or tokens left is parked until the reset,
+        so the next request goes elsewhere instead of hitting a 429.
+        """
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                continue
+            if exhausted:
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}")) or 1.0
+                logger.info(f"{self.provider_prefix} key out of {kind}, parked {reset:.1f}s")
+                self.cool_down(key, reset)
+
+    def cool_down(self, key: str, seconds: float, hard: bool = True):
+        """
+        hard: the key is unusable until then (shared with other workers).
+        Otherwise it is only passed over while another key is free.
+        """
+        with self._lock:
+            until = time.time() + seconds
+            if hard:
+                self.blacklist_until[key] = max(until, self.blacklist_until.get(key, 0))
+            else:
+                self.soft_until[key] = max(until, self.soft_until.get(key, 0))
+            if self.keys[self.current_index] == key:
+                self._rotate()
+        if hard and self.store:
+            self.store.set_cooldown(self.provider_prefix, key_id(key), until)
 
-    def _is_blacklisted(self, key: str) -> bool:
+    def _cooldown_until(self, key: str) -> float:
         until = self.blacklist_until.get(key, 0)
-        return time.time() < until
\ No newline at end of file
+        if self.store:
+            # Cooldowns learned by other workers
+            until = max(until, self.store.cooldown_until(self.provider_prefix, key_id(key)))
+        return until
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            in_flight = dict(self.in_flight)
+        now = time.time()
+        out = []
+        for i, key in enumerate(self.keys):
+            entry = {
+                "key": f"{self.provider_prefix}_KEY#{i + 1}",
+                "in_flight": in_flight[key],
+                "cooldown": round(max(0.0, self._cooldown_until(key) - now, self.soft_until.get(key, 0) - now), 1),
+            }
+            if key in self.rpm_buckets:
+                entry["rpm_left"] = int(self.rpm_buckets[key].tokens)
+            if key in self.tpm_buckets:
+                entry["tpm_left"] = int(self.tpm_buckets[key].tokens)
+            out.append(entry)
+        return out
+
+    def _try_acquire(self, tokens: int):
+        """
+        (key, 0) with the key reserved, else (None, seconds until one frees up).
+        Free keys are tried by load, then keys on a soft (network/5xx)
+        cooldown, the one that frees up soonest first. Shared-store reads
+        and writes happen outside the lock.
+        """
+        with self._lock:
+            candidates = self._candidates()
+
+        soonest = None
+        for key in candidates:
+            wait = 0.0
+            if self.store:
+                # Cooldowns learned by other workers
+                wait = max(0.0, self.store.cooldown_until(self.provider_prefix, key_id(key)) - time.time())
+            if wait == 0:
+                wait = self._take_budget(key, tokens)
+            if wait == 0:
+                with self._lock:
+                    self.in_flight[key] += 1
+                    self.current_index = (self.keys.index(key) + 1) % len(self.keys)
+                return key, 0.0
+            soonest = wait if soonest is None else min(soonest, wait)
+
+        with self._lock:
+            now = time.time()
+            for key in self.keys:
+                if key not in candidates:
+                    wait = self.blacklist_until.get(key, 0) - now
+                    soonest = wait if soonest is None else min(soonest, wait)
+        return None, max(0.0, soonest or 0.0)
+
+    def _candidates(self) -> List[str]:
+        """Keys without a local hard cooldown, in the order to try them."""
+        now = time.time()
+        n = len(self.keys)
+        free, soft = [], []
+        # Scan from current_index so equal loads round-robin
+        for offset in range(n):
+            key = self.keys[(self.current_index + offset) % n]
+            if self.blacklist_until.get(key, 0) > now:
+                continue
+            if self.soft_until.get(key, 0) > now:
+                soft.append(key)
+            else:
+                free.append(key)
+        free.sort(key=lambda k: self.in_flight[k])  # stable: ties keep round-robin order
+        soft.sort(key=lambda k: self.soft_until[k])
+        return free + soft
+
+    def _take_budget(self, key: str, tokens: int) -> float:
+        """
+        Consumes the key's request and token budgets if all have room
+        (0 returned), else consumes nothing and returns the wait. Atomic:
+        one store transaction when shared, the manager lock otherwise.
+        """
+        wants = []
+        if key in self.rpm_buckets:
+            wants.append((self.rpm_buckets[key], 1))
+        if key in self.tpm_buckets:
+            wants.append((self.tpm_buckets[key], tokens))
+        if not wants:
+            return 0.0
+        if self.store:
+            return self.store.bucket_take(
+                self.provider_prefix, key_id(key),
+                [(bucket.kind, amount, bucket.capacity, bucket.rate) for bucket, amount in wants],
+            )
+        with self._lock:
+            wait = max(bucket.wait_time(amount) for bucket, amount in wants)
+            if wait == 0:
+                for bucket, amount in wants:
+                    bucket.consume(amount)
+            return wait
+
+    def _rotate(self):
+        self.current_index = (self.current_index + 1) % len(self.keys)
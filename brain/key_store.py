@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .paths import cache_dir
+
+_stores: Dict[str, "SharedKeyStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def key_id(key: str) -> str:
+    """Stable, non-reversible id so raw API keys never hit the disk."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedKeyStore:
+    """
+    Key health shared by every process on the machine (e.g. uvicorn workers).
+    Backed by one SQLite file in WAL mode, no external service needed.
+    - cooldowns: key -> wall-clock time until which it must not be used
+    - buckets:   rate budget levels (RPM/TPM token buckets) per key
+
+    Enable with JARVIS_SHARED_KEY_STATE=1 (default location under the
+    JARVIS cache dir) or JARVIS_SHARED_KEY_STATE=/path/to/keys.sqlite3.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_dir(), "keys.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cooldowns ("
+            " provider TEXT NOT NULL, key_id TEXT NOT NULL, until REAL NOT NULL,"
+            " PRIMARY KEY (provider, key_id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " provider TEXT NOT NULL, key_id TEXT NOT NULL, kind TEXT NOT NULL,"
+            " tokens REAL NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (provider, key_id, kind))"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedKeyStore"]:
+        """The process-wide store configured by JARVIS_SHARED_KEY_STATE, if any."""
+        value = os.environ.get("JARVIS_SHARED_KEY_STATE", "").strip()
+        if not value or value == "0":
+            return None
+        path = None if value == "1" else value
+        with _stores_lock:
+            if value not in _stores:
+                _stores[value] = cls(path)
+            return _stores[value]
+
+    # ---------------- cooldowns ---------------- #
+
+    def cooldown_until(self, provider: str, kid: str) -> float:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT until FROM cooldowns WHERE provider = ? AND key_id = ?", (provider, kid)
+            ).fetchone()
+        return row[0] if row else 0.0
+
+    def set_cooldown(self, provider: str, kid: str, until: float):
+        """Extends (never shortens) a key's cooldown."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO cooldowns (provider, key_id, until) VALUES (?, ?, ?) "
+                "ON CONFLICT(provider, key_id) DO UPDATE SET until = MAX(until, excluded.until)",
+                (provider, kid, until),
+            )
+
+    # ---------------- buckets ---------------- #
+
+    def bucket_level(self, provider: str, kid: str, kind: str, capacity: float, rate: float) -> float:
+        with self._lock:
+            return self._level(provider, kid, kind, capacity, rate, time.time())
+
+    def bucket_add(self, provider: str, kid: str, kind: str, delta: float, capacity: float, rate: float):
+        """Atomically refills then adds `delta` (negative to consume)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                tokens = min(capacity, self._level(provider, kid, kind, capacity, rate, now) + delta)
+                self._set_level(provider, kid, kind, tokens, now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def bucket_take(self, provider: str, kid: str, wants: List[Tuple[str, float, float, float]]) -> float:
+        """
+        Check-and-consume in one write transaction, so workers racing for
+        the last budget cannot both get it. `wants` holds (kind, amount,
+        capacity, rate) per bucket of the key: if every bucket has room,
+        all are consumed and 0 is returned; otherwise nothing is consumed
+        and the result is the seconds until all of them would have room.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                wait = 0.0
+                levels = []
+                for kind, amount, capacity, rate in wants:
+                    tokens = self._level(provider, kid, kind, capacity, rate, now)
+                    need = min(amount, capacity)
+                    if tokens < need:
+                        wait = max(wait, (need - tokens) / rate)
+                    levels.append((kind, tokens - amount))
+                if wait == 0:
+                    for kind, tokens in levels:
+                        self._set_level(provider, kid, kind, tokens, now)
+                self._db.execute("COMMIT")
+                return wait
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _level(self, provider: str, kid: str, kind: str, capacity: float, rate: float, now: float) -> float:
+        row = self._db.execute(
+            "SELECT tokens, updated FROM buckets WHERE provider = ? AND key_id = ? AND kind = ?",
+            (provider, kid, kind),
+        ).fetchone()
+        if row is None:
+            return capacity
+        tokens, updated = row
+        return min(capacity, tokens + (now - updated) * rate)
+
+    def _set_level(self, provider: str, kid: str, kind: str, tokens: float, now: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO buckets (provider, key_id, kind, tokens, updated) VALUES (?, ?, ?, ?, ?)",
+            (provider, kid, kind, tokens, now),
+        )
+
+
+class SharedTokenBucket:
+    """TokenBucket interface backed by a SharedKeyStore row."""
+
+    def __init__(self, store: SharedKeyStore, provider: str, key: str, kind: str, capacity: float, rate: float):
+        self.store = store
+        self.provider = provider
+        self.kid = key_id(key)
+        self.kind = kind
+        self.capacity = capacity
+        self.rate = rate
+
+    @property
+    def tokens(self) -> float:
+        return self.store.bucket_level(self.provider, self.kid, self.kind, self.capacity, self.rate)
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        tokens = self.tokens
+        if tokens >= amount:
+            return 0.0
+        return (amount - tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.store.bucket_add(self.provider, self.kid, self.kind, -amount, self.capacity, self.rate)
+
+    def refund(self, amount: float):
+        self.store.bucket_add(self.provider, self.kid, self.kind, amount, self.capacity, self.rate)
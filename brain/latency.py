@@ -0,0 +1,48 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Hashable, Optional
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies per key
+    (e.g. (provider, model)). Used to derive adaptive hedge delays.
+    """
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def count(self, key: Hashable) -> int:
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key: Hashable, q: float) -> Optional[float]:
+        """Nearest-rank percentile (q in 0..1), None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))
+        return samples[rank]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        with self._lock:
+            keys = list(self._samples)
+        for key in keys:
+            name = "/".join(key) if isinstance(key, tuple) else str(key)
+            out[name] = {
+                "samples": self.count(key),
+                "p50": self.percentile(key, 0.5),
+                "p95": self.percentile(key, 0.95),
+            }
+        return out
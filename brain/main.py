@@ -1,34 +1,58 @@
+import asyncio
+import json
 import threading
 import uvicorn
 import os
 import time
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from .aio import run_sync, iterate_sync
+from .concurrency import ConcurrencyLimiter, OverloadedError
 from .model_router import ModelRouter
 from .context_engine import ContextEngine
 from .project_context_loader import ProjectContextLoader
+from .response_cache import ResponseCache
+from .retrieval import LexicalIndex
+from .token_budget import Part, count_tokens, pack
 
 load_dotenv()
 
 # ======================================================
 # App
 # ======================================================
-app = FastAPI(title="JARVIS Brain")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_response_cache()
+    yield
+
+app = FastAPI(title="JARVIS Brain", lifespan=lifespan)
 
 UI_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ui"
 )
-if os.path.exists(UI_DIR):
-    app.mount("/", StaticFiles(directory=UI_DIR, html=True), name="ui")
 
 # ======================================================
 # Core Components
 # ======================================================
 context_engine = ContextEngine()
+# Opened on startup (init_response_cache), not at import
+response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
 router = ModelRouter(context_engine)
+limiter = ConcurrencyLimiter()
+# Summaries of the loaded project; kept live by the watcher (JARVIS_WATCH=1)
+project_loader: ProjectContextLoader | None = None
+# BM25 index over project code; top-k snippets go into every prompt so the
+# model rarely needs a read_file round trip (JARVIS_RETRIEVAL=0 disables)
+retrieval: LexicalIndex | None = None
+RETRIEVAL_ENABLED = os.environ.get("JARVIS_RETRIEVAL", "1") != "0"
+RETRIEVAL_TOP_K = int(os.environ.get("JARVIS_RETRIEVAL_TOP_K", 4))
+RETRIEVAL_MAX_CHARS = int(os.environ.get("JARVIS_RETRIEVAL_MAX_CHARS", 6000))
 
 # ======================================================
 # Modes
@@ -101,6 +125,7 @@ from .system_prompt import JARVIS_SYSTEM_PROMPT
 # ======================================================
 class ChatRequest(BaseModel):
     message: str
+    no_cache: bool = False
 
 class ChatResponse(BaseModel):
     reply: str
@@ -111,36 +136,103 @@ class ChatResponse(BaseModel):
 # ======================================================
 # Brain
 # ======================================================
-def handle_request(message: str) -> dict:
+def load_project(path: str) -> str:
+    """Indexes + summarizes a project (blocking filesystem work)."""
+    global project_loader, retrieval
+    response = context_engine.set_project(path)
+
+    # Summaries reuse the index walk + hashes instead of scanning the tree again
+    loader = ProjectContextLoader(
+        context_engine.project_root, context_engine.file_index, context_engine.file_hashes()
+    )
+    loader.load()
+    context_engine.project_summary = loader.get_summary()
+    project_loader = loader
+
+    if RETRIEVAL_ENABLED:
+        index = LexicalIndex(context_engine.project_root)
+        index.build(context_engine.file_index)
+        retrieval = index
+
+    if os.environ.get("JARVIS_WATCH", "0") == "1":
+        context_engine.watch()
+
+    return response + f"\n\nContext Loaded:\n{context_engine.project_summary}"
+
+def on_index_change(changes: dict):
+    """Watcher hook: re-summarize / re-index only the files that changed."""
+    loader = project_loader
+    if loader and loader.apply_changes(changes, context_engine.file_hashes()):
+        context_engine.project_summary = loader.get_summary()
+    if retrieval:
+        retrieval.update(changes)
+
+def relevant_code(message: str) -> str:
+    """
+    Code for the prompt: definitions of symbols the message names
+    (e.g. `shapes`), then BM25 snippets that don't repeat them.
+    """
+    blocks = []
+    used = 0
+    for rel_path, sym, source in context_engine.symbol_definitions(message):
+        block = (
+            f"{sym['kind']} {sym['name']} in file: {rel_path} (lines {sym['line']}-{sym['end']})\n"
+            f"```\n{source.rstrip()}\n```"
+        )
+        if used + len(block) > RETRIEVAL_MAX_CHARS:
+            break
+        blocks.append((rel_path, sym["line"], sym["end"], block))
+        used += len(block)
+
+    if retrieval:
+        snippets = retrieval.render(
+            message,
+            k=RETRIEVAL_TOP_K,
+            max_chars=RETRIEVAL_MAX_CHARS - used,
+            exclude=[(p, start, end) for p, start, end, _ in blocks],
+        )
+        if snippets:
+            blocks.append((None, 0, 0, snippets))
+
+    return "\n\n".join(b for _, _, _, b in blocks)
+
+def project_summary(message: str) -> str:
+    """Summary for this message: big projects only expand the directories it refers to."""
+    loader = project_loader
+    return loader.get_summary(message) if loader else context_engine.project_summary
+
+context_engine.change_listeners.append(on_index_change)
+
+async def prepare_request(message: str) -> dict:
+    """
+    Everything before the model call.
+    Returns {"result": ...} for requests answered by the system itself,
+    otherwise {"mode", "intent", "task_type", "system", "prompt"}.
+    """
     message = message.strip()
 
     # --------------------------------------------------
     # Hard exits
     # --------------------------------------------------
     if message.lower() in ("hi", "hii", "hello", "hey"):
-        return {
+        return {"result": {
             "response": "Hey 👋",
             "provider": "system",
             "model": "internal",
             "task_type": "chat"
-        }
+        }}
 
     if message.lower().startswith(("set project ", "set path ")):
         path = message.split(" ", 2)[2]
-        response = context_engine.set_project(path)
-
-        loader = ProjectContextLoader(context_engine.project_root)
-        loader.load()
-        context_engine.project_summary = loader.get_summary()
-
-        response += f"\n\nContext Loaded:\n{context_engine.project_summary}"
+        # Directory walk runs off the event loop
+        response = await asyncio.to_thread(load_project, path)
 
-        return {
+        return {"result": {
             "response": response,
             "provider": "system",
             "model": "internal",
             "task_type": "command"
-        }
+        }}
 
     # --------------------------------------------------
     # Mode + Intent
@@ -149,33 +241,57 @@ def handle_request(message: str) -> dict:
     intent = extract_intent(message)
 
     if intent == "new_project":
-        return {
+        return {"result": {
             "response": "What is the new project about? Please describe the goal and stack.",
             "provider": "system",
             "model": "internal",
             "task_type": "clarify"
-        }
+        }}
 
     # --------------------------------------------------
     # Prompt construction
     # --------------------------------------------------
-    prompt = f"""
-{JARVIS_SYSTEM_PROMPT}
+    # Snippets are read from disk, keep that off the event loop
+    snippets = await asyncio.to_thread(relevant_code, message)
+    summary = project_summary(message)
+    task_type = "reason" if mode == "UNDERSTAND" else "code"
 
+    # JARVIS_SYSTEM_PROMPT goes to the router as the stable system prefix;
+    # the rest is packed into the token budget the route's models leave
+    template = """
 PROJECT SUMMARY:
-{context_engine.project_summary}
-
+{summary}
+{code}
 CURRENT MODE: {mode}
 
 User Request:
 {message}
 """
+    budget = router.prompt_budget(task_type, JARVIS_SYSTEM_PROMPT)
+    code_header = "\nRELEVANT CODE (retrieved from the project):\n{}\n"
+    budget -= count_tokens(template.format(summary="", code=code_header.format(""), mode=mode, message=""))
+    packed = pack([
+        Part("message", message, priority=3, min_tokens=0),
+        Part("summary", summary, priority=2),
+        Part("code", snippets, priority=1),
+    ], budget)
+    code_section = code_header.format(packed["code"]) if packed["code"] else ""
+    prompt = template.format(summary=packed["summary"], code=code_section, mode=mode, message=packed["message"])
 
-    # --------------------------------------------------
-    # Call model
-    # --------------------------------------------------
-    task_type = "reason" if mode == "UNDERSTAND" else "code"
-    result = router.call(task_type, prompt)
+    return {
+        "mode": mode,
+        "intent": intent,
+        "task_type": task_type,
+        "system": JARVIS_SYSTEM_PROMPT,
+        "prompt": prompt
+    }
+
+def passes_validation(mode: str, intent: str, result: dict) -> bool:
+    """True when finalize_response keeps the model output (so it may be cached)."""
+    return mode == "UNDERSTAND" or semantic_validate(intent, result.get("response", "").strip())
+
+def finalize_response(mode: str, intent: str, result: dict) -> dict:
+    """Everything after the model call (validation + response shape)."""
     output = result.get("response", "").strip()
 
     # --------------------------------------------------
@@ -192,7 +308,7 @@ User Request:
     # --------------------------------------------------
     # CODE MODE → semantic enforcement
     # --------------------------------------------------
-    if not semantic_validate(intent, output):
+    if not passes_validation(mode, intent, result):
         return {
             "response": (
                 "The generated code does not correctly satisfy your request.\n"
@@ -210,12 +326,72 @@ User Request:
         "task_type": "code"
     }
 
+async def handle_request(message: str, use_cache: bool = True) -> dict:
+    prepared = await prepare_request(message)
+    if "result" in prepared:
+        return prepared["result"]
+
+    result = await router.acall(
+        prepared["task_type"], prepared["prompt"], use_cache=use_cache, system=prepared["system"],
+        accept=lambda r: passes_validation(prepared["mode"], prepared["intent"], r),
+    )
+    return finalize_response(prepared["mode"], prepared["intent"], result)
+
+async def handle_request_stream(message: str, use_cache: bool = True):
+    """
+    Streaming variant of handle_request.
+    Yields router events ("start", "token", "tool") and finally
+    {"type": "done", "response", "provider", "model", "task_type"},
+    whose response replaces the streamed text (it may be a validator message).
+    """
+    prepared = await prepare_request(message)
+    if "result" in prepared:
+        yield {"type": "done", **prepared["result"]}
+        return
+
+    async for event in router.astream(
+        prepared["task_type"], prepared["prompt"], use_cache=use_cache, system=prepared["system"],
+        accept=lambda r: passes_validation(prepared["mode"], prepared["intent"], r),
+    ):
+        if event["type"] == "end":
+            result = finalize_response(prepared["mode"], prepared["intent"], event)
+            yield {"type": "done", **result}
+        else:
+            yield event
+
+def init_response_cache():
+    """Opens the on-disk response cache and hands it to the router (JARVIS_RESPONSE_CACHE=0 disables)."""
+    global response_cache
+    with _response_cache_lock:
+        if response_cache is None and os.environ.get("JARVIS_RESPONSE_CACHE", "1") != "0":
+            response_cache = ResponseCache()
+            router.cache = response_cache
+
+def handle_request_sync(message: str) -> dict:
+    """Blocking entry point for the CLI and desktop UI."""
+    init_response_cache()
+    return run_sync(handle_request(message))
+
+def handle_request_stream_sync(message: str):
+    """Blocking iterator over handle_request_stream events (desktop UI)."""
+    init_response_cache()
+    return iterate_sync(handle_request_stream(message))
+
 # ======================================================
 # FastAPI
 # ======================================================
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
-    result = handle_request(req.message)
+    try:
+        async with limiter:
+            result = await handle_request(req.message, use_cache=not req.no_cache)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     return ChatResponse(
         reply=result["response"],
         provider=result["provider"],
@@ -223,6 +399,74 @@ async def chat_endpoint(req: ChatRequest):
         task_type=result["task_type"]
     )
 
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls `on_close` however the response ends (even if never iterated)."""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """Server-Sent Events: one `data: {json}` line per handle_request_stream event."""
+    try:
+        await limiter.acquire()
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    released = False
+
+    def release_slot():
+        # Called by the generator and by the response; only the first call counts
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+
+    async def events():
+        try:
+            async for event in handle_request_stream(req.message, use_cache=not req.no_cache):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        finally:
+            release_slot()
+
+    try:
+        return SlotStreamingResponse(
+            events(),
+            on_close=release_slot,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except BaseException:
+        release_slot()
+        raise
+
+@app.get("/status")
+async def status_endpoint():
+    """Provider health (circuit breakers, latency), request load and file cache."""
+    return {
+        # Key and response cache stats may read SQLite
+        "router": await asyncio.to_thread(router.status),
+        "limiter": limiter.stats(),
+        "file_cache": context_engine.file_cache.stats()
+    }
+
+# Static UI is mounted last so it does not shadow the API routes
+if os.path.exists(UI_DIR):
+    app.mount("/", StaticFiles(directory=UI_DIR, html=True), name="ui")
+
 # ======================================================
 # CLI + Server
 # ======================================================
@@ -241,7 +485,7 @@ def start_cli():
             if not q:
                 continue
 
-            result = handle_request(q)
+            result = handle_request_sync(q)
             print("\n== RESPONSE ==")
             print(result["response"])
             print("================")
@@ -1,17 +1,85 @@
+import mmap
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# read_file tool-call parameters (besides "tool" and "path")
+READ_FILE_PARAMS = ("start_line", "end_line", "start_byte", "end_byte", "symbol")
+
+# Lines returned when only start_line is given
+DEFAULT_LINE_WINDOW = 200
 
 class MCPError(Exception):
     pass
 
 class MCPRead:
-    def __init__(self, context_engine, max_chars=12000):
+    """
+    Read-only file access for model tool calls. Besides whole files it
+    serves only the part the model asks for, without loading the file:
+    - line ranges (1-based, inclusive) located through mmap
+    - byte ranges through seek
+    - a symbol's definition, via ContextEngine's symbol index
+    Whole-file and line reads come from the shared FileCache (ContextEngine's
+    by default) when the file fits in it; bigger files use mmap.
+    Every result is capped at `max_chars`.
+    """
+
+    def __init__(self, context_engine, max_chars=12000, cache=None):
         self.context_engine = context_engine
         self.max_chars = max_chars
+        self.cache = cache if cache is not None else getattr(context_engine, "file_cache", None)
 
-    def read_file(self, path: str) -> str:
+    def read_request(self, call: Dict[str, Any]) -> str:
+        """Serves a parsed read_file tool call ({"path", "start_line", ...})."""
+        params = {}
+        for name in READ_FILE_PARAMS:
+            value = call.get(name)
+            if value is None or value == "":
+                continue
+            if name == "symbol":
+                params[name] = str(value)
+                continue
+            try:
+                params[name] = int(value)
+            except (TypeError, ValueError):
+                raise MCPError(f"Invalid {name}: {value!r}")
+        return self.read_file(call.get("path"), **params)
+
+    def read_file(
+        self,
+        path: Optional[str],
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        start_byte: Optional[int] = None,
+        end_byte: Optional[int] = None,
+        symbol: Optional[str] = None,
+    ) -> str:
         if not self.context_engine.project_root:
             raise MCPError("No project set")
 
+        if symbol:
+            path, start_line, end_line = self._locate_symbol(symbol, path)
+
+        file_path = self._resolve(path)
+
+        if start_line is not None or end_line is not None:
+            return self._read_lines(file_path, start_line or 1, end_line)
+        if start_byte is not None or end_byte is not None:
+            return self._read_bytes(file_path, start_byte or 0, end_byte)
+
+        content = self._cached(file_path)
+        if content is None:
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read(self.max_chars + 1)
+        if len(content) > self.max_chars:
+            content = content[:self.max_chars] + (
+                "\n\n[TRUNCATED] Request start_line/end_line or a symbol to read further."
+            )
+        return content
+
+    def _resolve(self, path: Optional[str]) -> Path:
+        if not path:
+            raise MCPError("No path given")
+
         project_root = Path(self.context_engine.project_root).resolve()
         file_path = (project_root / path).resolve()
 
@@ -21,8 +89,83 @@ class MCPRead:
         if not file_path.exists() or not file_path.is_file():
             raise MCPError(f"File not found: {path}")
 
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
+        return file_path
+
+    def _cached(self, file_path: Path) -> Optional[str]:
+        return self.cache.read(str(file_path)) if self.cache is not None else None
+
+    def _locate_symbol(self, symbol: str, path: Optional[str]) -> Tuple[str, int, int]:
+        find = getattr(self.context_engine, "find_symbol", None)
+        hits = find(symbol, path) if find else []
+        if not hits:
+            where = f" in {path}" if path else ""
+            raise MCPError(f"Symbol not found: {symbol}{where}")
+        rel_path, sym = hits[0]
+        return rel_path, sym["line"], sym["end"]
+
+    def _read_lines(self, file_path: Path, start_line: int, end_line: Optional[int]) -> str:
+        if start_line < 1:
+            raise MCPError(f"Invalid start_line: {start_line}")
+        if end_line is None:
+            end_line = start_line + DEFAULT_LINE_WINDOW - 1
+        if end_line < start_line:
+            raise MCPError(f"Invalid line range: {start_line}-{end_line}")
+
+        text = self._cached(file_path)
+        if text is not None:
+            return self._slice_lines(text, start_line, end_line)
+
+        with open(file_path, "rb") as f:
+            size = f.seek(0, 2)
+            if size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = _line_offset(mm, 0, 1, start_line)
+                if start is None or start >= size:
+                    raise MCPError(f"start_line {start_line} is past the end of the file")
+                end = _line_offset(mm, start, start_line, end_line + 1)
+                end = size if end is None else end
+                # Never decode more than the cap (4 bytes per char worst case)
+                data = mm[start:min(end, start + self.max_chars * 4)]
+
+        content = data.decode("utf-8", errors="ignore")
+        if len(content) > self.max_chars or end - start > len(data):
+            content = content[:self.max_chars] + "\n\n[TRUNCATED] Request a smaller line range."
+        return content
+
+    def _slice_lines(self, text: str, start_line: int, end_line: int) -> str:
+        if not text:
+            return ""
+        start = _line_offset(text, 0, 1, start_line)
+        if start is None or start >= len(text):
+            raise MCPError(f"start_line {start_line} is past the end of the file")
+        end = _line_offset(text, start, start_line, end_line + 1)
+        content = text[start:end]
         if len(content) > self.max_chars:
-            content = content[:self.max_chars] + "\n\n[TRUNCATED]"
+            content = content[:self.max_chars] + "\n\n[TRUNCATED] Request a smaller line range."
+        return content
 
+    def _read_bytes(self, file_path: Path, start_byte: int, end_byte: Optional[int]) -> str:
+        # Byte offsets do not map onto decoded text, so these skip the cache
+        if start_byte < 0 or (end_byte is not None and end_byte < start_byte):
+            raise MCPError(f"Invalid byte range: {start_byte}-{end_byte}")
+        length = self.max_chars if end_byte is None else min(end_byte - start_byte, self.max_chars)
+        with open(file_path, "rb") as f:
+            f.seek(start_byte)
+            data = f.read(length)
+        content = data.decode("utf-8", errors="ignore")
+        if end_byte is not None and end_byte - start_byte > length:
+            content += "\n\n[TRUNCATED] Request a smaller byte range."
         return content
+
+
+def _line_offset(buf: Union[mmap.mmap, str], pos: int, line: int, target: int) -> Optional[int]:
+    """Offset where line `target` starts, scanning from `pos` (start of `line`)."""
+    newline = "\n" if isinstance(buf, str) else b"\n"
+    while line < target:
+        nl = buf.find(newline, pos)
+        if nl < 0:
+            return None
+        pos = nl + 1
+        line += 1
+    return pos
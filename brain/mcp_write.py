@@ -1,6 +1,6 @@
 from pathlib import Path
-import tempfile
-import subprocess
+
+from .patch import PatchError, DEFAULT_FUZZ, FilePatch, PatchTransaction, parse_patch
 
 
 class MCPWriteError(Exception):
@@ -8,13 +8,17 @@ class MCPWriteError(Exception):
 
 
 class MCPWrite:
-    def __init__(self, context_engine):
+    def __init__(self, context_engine, fuzz: int = DEFAULT_FUZZ):
         self.context_engine = context_engine
+        self.fuzz = fuzz
 
-    def apply_diff(self, diff_text: str) -> str:
+    def apply_diff(self, diff_text: str, check: bool = False) -> str:
         """
         Applies a unified diff to the currently active file.
-        Implicit apply. Fails hard on any mismatch.
+        - hunks go to the focus file whatever paths the diff header names
+        - context is matched fuzzily (moved lines, whitespace, edge context)
+        - the file is replaced atomically, or left untouched on any mismatch
+        - check=True only verifies that the diff applies
         """
 
         if not self.context_engine.has_loaded_file():
@@ -28,7 +32,7 @@ class MCPWrite:
         file_path = (project_root / target).resolve()
 
         # Sandbox enforcement
-        if not str(file_path).startswith(str(project_root)):
+        if not file_path.is_relative_to(project_root):
             raise MCPWriteError("Access denied: outside project")
 
         if not file_path.exists():
@@ -40,31 +44,53 @@ class MCPWrite:
         if "@@" not in diff_text:
             raise MCPWriteError("Invalid diff: no hunks found")
 
-        # Write diff to temp file
-        with tempfile.NamedTemporaryFile(
-            mode="w",
-            suffix=".diff",
-            delete=False,
-            encoding="utf-8"
-        ) as tmp:
-            tmp.write(diff_text)
-            diff_path = Path(tmp.name)
-
-        # Apply diff using git
         try:
-            result = subprocess.run(
-                ["git", "apply", "--whitespace=nowarn", str(diff_path)],
-                cwd=project_root,
-                capture_output=True,
-                text=True
-            )
-        finally:
-            diff_path.unlink(missing_ok=True)
-
-        if result.returncode != 0:
-            raise MCPWriteError(
-                "Failed to apply diff.\n"
-                f"STDERR:\n{result.stderr.strip()}"
-            )
+            patch = FilePatch(target, target)
+            patch.hunks = [hunk for p in parse_patch(diff_text) for hunk in p.hunks]
+            self._run([patch], check)
+        except PatchError as e:
+            raise MCPWriteError(f"Failed to apply diff.\n{e}")
 
+        if check:
+            return f"Diff applies cleanly to {target}"
         return f"Applied diff to {target}"
+
+    def apply_patch(self, diff_text: str, check: bool = False) -> str:
+        """
+        Applies a multi-file unified diff as one transaction: paths come
+        from the diff headers (relative to the project root, /dev/null for
+        created or deleted files), every hunk of every file is checked
+        before anything is written, and a failure while writing restores
+        all files. check=True only verifies that the diff applies.
+        """
+        if not self.context_engine.project_root:
+            raise MCPWriteError("No project root set")
+
+        try:
+            paths = self._run(parse_patch(diff_text), check)
+        except PatchError as e:
+            raise MCPWriteError(f"Failed to apply patch.\n{e}")
+
+        verb = "Patch applies cleanly to" if check else "Applied patch to"
+        return f"{verb} {len(paths)} file(s): {', '.join(paths)}"
+
+    def _run(self, patches, check: bool):
+        transaction = PatchTransaction(self.context_engine.project_root, fuzz=self.fuzz)
+        try:
+            transaction.prepare(patches)
+        except (OSError, UnicodeDecodeError) as e:
+            raise PatchError(f"Cannot read patched file: {e}")
+        paths = [change.rel_path for change in transaction.changes]
+        if check:
+            return paths
+
+        try:
+            transaction.commit()
+        except OSError as e:
+            raise PatchError(f"Write failed, all files restored: {e}")
+        finally:
+            cache = getattr(self.context_engine, "file_cache", None)
+            if cache is not None:
+                for change in transaction.changes:
+                    cache.invalidate(change.path)
+        return paths
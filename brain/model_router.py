@@ -1,16 +1,102 @@
 import os
-import requests
 import json
+import asyncio
 import logging
-import re
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Callable
 
-from .key_manager import KeyManager
+import httpx
+
+from .aio import run_sync
+from .circuit_breaker import BreakerRegistry
+from .http_client import ProviderClientPool
+from .key_manager import KeyManager, KeyExhaustedError, parse_retry_after
+from .latency import LatencyTracker
 from .mcp import MCPRead
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+from .token_budget import MESSAGE_OVERHEAD, context_window, count_tokens, message_tokens, share, truncate
+from .tool_calls import ToolCallScanner, NativeCallAccumulator, TOOL_SCHEMAS, as_text, from_native, scan_tool_calls
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+GROQ_MODEL = "llama-3.3-70b-versatile"
+DEEPSEEK_MODEL = "deepseek-reasoner"
+LLAMA_70B_MODEL = "meta-llama/llama-3.1-70b-instruct"
+QWEN_32B_MODEL = "qwen/qwen2.5-32b-instruct"
+
+# Hedge delay bounds (seconds) when derived from observed latency
+HEDGE_DEFAULT_DELAY = 10.0
+HEDGE_MIN_DELAY = 0.5
+
+# Completion size assumed when reserving token budgets (reconciled with usage)
+COMPLETION_TOKEN_ESTIMATE = 1024
+
+# Tool output cut below this many tokens is useless; older turns are dropped first
+MIN_TOOL_OUTPUT_TOKENS = 256
+OMITTED_TOOL_OUTPUT = "[File contents from an earlier tool call omitted to fit the context window.]"
+
+# (provider, model) -> label used in logs
+MODEL_LABELS = {
+    ("groq", GROQ_MODEL): "Groq",
+    ("deepseek", DEEPSEEK_MODEL): "DeepSeek Reasoner",
+    ("openrouter", LLAMA_70B_MODEL): "OpenRouter Llama 70B",
+    ("openrouter", QWEN_32B_MODEL): "OpenRouter Qwen 32B",
+}
+
+# Chat messages: [{"role": "system" | "user" | "assistant", "content": ...}, ...]
+Messages = List[Dict[str, str]]
+# Decides whether a result may be cached
+Accept = Callable[[Dict[str, Any]], bool]
+
+def _estimate_tokens(messages: Messages) -> int:
+    """Request size for rate budgets: prompt tokens (token_budget.message_tokens) plus room for the answer."""
+    return message_tokens(messages) + COMPLETION_TOKEN_ESTIMATE
+
+def _is_provider_failure(exc: Exception) -> bool:
+    """Network errors, timeouts and 5xx count against a provider; other 4xx are request/key problems."""
+    if isinstance(exc, KeyExhaustedError):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 408
+    return True
+
+def _read_specs(obj: Any) -> List[Dict]:
+    """Single-file read calls from a parsed read_file / read_files object."""
+    if not isinstance(obj, dict):
+        return []
+    if obj.get("tool") == "read_file":
+        items = [obj]
+    elif obj.get("tool") == "read_files":
+        items = obj.get("files") or obj.get("paths") or []
+    else:
+        return []
+
+    specs = []
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, str):
+            item = {"path": item}
+        # A symbol alone is enough to locate the code
+        if isinstance(item, dict) and (item.get("path") or item.get("symbol")):
+            specs.append({"tool": "read_file", **{k: v for k, v in item.items() if k != "tool"}})
+    return specs
+
+def _read_label(call: Dict) -> str:
+    """e.g. "shapes.js (lines 10-40)" for logs, prompts and UI events."""
+    return f"{call.get('path') or call.get('symbol')} {_read_scope(call)}".rstrip()
+
+def _read_scope(call: Dict) -> str:
+    """Human-readable part of a read_file call, e.g. "(lines 10-40)"."""
+    if call.get("symbol"):
+        return f"(symbol {call['symbol']})"
+    for unit, start, end, first in (("lines", "start_line", "end_line", 1), ("bytes", "start_byte", "end_byte", 0)):
+        if call.get(start) is not None or call.get(end) is not None:
+            return f"({unit} {call.get(start) or first}-{call.get(end) or 'end'})"
+    return ""
+
+
 class ModelRouter:
     """
     Routes tasks with strict priority:
@@ -18,7 +104,29 @@ class ModelRouter:
     - Reason/Plan -> DeepSeek Reasoner -> OpenRouter (Llama 3.1 70B) -> OpenRouter (Qwen 2.5 32B)
     """
 
-    def __init__(self, context_engine=None):
+    def __init__(
+        self,
+        context_engine=None,
+        http: Optional[ProviderClientPool] = None,
+        hedge: Optional[bool] = None,
+        hedge_delay: Optional[float] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        # Shared keep-alive pools for every provider
+        self.http = http or ProviderClientPool()
+
+        # Hedging: if a provider is slower than its usual p95, start the next
+        # one in parallel and take whichever answers first.
+        # JARVIS_HEDGE=1 enables; JARVIS_HEDGE_DELAY pins a fixed delay (seconds).
+        self.latency = LatencyTracker()
+        self.hedge = hedge if hedge is not None else os.environ.get("JARVIS_HEDGE", "0") == "1"
+        if hedge_delay is None and os.environ.get("JARVIS_HEDGE_DELAY"):
+            hedge_delay = float(os.environ["JARVIS_HEDGE_DELAY"])
+        self.hedge_delay = hedge_delay
+
+        # Per provider/model circuit breakers: known-dead models are skipped
+        self.breakers = BreakerRegistry()
+
         self.km_groq = KeyManager("GROQ")
         self.km_openrouter = KeyManager("OPENROUTER")
         try:
@@ -27,126 +135,335 @@ class ModelRouter:
             self.km_deepseek = None
             
         # Initialize MCP
+        self.context_engine = context_engine
         self.mcp = MCPRead(context_engine) if context_engine else None
+        # Tool-call follow-up rounds per request, files read per round
+        self.tool_rounds = int(os.environ.get("JARVIS_TOOL_ROUNDS", 2))
+        self.tool_max_files = int(os.environ.get("JARVIS_TOOL_MAX_FILES", 8))
+        # Also offer read_file as a native function to providers
+        self.native_tools = os.environ.get("JARVIS_NATIVE_TOOLS", "0") == "1"
+        # System prefixes are built once per (task type, caller system prompt)
+        self._system_prefixes: Dict[Tuple[str, str], str] = {}
+        # Context window share kept free for the answer when packing prompts
+        self.response_reserve = int(os.environ.get("JARVIS_RESPONSE_TOKENS", 4096))
+
+        # Optional response cache (keyed on prompt, route and project fingerprint)
+        self.cache = cache
+        # Coalesces identical in-flight requests
+        self.inflight = SingleFlight()
+
+    def status(self) -> Dict[str, Any]:
+        """Breaker + latency state for the status endpoint."""
+        return {
+            "breakers": self.breakers.snapshot(),
+            "latency": self.latency.snapshot(),
+            "hedge": self.hedge,
+            "cache": self.cache.stats() if self.cache else None,
+            "coalesced": self.inflight.coalesced,
+            "keys": {
+                km.provider_prefix.lower(): km.stats()
+                for km in (self.km_groq, self.km_deepseek, self.km_openrouter) if km
+            },
+        }
+
+    def call(self, task_type: str, prompt: str, use_cache: bool = True, system: str = "",
+             accept: Optional[Accept] = None) -> Dict[str, Any]:
+        """Blocking wrapper around `acall` for sync callers (CLI, desktop UI)."""
+        return run_sync(self.acall(task_type, prompt, use_cache=use_cache, system=system, accept=accept))
+
+    async def acall(self, task_type: str, prompt: str, use_cache: bool = True, system: str = "",
+                    accept: Optional[Accept] = None) -> Dict[str, Any]:
+        """
+        Strict routing logic with fallback chains and MCP-READ interception.
+        `system` is the caller's stable instructions; `prompt` the per-request part.
+        `accept` decides whether a result may be cached (e.g. it passed the
+        caller's validation); without it every non-empty result is.
+        """
+        messages = self._prepare_messages(task_type, prompt, system)
+        chain = self._route(task_type)
+        request_key = self._request_key(task_type, chain, messages)
+
+        if use_cache:
+            cached = await self._cache_get(request_key)
+            if cached:
+                return cached
+
+        # Identical requests already in flight share one provider call
+        return await self.inflight.do(
+            request_key, lambda: self._run(task_type, chain, messages, request_key, accept)
+        )
+
+    async def _run(self, task_type: str, chain: List[Tuple[str, str]], messages: Messages, request_key: str,
+                   accept: Optional[Accept] = None) -> Dict[str, Any]:
+        result = await self._call_chain(chain, messages)
+
+        # Check for Tool Calls (MCP-READ), at most `tool_rounds` follow-ups
+        result = await self._process_tool_calls(result, task_type, messages, depth=0)
+        await self._cache_set(request_key, result, accept)
+        return result
+
+    async def astream(self, task_type: str, prompt: str, use_cache: bool = True, system: str = "",
+                      accept: Optional[Accept] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `acall`. Yields events:
+        - {"type": "start", "provider", "model"}     first token is about to arrive
+        - {"type": "token", "text"}                  incremental output
+        - {"type": "tool", "tool", "path", "files"}  model asked for files; output restarts
+        - {"type": "end", "provider", "model", "response"}
+        """
+        messages = self._prepare_messages(task_type, prompt, system)
+        chain = self._route(task_type)
+        request_key = self._request_key(task_type, chain, messages)
+
+        if use_cache:
+            cached = await self._cache_get(request_key)
+            if cached:
+                yield {"type": "start", "provider": cached["provider"], "model": cached["model"]}
+                yield {"type": "token", "text": cached["response"]}
+                yield {"type": "end", **cached}
+                return
+
+        # Late joiners replay the events streamed so far, then follow live
+        async for event in self.inflight.stream(
+            request_key, lambda: self._run_stream(task_type, chain, messages, request_key, accept)
+        ):
+            yield event
+
+    async def _run_stream(self, task_type: str, chain: List[Tuple[str, str]], messages: Messages, request_key: str,
+                          accept: Optional[Accept] = None) -> AsyncIterator[Dict[str, Any]]:
+        for depth in range(self.tool_rounds + 1):
+            parts: List[str] = []
+            provider = model = None
+            scanner = ToolCallScanner()
+
+            async for event in self._stream_chain(chain, messages):
+                if event["type"] == "start":
+                    provider, model = event["provider"], event["model"]
+                else:
+                    parts.append(event["text"])
+                    scanner.feed(event["text"])
+                yield event
 
-    def call(self, task_type: str, prompt: str) -> Dict[str, Any]:
-        """Strict routing logic with fallback chains and MCP-READ interception."""
-        
-        # Inject MCP-READ system prompt rules
-        prompt = self._apply_mcp_rules(prompt)
+            response = "".join(parts)
+            tool_calls = self._read_calls(scanner.calls) if depth < self.tool_rounds else []
+            if not tool_calls:
+                result = {"provider": provider, "response": response, "model": model}
+                await self._cache_set(request_key, result, accept)
+                yield {"type": "end", **result}
+                return
 
-        # Initial Call
-        if task_type in ("reason", "plan"):
+            labels = [_read_label(call) for call in tool_calls]
+            yield {
+                "type": "tool",
+                "tool": "read_file",
+                "path": labels[0] if len(labels) == 1 else f"{len(labels)} files ({', '.join(labels)})",
+                "files": labels,
+            }
+            chain = self._followup_chain(task_type, provider)
+            messages = await self._tool_followup(messages, response, tool_calls, self._chain_budget(chain))
+
+    def _request_key(self, task_type: str, chain: List[Tuple[str, str]], messages: Messages) -> str:
+        """Identifies a request for caching and coalescing."""
+        fingerprint = getattr(self.context_engine, "index_fingerprint", "")
+        return ResponseCache.make_key(task_type, chain, messages, fingerprint)
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache:
+            return None
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached:
+            logger.info(f"Response cache hit ({cached.get('model')})")
+        return cached
+
+    async def _cache_set(self, key: str, result: Dict[str, Any], accept: Optional[Accept] = None):
+        if self.cache and result.get("response") and (accept is None or accept(result)):
+            await asyncio.to_thread(self.cache.set, key, result)
+
+    def _prepare_messages(self, task_type: str, prompt: str, system: str = "") -> Messages:
+        """
+        Stable system prefix + per-request user message. The prefix is the
+        same string for every request of a task type, so providers with
+        prompt (prefix) caching can reuse it. A prompt over the budget (see
+        `prompt_budget`; callers should pack to it) is cut rather than
+        overflowing the first provider's context.
+        """
+        budget = self.prompt_budget(task_type, system)
+        if count_tokens(prompt) > budget:
+            logger.warning(f"Prompt exceeds the {budget} token budget, truncating")
+            prompt = truncate(prompt, budget)
+        return [
+            {"role": "system", "content": self._system_prefix(task_type, system)},
+            {"role": "user", "content": prompt},
+        ]
+
+    def prompt_budget(self, task_type: str, system: str = "") -> int:
+        """Tokens the user message may use so every model on the route has room to answer."""
+        prefix = self._system_prefix(task_type, system)
+        return self._chain_budget(self._route(task_type)) - message_tokens([{"content": prefix}]) - MESSAGE_OVERHEAD
+
+    def _chain_budget(self, chain: List[Tuple[str, str]]) -> int:
+        """Prompt tokens (all messages) that fit every model in `chain` with the response reserve."""
+        return min(context_window(model) for _, model in chain) - self.response_reserve
+
+    def _system_prefix(self, task_type: str, system: str) -> str:
+        key = (task_type, system)
+        prefix = self._system_prefixes.get(key)
+        if prefix is None:
+            # MCP-READ rules first: shared by every task type
+            parts = [self._mcp_rules(), system.strip()]
             if task_type == "reason":
-                prompt = self._apply_reasoning_grounding(prompt)
-            result = self._call_reasoning_chain(prompt)
-        elif task_type == "code":
-            try:
-                response = self._call_groq(prompt)
-                result = {
-                    "provider": "groq", 
-                    "response": response, 
-                    "model": "llama-3.3-70b-versatile"
-                }
-            except Exception as e:
-                logger.error(f"Groq failed: {e}")
-                logger.info("Falling back to reasoning chain for code task...")
-                result = self._call_reasoning_chain(prompt)
-        else:
-            result = self._call_reasoning_chain(prompt)
+                parts.append(self._reasoning_grounding())
+            prefix = "\n\n".join(p for p in parts if p)
+            self._system_prefixes[key] = prefix
+        return prefix
+
+    def _reasoning_chain(self) -> List[Tuple[str, str]]:
+        """Providers in strict priority order for reasoning."""
+        chain = []
+        if self.km_deepseek:
+            chain.append(("deepseek", DEEPSEEK_MODEL))
+        chain.append(("openrouter", LLAMA_70B_MODEL))
+        chain.append(("openrouter", QWEN_32B_MODEL))
+        return chain
+
+    def _route(self, task_type: str) -> List[Tuple[str, str]]:
+        if task_type == "code":
+            # Groq first, reasoning chain as fallback
+            return [("groq", GROQ_MODEL)] + self._reasoning_chain()
+        return self._reasoning_chain()
 
-        # Check for Tool Calls (MCP-READ)
-        # We allow a max depth of 2 recursions to prevent loops
-        return self._process_tool_calls(result, task_type, prompt, depth=0)
+    def _followup_chain(self, task_type: str, provider: Optional[str]) -> List[Tuple[str, str]]:
+        """Tool-call follow-ups stay on Groq for code tasks it answered."""
+        if task_type == "code" and provider == "groq":
+            return [("groq", GROQ_MODEL)]
+        return self._reasoning_chain()
 
-    def _process_tool_calls(self, result: Dict[str, Any], task_type: str, original_prompt: str, depth: int) -> Dict[str, Any]:
-        """Intercepts 'read_file' requests and feeds content back to the model."""
-        if depth >= 2:
+    async def _process_tool_calls(self, result: Dict[str, Any], task_type: str, messages: Messages, depth: int) -> Dict[str, Any]:
+        """Intercepts read_file / read_files requests and feeds the contents back to the model."""
+        if depth >= self.tool_rounds:
             return result
-            
-        response_text = result["response"]
-        tool_call = self._extract_tool_call(response_text)
-        
-        if not tool_call:
+
+        tool_calls = self._extract_tool_calls(result["response"])
+        if not tool_calls:
             return result
-            
-        if tool_call.get("tool") == "read_file":
-            path = tool_call.get("path")
-            logger.info(f"MCP-READ Interception: Reading {path}")
-            
-            try:
-                if not self.mcp:
-                    raise RuntimeError("MCP not initialized")
-                    
-                file_content = self.mcp.read_file(path)
-                
-                # Construct follow-up prompt
-                followup_prompt = (
-                    f"{original_prompt}\n\n"
-                    f"You requested the following file:\n\n"
-                    f"FILE: {path}\n"
+
+        chain = self._followup_chain(task_type, result["provider"])
+        followup = await self._tool_followup(messages, result["response"], tool_calls, self._chain_budget(chain))
+        new_result = await self._call_chain(chain, followup)
+
+        return await self._process_tool_calls(new_result, task_type, followup, depth + 1)
+
+    async def _tool_followup(self, messages: Messages, response: str, tool_calls: List[Dict], budget: Optional[int] = None) -> Messages:
+        """
+        Reads every requested file concurrently. The conversation continues
+        with the model's tool-call reply and a user turn holding the files;
+        earlier messages are reused as they are, not copied into a new prompt.
+        With a token `budget` the file contents are fitted into it: files
+        share what is left, and earlier tool output is dropped when too
+        little is.
+        """
+        labels = [_read_label(call) for call in tool_calls]
+        logger.info(f"MCP-READ Interception: Reading {', '.join(labels)}")
+
+        results = await asyncio.gather(*(self._read_tool_file(call) for call in tool_calls))
+        failed = any(error is not None for _, error in results)
+
+        if len(tool_calls) == 1:
+            header = "You requested the following file:"
+        else:
+            header = f"You requested the following {len(tool_calls)} files:"
+        footer = "Continue your task using this as source of truth."
+        if failed:
+            footer += "\nProceed without the files that failed or request different ones."
+
+        history = messages + [{"role": "assistant", "content": response}]
+        contents = [content for content, _ in results]
+        if budget is not None:
+            frame = self._tool_output_message(header, footer, labels, [""] * len(labels), results)
+            history, contents = self._fit_tool_output(history, contents, frame, budget)
+
+        return history + [
+            {"role": "user", "content": self._tool_output_message(header, footer, labels, contents, results)},
+        ]
+
+    def _tool_output_message(self, header: str, footer: str, labels: List[str], contents: List[Optional[str]], results: List[Tuple]) -> str:
+        sections = []
+        for label, content, (_, error) in zip(labels, contents, results):
+            if error is not None:
+                sections.append(f"TOOL ERROR: Failed to read file '{label}'. Reason: {error}")
+            else:
+                sections.append(
+                    f"FILE: {label}\n"
                     f"------------------\n"
-                    f"{file_content}\n"
-                    f"------------------\n\n"
-                    f"Continue your task using this as source of truth."
-                )
-                
-                # Recursive call with new prompt
-                # (We bypass initial grounding injection to avoid duplicating it too many times, 
-                # but for simplicity calling internal methods or recursing 'call' is fine.
-                # Let's call the specific provider chain again to keep it simple.)
-                
-                if task_type == "code" and result["provider"] == "groq":
-                     # Retry Groq
-                     new_resp = self._call_groq(followup_prompt)
-                     new_result = {"provider": "groq", "response": new_resp, "model": "llama-3.3-70b-versatile"}
-                else:
-                     new_result = self._call_reasoning_chain(followup_prompt)
-                     
-                return self._process_tool_calls(new_result, task_type, followup_prompt, depth + 1)
-                
-            except Exception as e:
-                logger.error(f"MCP-READ Failed: {e}")
-                # Feed error back to model? Or just fail? 
-                # For safety, let's append error and retry once.
-                error_prompt = (
-                     f"{original_prompt}\n\n"
-                     f"TOOL ERROR: Failed to read file '{path}'. Reason: {str(e)}\n"
-                     "Proceed without this file or request a different one."
+                    f"{content}\n"
+                    f"------------------"
                 )
-                if task_type == "code" and result["provider"] == "groq":
-                     new_resp = self._call_groq(error_prompt)
-                     new_result = {"provider": "groq", "response": new_resp, "model": "llama-3.3-70b-versatile"}
-                else:
-                     new_result = self._call_reasoning_chain(error_prompt)
-                     
-                return self._process_tool_calls(new_result, task_type, error_prompt, depth + 1)
-
-        return result
+        return f"{header}\n\n" + "\n\n".join(sections) + f"\n\n{footer}"
 
-    def _extract_tool_call(self, text: str) -> Optional[Dict]:
+    def _fit_tool_output(
+        self, history: Messages, contents: List[Optional[str]], frame: str, budget: int
+    ) -> Tuple[Messages, List[Optional[str]]]:
         """
-        Parses { "tool": "read_file", ... } from text.
-        Returns dict if found, None otherwise.
+        Trims file `contents` (and older tool turns if needed) so the follow-up
+        fits `budget` tokens. `frame` is the tool message without contents.
         """
-        # Look for JSON-like block
-        # Simple regex for the specific pattern requested
-        # We look for the exact JSON structure provided in instructions
+        sizes = [count_tokens(c) if c is not None else 0 for c in contents]
+        # Content joins can merge tokens differently; keep a small margin
+        available = budget - message_tokens(history) - count_tokens(frame) - MESSAGE_OVERHEAD - 2 * len(contents)
+        wanted = min(sum(sizes), MIN_TOOL_OUTPUT_TOKENS * len(contents))
+        # The system prefix and the request (first two messages) are never dropped
+        for i in range(2, len(history)):
+            if available >= wanted:
+                break
+            turn = history[i]
+            if turn["role"] == "user" and turn["content"] != OMITTED_TOOL_OUTPUT:
+                history = history[:i] + [{"role": "user", "content": OMITTED_TOOL_OUTPUT}] + history[i + 1:]
+                available += count_tokens(turn["content"]) - count_tokens(OMITTED_TOOL_OUTPUT)
+
+        if sum(sizes) <= available:
+            return history, contents
+        logger.info(f"Fitting {sum(sizes)} tokens of tool output into {available}")
+        marker = "\n\n[TRUNCATED] Request a smaller line range or a symbol."
+        fitted = [
+            truncate(content, limit, marker) if content is not None and size > limit else content
+            for content, size, limit in zip(contents, sizes, share(sizes, available))
+        ]
+        return history, fitted
+
+    async def _read_tool_file(self, call: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """(content, None) or (None, error message); file reads run off the event loop."""
         try:
-            # fast check
-            if '"tool": "read_file"' not in text:
-                return None
-                
-            # Attempt to find json block
-            # This is a bit heuristic, assuming the model outputs valid JSON in a block or standalone
-            match = re.search(r'\{.*"tool":\s*"read_file".*\}', text, re.DOTALL)
-            if match:
-                return json.loads(match.group(0))
-        except:
-            pass
-        return None
-
-    def _apply_mcp_rules(self, prompt: str) -> str:
+            if not self.mcp:
+                raise RuntimeError("MCP not initialized")
+            return await asyncio.to_thread(self.mcp.read_request, call), None
+        except Exception as e:
+            logger.error(f"MCP-READ Failed: {e}")
+            return None, str(e)
+
+    def _extract_tool_calls(self, text: str) -> List[Dict]:
+        """
+        Every file read requested in `text`, in order. Accepts any number of
+        tool-call blocks (see tool_calls.ToolCallScanner), each either
+        { "tool": "read_file", "path": ..., optional mcp.READ_FILE_PARAMS } or
+        { "tool": "read_files", "files": ["a.js", {"path": ..., ...}, ...] }.
+        """
+        if '"read_file' not in text:
+            return []
+        return self._read_calls(scan_tool_calls(text))
+
+    def _read_calls(self, objects: List[Dict]) -> List[Dict]:
+        """Single-file reads from scanned tool calls; duplicates dropped, at most `tool_max_files`."""
+        calls: List[Dict] = []
+        seen = set()
+        for obj in objects:
+            for call in _read_specs(obj):
+                key = json.dumps(call, sort_keys=True)
+                if key not in seen:
+                    seen.add(key)
+                    calls.append(call)
+        return calls[:self.tool_max_files]
+
+    def _mcp_rules(self) -> str:
         rules = (
             "🔒 SYSTEM ROLE\n"
             "You are a coding assistant operating in READ-ONLY + SNIPPET MODE.\n"
@@ -170,6 +487,15 @@ class ModelRouter:
             "- Never assume project structure, variable names, or logic.\n"
             "Example allowed response:\n"
             "“I need to see the file where the shapes object is defined to add a new shape safely.”\n\n"
+            "📄 READING FILES\n"
+            "To read code that is not in the prompt, reply with ONLY this JSON:\n"
+            '{"tool": "read_file", "path": "<relative path>"}\n'
+            "Read only the part you need with optional fields:\n"
+            '- "start_line" / "end_line" (1-based, inclusive)\n'
+            '- "start_byte" / "end_byte"\n'
+            '- "symbol": a function, class or object name (e.g. "shapes"); "path" may then be omitted\n'
+            "Need several files? Request them all in ONE reply:\n"
+            '{"tool": "read_files", "files": [{"path": "a.js"}, {"path": "b.py", "symbol": "run"}]}\n\n'
             "🧠 CHANGE SCOPE RULES (NON-NEGOTIABLE)\n"
             "Unless the user explicitly says rewrite / refactor, you must assume:\n"
             "- Existing code is correct\n"
@@ -200,12 +526,12 @@ class ModelRouter:
             "// ADD INSIDE `shapes` OBJECT\n\n"
             "🛑 FAILURE CONDITION\n"
             "If you violate any rule above, your response is considered invalid and will be discarded.\n"
-            "Proceed accordingly.\n\n"
+            "Proceed accordingly."
         )
-        return rules + prompt
+        return rules
 
-    def _apply_reasoning_grounding(self, prompt: str) -> str:
-        """Prepends grounding instructions to prevent hallucinated ignorance."""
+    def _reasoning_grounding(self) -> str:
+        """Grounding instructions to prevent hallucinated ignorance."""
         grounding = (
             "You are continuing an ongoing technical discussion.\n"
             "Assume that:\n"
@@ -215,129 +541,266 @@ class ModelRouter:
             "CRITICAL CONSTRAINTS:\n"
             "- Do NOT invent or name classes, functions, variables, or files that are not present in the provided context.\n"
             "- If exact identifiers are unknown, describe changes behaviorally instead of naming code entities.\n"
-            "- If an answer cannot be grounded in the provided files, say so explicitly.\n\n"
+            "- If an answer cannot be grounded in the provided files, say so explicitly."
         )
-        return grounding + prompt
+        return grounding
 
-    def _call_reasoning_chain(self, prompt: str) -> Dict[str, Any]:
-        """Tries providers in strict priority order for reasoning."""
-        
-        # 1. DeepSeek Reasoner
-        if self.km_deepseek:
+    async def _call_chain(self, chain: List[Tuple[str, str]], messages: Messages) -> Dict[str, Any]:
+        """Tries each (provider, model) in order, returning the first success."""
+        if self.hedge and len(chain) > 1:
+            return await self._call_chain_hedged(chain, messages)
+
+        for provider, model in chain:
+            if not self._allow(provider, model):
+                continue
             try:
-                resp = self._call_deepseek_direct(prompt)
-                return {"provider": "deepseek", "response": resp, "model": "deepseek-reasoner"}
+                resp = await self._timed_call(provider, model, messages)
+                return {"provider": provider, "response": resp, "model": model}
             except Exception as e:
-                logger.warning(f"DeepSeek Reasoner failed: {e}")
-        
-        # 2. OpenRouter: Llama 3.1 70B
-        try:
-            resp = self._call_openrouter(prompt, "meta-llama/llama-3.1-70b-instruct")
-            return {"provider": "openrouter", "response": resp, "model": "meta-llama/llama-3.1-70b-instruct"}
-        except Exception as e:
-            logger.warning(f"OpenRouter Llama 70B failed: {e}")
+                logger.warning(f"{MODEL_LABELS.get((provider, model), model)} failed: {e}")
+
+        raise RuntimeError("All reasoning providers failed.")
 
-        # 3. OpenRouter: Qwen 2.5 32B
+    async def _call_chain_hedged(self, chain: List[Tuple[str, str]], messages: Messages) -> Dict[str, Any]:
+        """
+        Like _call_chain, but when the newest in-flight provider exceeds its
+        hedge delay the next one is started in parallel. A failure starts the
+        next provider immediately. First success wins (ties go to the
+        higher-priority provider); everything still running is cancelled.
+        """
+        remaining = list(chain)
+        pending: Dict[asyncio.Task, Tuple[str, str]] = {}
+        priority = {entry: i for i, entry in enumerate(chain)}
+        newest: Tuple[str, str] = chain[0]
+
+        def launch():
+            nonlocal newest
+            while remaining:
+                entry = remaining.pop(0)
+                if self._allow(*entry):
+                    newest = entry
+                    task = asyncio.create_task(self._timed_call(entry[0], entry[1], messages))
+                    pending[task] = entry
+                    return
+
+        launch()
         try:
-            resp = self._call_openrouter(prompt, "qwen/qwen2.5-32b-instruct")
-            return {"provider": "openrouter", "response": resp, "model": "qwen/qwen2.5-32b-instruct"}
-        except Exception as e:
-            logger.error(f"OpenRouter Qwen 32B failed: {e}")
-            
+            while pending:
+                timeout = self._hedge_delay(*newest) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    logger.info(
+                        f"Hedging: {MODEL_LABELS.get(newest, newest[1])} slower than {timeout:.1f}s, "
+                        f"starting {MODEL_LABELS.get(remaining[0], remaining[0][1])}"
+                    )
+                    launch()
+                    continue
+
+                for task in sorted(done, key=lambda t: priority[pending[t]]):
+                    provider, model = pending.pop(task)
+                    try:
+                        resp = task.result()
+                    except Exception as e:
+                        logger.warning(f"{MODEL_LABELS.get((provider, model), model)} failed: {e}")
+                        if remaining:
+                            launch()
+                        continue
+                    return {"provider": provider, "response": resp, "model": model}
+        finally:
+            for task in pending:
+                task.cancel()
+
         raise RuntimeError("All reasoning providers failed.")
 
-    def _call_deepseek_direct(self, prompt: str) -> str:
-        key = self.km_deepseek.get_key()
-        url = "https://api.deepseek.com/chat/completions"
-        
-        payload = {
-            "model": "deepseek-reasoner",
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json"
-        }
-        
+    def _hedge_delay(self, provider: str, model: str) -> float:
+        """Fixed delay if configured, otherwise the provider's observed p95 latency."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+
+        key = (provider, model)
+        if self.latency.count(key) < 5:
+            # Not enough history yet: assume a generous default
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.latency.percentile(key, 0.95))
+
+    def _allow(self, provider: str, model: str) -> bool:
+        if self.breakers.get((provider, model)).allow():
+            return True
+        logger.info(f"{MODEL_LABELS.get((provider, model), model)} skipped: circuit open")
+        return False
+
+    def _record_error(self, provider: str, model: str, exc: BaseException):
+        breaker = self.breakers.get((provider, model))
+        if isinstance(exc, Exception) and _is_provider_failure(exc):
+            breaker.record_failure()
+        else:
+            # Request/key problem or abandoned call: says nothing about health
+            breaker.release()
+
+    async def _timed_call(self, provider: str, model: str, messages: Messages) -> str:
+        """_call_model plus latency tracking and breaker bookkeeping. Caller checks _allow."""
+        start = time.monotonic()
         try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=60)
-            if not resp.ok:
-                logger.error(f"DeepSeek Error: {resp.status_code} - {resp.text}")
-                self.km_deepseek.report_failure(key, status=resp.status_code)
-                resp.raise_for_status()
-            
-            data = resp.json()
-            return data["choices"][0]["message"]["content"]
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"DeepSeek Network Error Body: {e.response.text}")
-            self.km_deepseek.report_failure(key, status=getattr(e.response, 'status_code', 0) if e.response else 0)
-            raise e
-
-    def _call_openrouter(self, prompt: str, model: str) -> str:
-        key = self.km_openrouter.get_key()
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        
+            resp = await self._call_model(provider, model, messages)
+        except BaseException as e:
+            self._record_error(provider, model, e)
+            raise
+
+        self.breakers.get((provider, model)).record_success()
+        self.latency.record((provider, model), time.monotonic() - start)
+        return resp
+
+    async def _stream_chain(self, chain: List[Tuple[str, str]], messages: Messages) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams from the first provider that produces output.
+        Falls back only before the first token; a mid-stream failure is raised.
+        """
+        for provider, model in chain:
+            if not self._allow(provider, model):
+                continue
+
+            started = False
+            try:
+                async for token in self._stream_model(provider, model, messages):
+                    if not started:
+                        started = True
+                        self.breakers.get((provider, model)).record_success()
+                        yield {"type": "start", "provider": provider, "model": model}
+                    yield {"type": "token", "text": token}
+            except Exception as e:
+                if started:
+                    raise
+                self._record_error(provider, model, e)
+                logger.warning(f"{MODEL_LABELS.get((provider, model), model)} stream failed: {e}")
+                continue
+            except BaseException as e:
+                # Client went away / cancelled before the stream finished
+                self._record_error(provider, model, e)
+                raise
+
+            if not started:
+                self.breakers.get((provider, model)).record_success()
+                yield {"type": "start", "provider": provider, "model": model}
+            return
+
+        raise RuntimeError("All reasoning providers failed.")
+
+    def _provider_request(self, provider: str, model: str, messages: Messages) -> Tuple[KeyManager, Dict[str, Any], Optional[Dict[str, str]]]:
+        """Key manager, payload and extra headers for one provider/model."""
+        tools = {"tools": TOOL_SCHEMAS} if self.native_tools and self.mcp else {}
+
+        if provider == "groq":
+            return self.km_groq, {"model": model, "messages": messages, **tools}, None
+
+        if provider == "deepseek":
+            return self.km_deepseek, {"model": model, "messages": messages, **tools}, None
+
         payload = {
             "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
+            "messages": messages,
+            "temperature": 0.2,
+            **tools
         }
-        
         headers = {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost",
             "X-Title": "Jarvis"
         }
-        
-        try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=45)
-            
-            if not resp.ok:
-                logger.error(f"OpenRouter Error ({model}): {resp.status_code} - {resp.text}")
-                self.km_openrouter.report_failure(key, status=resp.status_code)
-                resp.raise_for_status()
-            
-            data = resp.json()
-            return data["choices"][0]["message"]["content"]
-            
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                 logger.error(f"OpenRouter Network Error Body: {e.response.text}")
-            self.km_openrouter.report_failure(key, status=getattr(e.response, 'status_code', 0) if e.response else 0)
-            raise e
-
-    def _call_groq(self, prompt: str) -> str:
-        key = self.km_groq.get_key()
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        
+        return self.km_openrouter, payload, headers
+
+    def _headers(self, key: str, extra_headers: Optional[Dict[str, str]]) -> Dict[str, str]:
         headers = {
             "Authorization": f"Bearer {key}",
             "Content-Type": "application/json"
         }
-        
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
+
+    async def _call_model(self, provider: str, model: str, messages: Messages) -> str:
+        """Sends a chat completion through the pooled client and reports key failures."""
+        km, payload, extra_headers = self._provider_request(provider, model, messages)
+        label = MODEL_LABELS.get((provider, model), model)
+        estimate = _estimate_tokens(messages)
+        key = await km.acquire(estimate)
+        used = None
+
         try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=30)
-            
-            if not resp.ok:
-                logger.error(f"Groq Error: {resp.status_code} - {resp.text}")
-                self.km_groq.report_failure(key, status=resp.status_code)
+            try:
+                resp = await self.http.post_json(
+                    provider, "/chat/completions", payload, headers=self._headers(key, extra_headers)
+                )
+            except httpx.RequestError as e:
+                logger.error(f"{label} Network Error: {e!r}")
+                await km.areport_failure(key, status=0)
+                raise
+
+            await km.aobserve_headers(key, resp.headers)
+            if not resp.is_success:
+                logger.error(f"{label} Error: {resp.status_code} - {resp.text}")
+                await km.areport_failure(
+                    key, status=resp.status_code, retry_after=parse_retry_after(resp.headers.get("retry-after"))
+                )
                 resp.raise_for_status()
-                
+
             data = resp.json()
-            return data["choices"][0]["message"]["content"]
-            
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                 logger.error(f"Groq Network Error Body: {e.response.text}")
-            self.km_groq.report_failure(key, status=getattr(e.response, 'status_code', 0) if e.response else 0)
-            raise e
+            used = (data.get("usage") or {}).get("total_tokens")
+            message = data["choices"][0]["message"]
+            # Native function calls are turned into the text protocol
+            return (message.get("content") or "") + as_text(from_native(message.get("tool_calls")))
+        finally:
+            await km.arelease(key, estimate, used)
+
+    async def _stream_model(self, provider: str, model: str, messages: Messages) -> AsyncIterator[str]:
+        """Streams content deltas from an OpenAI-compatible SSE response."""
+        km, payload, extra_headers = self._provider_request(provider, model, messages)
+        payload["stream"] = True
+        label = MODEL_LABELS.get((provider, model), model)
+        estimate = _estimate_tokens(messages)
+        key = await km.acquire(estimate)
+        used = None
+        native = NativeCallAccumulator()
+
+        try:
+            async with self.http.stream_post(
+                provider, "/chat/completions", payload, headers=self._headers(key, extra_headers)
+            ) as resp:
+                await km.aobserve_headers(key, resp.headers)
+                if not resp.is_success:
+                    await resp.aread()
+                    logger.error(f"{label} Error: {resp.status_code} - {resp.text}")
+                    await km.areport_failure(
+                        key, status=resp.status_code, retry_after=parse_retry_after(resp.headers.get("retry-after"))
+                    )
+                    resp.raise_for_status()
+
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                    if usage:
+                        used = usage.get("total_tokens", used)
+
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    delta = choices[0].get("delta") or {}
+                    native.add(delta.get("tool_calls"))
+                    token = delta.get("content")
+                    if token:
+                        yield token
+
+                calls = native.calls()
+                if calls:
+                    yield as_text(calls)
+        except httpx.RequestError as e:
+            logger.error(f"{label} Network Error: {e!r}")
+            await km.areport_failure(key, status=0)
+            raise
+        finally:
+            await km.arelease(key, estimate, used)
@@ -0,0 +1,447 @@
+import os
+import re
+import stat
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Context lines that may be ignored at either end of a hunk that does not match
+DEFAULT_FUZZ = 2
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\ No newline at end of file"
+
+
+class PatchError(Exception):
+    pass
+
+
+class HunkError(PatchError):
+    """A hunk that does not apply; `index` is 1-based as in patch(1) output."""
+
+    def __init__(self, path: str, index: int, hunk: "Hunk", reason: str):
+        self.path = path
+        self.index = index
+        self.hunk = hunk
+        self.reason = reason
+        super().__init__(f"{path}: hunk #{index} ({hunk.header}): {reason}")
+
+
+class PatchRejected(PatchError):
+    """Every hunk of a file (or of a whole patch) that failed to apply."""
+
+    def __init__(self, errors: List[HunkError]):
+        self.errors = errors
+        super().__init__("\n".join(str(e) for e in errors))
+
+
+class Hunk:
+    """
+    One @@ block. `lines` keep their prefix (" ", "-" or "+"); the
+    `*_no_eol` flags record "\\ No newline at end of file" markers.
+    """
+
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.lines: List[str] = []
+        self.old_no_eol = False
+        self.new_no_eol = False
+
+    @property
+    def header(self) -> str:
+        return f"@@ -{self.old_start},{self.old_count} +{self.new_start},{self.new_count} @@"
+
+    def old_lines(self) -> List[str]:
+        return [l[1:] for l in self.lines if l[0] in " -"]
+
+    def new_lines(self) -> List[str]:
+        return [l[1:] for l in self.lines if l[0] in " +"]
+
+    def trimmed(self, head: int, tail: int) -> Optional["Hunk"]:
+        """Copy without `head` leading / `tail` trailing context lines (None if there are fewer)."""
+        lines = self.lines
+        if head + tail > len(lines) or any(l[0] != " " for l in lines[:head]):
+            return None
+        if tail and any(l[0] != " " for l in lines[len(lines) - tail:]):
+            return None
+        hunk = Hunk(self.old_start + head, self.old_count - head - tail, self.new_start + head, self.new_count - head - tail)
+        hunk.lines = lines[head:len(lines) - tail]
+        # A marker belongs to the last line, which trimming the tail removes
+        hunk.old_no_eol = self.old_no_eol and not tail
+        hunk.new_no_eol = self.new_no_eol and not tail
+        return hunk
+
+
+class FilePatch:
+    def __init__(self, old_path: Optional[str], new_path: Optional[str]):
+        self.old_path = old_path  # None for /dev/null (file creation)
+        self.new_path = new_path  # None for /dev/null (file deletion)
+        self.hunks: List[Hunk] = []
+
+    @property
+    def path(self) -> str:
+        return self.new_path or self.old_path or ""
+
+
+def _strip_prefix(path: str) -> Optional[str]:
+    path = path.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+def parse_patch(text: str) -> List[FilePatch]:
+    """
+    Parses a unified diff (one or more files). Lines before the first
+    "---" header ("diff --git", "index ...", prose) are skipped. Hunk
+    bodies are read by their header counts; models often get those wrong,
+    so a body also ends at the next header, and blank lines inside it are
+    taken as empty context lines.
+    """
+    lines = text.splitlines()
+    patches: List[FilePatch] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            patch = FilePatch(_strip_prefix(line[4:]), _strip_prefix(lines[i + 1][4:]))
+            patches.append(patch)
+            i += 2
+            continue
+        if line.startswith("@@"):
+            if not patches:
+                raise PatchError("Invalid diff: hunk before any '---' / '+++' header")
+            hunk, i = _parse_hunk(lines, i)
+            patches[-1].hunks.append(hunk)
+            continue
+        i += 1
+
+    if not patches:
+        raise PatchError("Invalid diff: missing '---' header")
+    for patch in patches:
+        if not patch.hunks:
+            raise PatchError(f"Invalid diff: no hunks found for {patch.path}")
+    return patches
+
+
+def _parse_hunk(lines: List[str], i: int) -> Tuple[Hunk, int]:
+    m = _HUNK_HEADER.match(lines[i])
+    if not m:
+        raise PatchError(f"Invalid hunk header: {lines[i]!r}")
+    old_start, old_count, new_start, new_count = m.groups()
+    hunk = Hunk(
+        int(old_start), 1 if old_count is None else int(old_count),
+        int(new_start), 1 if new_count is None else int(new_count),
+    )
+    i += 1
+    old_seen = new_seen = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("@@") or line.startswith("diff "):
+            break
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            break
+        if line.startswith(_NO_NEWLINE[:12]):
+            last = hunk.lines[-1][0] if hunk.lines else " "
+            hunk.old_no_eol |= last in " -"
+            hunk.new_no_eol |= last in " +"
+            i += 1
+            continue
+        if old_seen >= hunk.old_count and new_seen >= hunk.new_count and (not line or line[0] not in "+-"):
+            # Counts are satisfied: the rest is trailing prose or blank lines
+            break
+        if not line:
+            line = " "
+        elif line[0] not in " +-":
+            break
+        hunk.lines.append(line)
+        old_seen += line[0] in " -"
+        new_seen += line[0] in " +"
+        i += 1
+    return hunk, i
+
+
+# ---------------- applying ---------------- #
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _candidates(hint: int, lo: int, hi: int) -> Iterator[int]:
+    """Positions in [lo, hi], nearest to `hint` first."""
+    hint = min(max(hint, lo), hi)
+    yield hint
+    for delta in range(1, max(hint - lo, hi - hint) + 1):
+        if hint - delta >= lo:
+            yield hint - delta
+        if hint + delta <= hi:
+            yield hint + delta
+
+
+def _locate(lines: List[str], old: List[str], hint: int, lo: int) -> Optional[int]:
+    """Where `old` occurs in `lines` at or after `lo`: exactly, else ignoring whitespace."""
+    hi = len(lines) - len(old)
+    if hi < lo:
+        return None
+    if not old:
+        return min(max(hint, lo), len(lines))
+    for p in _candidates(hint, lo, hi):
+        if lines[p:p + len(old)] == old:
+            return p
+    wanted = [_normalize(l) for l in old]
+    for p in _candidates(hint, lo, hi):
+        if _normalize(lines[p]) == wanted[0]:
+            if [_normalize(l) for l in lines[p:p + len(old)]] == wanted:
+                return p
+    return None
+
+
+def _mismatch(lines: List[str], old: List[str], at: int) -> str:
+    """Describes the first line where `old` differs from the file at `at`."""
+    for k, expected in enumerate(old):
+        actual = lines[at + k] if at + k < len(lines) else None
+        if actual is None:
+            return f"expected {expected!r} at line {at + k + 1}, found end of file"
+        if _normalize(actual) != _normalize(expected):
+            return f"expected {expected!r} at line {at + k + 1}, found {actual!r}"
+    return f"not found near line {at + 1}"
+
+
+def apply_hunks(text: str, hunks: List[Hunk], path: str = "", fuzz: int = DEFAULT_FUZZ) -> str:
+    """
+    Applies `hunks` to `text` and returns the new text.
+    - each hunk is looked for at its line number (shifted by what earlier
+      hunks added/removed), then nearest first anywhere after the previous
+      hunk; exact matches win over whitespace-insensitive ones
+    - failing that, up to `fuzz` context lines are ignored at each end
+    - context lines keep the file's own text; line endings and the final
+      newline are preserved unless a "No newline" marker says otherwise
+    Raises PatchRejected listing a HunkError ("Context mismatch ...") for
+    every hunk that fails; the others are still checked.
+    """
+    eol = "\r\n" if "\r\n" in text else "\n"
+    final_newline = text.endswith("\n")
+    lines = text.split(eol) if text else []
+    if final_newline:
+        lines.pop()
+
+    out: List[str] = []
+    pos = 0        # next unconsumed line of `lines`
+    offset = 0     # net lines added by applied hunks
+    errors: List[HunkError] = []
+    for index, hunk in enumerate(hunks, 1):
+        hint = (hunk.old_start - 1 if hunk.old_count else hunk.old_start) + offset
+        found = None
+        for level in range(fuzz + 1):
+            for head, tail in ((level, level), (level, 0), (0, level)) if level else ((0, 0),):
+                candidate = hunk.trimmed(head, tail)
+                if candidate is None:
+                    continue
+                at = _locate(lines, candidate.old_lines(), hint + head, pos)
+                if at is not None:
+                    found = (candidate, at)
+                    break
+            if found:
+                break
+        if found is None:
+            reason = "Context mismatch: " + _mismatch(lines, hunk.old_lines(), max(hint, pos))
+            errors.append(HunkError(path, index, hunk, reason))
+            continue
+
+        hunk, at = found
+        out.extend(lines[pos:at])
+        cursor = at
+        for line in hunk.lines:
+            if line[0] == " ":
+                out.append(lines[cursor])
+                cursor += 1
+            elif line[0] == "-":
+                cursor += 1
+            else:
+                out.append(line[1:])
+        offset += len(hunk.new_lines()) - len(hunk.old_lines())
+        pos = cursor
+        if pos == len(lines):
+            if hunk.new_no_eol:
+                final_newline = False
+            elif hunk.old_no_eol or not lines:
+                final_newline = True
+
+    if errors:
+        raise PatchRejected(errors)
+    out.extend(lines[pos:])
+    if not out:
+        return ""
+    return eol.join(out) + (eol if final_newline else "")
+
+
+class _Change:
+    def __init__(self, rel_path: str, path: str, original: Optional[str], patched: Optional[str], stamp):
+        self.rel_path = rel_path
+        self.path = path
+        self.original = original  # None: the patch creates the file
+        self.patched = patched    # None: the patch deletes the file
+        self.stamp = stamp        # (mtime_ns, size) when prepared
+        self.mode: Optional[int] = None
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class PatchTransaction:
+    """
+    Applies a multi-file patch all-or-nothing under `root`.
+    - prepare(): resolves every path inside `root` and applies every hunk
+      in memory; all failing hunks of all files are reported together
+    - commit(): writes every new file to a temp file next to its target,
+      then renames them into place; if anything fails (including a file
+      changed on disk since prepare), already replaced files are restored
+      and created ones removed
+    """
+
+    def __init__(self, root: str, fuzz: int = DEFAULT_FUZZ):
+        self.root = os.path.realpath(root)
+        self.fuzz = fuzz
+        self.changes: List[_Change] = []
+
+    def resolve(self, rel_path: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, rel_path))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise PatchError(f"Access denied: outside project: {rel_path}")
+        return path
+
+    def prepare(self, patches: List[FilePatch]) -> "PatchTransaction":
+        self.changes = []
+        errors: List[HunkError] = []
+        for patch in _merge_by_path(patches):
+            rel_path = patch.path
+            path = self.resolve(rel_path)
+            stamp = _stamp(path)
+            if patch.old_path is None:
+                if stamp is not None:
+                    raise PatchError(f"File already exists: {rel_path}")
+                original = None
+            else:
+                if stamp is None:
+                    raise PatchError(f"Target file does not exist: {rel_path}")
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    original = f.read()
+            try:
+                patched = apply_hunks(original or "", patch.hunks, path=rel_path, fuzz=self.fuzz)
+            except PatchRejected as e:
+                errors.extend(e.errors)
+                continue
+            if patch.new_path is None:
+                if patched.strip():
+                    raise PatchError(f"Deletion of {rel_path} leaves content behind")
+                patched = None
+            self.changes.append(_Change(rel_path, path, original, patched, stamp))
+        if errors:
+            raise PatchRejected(errors)
+        return self
+
+    def commit(self) -> List[str]:
+        """Writes the prepared changes; returns the relative paths written."""
+        staged: List[Tuple[_Change, str]] = []
+        done: List[_Change] = []
+        created_dirs: List[str] = []
+        try:
+            for change in self.changes:
+                if _stamp(change.path) != change.stamp:
+                    raise PatchError(f"{change.rel_path} changed on disk since the patch was checked")
+                if change.patched is None:
+                    staged.append((change, ""))
+                    continue
+                directory = os.path.dirname(change.path)
+                if not os.path.isdir(directory):
+                    created_dirs.extend(_missing_dirs(directory))
+                    os.makedirs(directory)
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix=".jarvis-", suffix=".tmp")
+                staged.append((change, tmp))
+                with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                    f.write(change.patched)
+                if change.stamp is not None:
+                    change.mode = stat.S_IMODE(os.stat(change.path).st_mode)
+                    os.chmod(tmp, change.mode)
+
+            for change, tmp in staged:
+                if tmp:
+                    os.replace(tmp, change.path)
+                else:
+                    change.mode = stat.S_IMODE(os.stat(change.path).st_mode)
+                    os.remove(change.path)
+                done.append(change)
+        except BaseException:
+            for change, tmp in staged:
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
+            self._rollback(done, created_dirs)
+            raise
+        return [change.rel_path for change in self.changes]
+
+    def _rollback(self, done: List[_Change], created_dirs: List[str]):
+        for change in reversed(done):
+            try:
+                if change.original is None:
+                    os.remove(change.path)
+                else:
+                    write_atomic(change.path, change.original)
+                    if change.mode is not None:
+                        os.chmod(change.path, change.mode)
+            except OSError:
+                pass
+        for directory in reversed(created_dirs):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+
+def _merge_by_path(patches: List[FilePatch]) -> List[FilePatch]:
+    """One FilePatch per path: repeated sections for a file are combined in line order."""
+    merged: Dict[str, FilePatch] = {}
+    for patch in patches:
+        if patch.path not in merged:
+            merged[patch.path] = FilePatch(patch.old_path, patch.new_path)
+        merged[patch.path].hunks.extend(patch.hunks)
+    for patch in merged.values():
+        patch.hunks.sort(key=lambda h: h.old_start)
+    return list(merged.values())
+
+
+def _missing_dirs(directory: str) -> List[str]:
+    """`directory` and its missing parents, outermost first."""
+    missing = []
+    while directory and not os.path.isdir(directory):
+        missing.append(directory)
+        directory = os.path.dirname(directory)
+    return missing[::-1]
+
+
+def write_atomic(path: str, text: str):
+    """Replaces `path` via a temp file in the same directory + rename, keeping its mode."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".jarvis-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,21 @@
+import os
+import hashlib
+
+
+def cache_dir(*parts: str) -> str:
+    """
+    Local state directory for JARVIS (caches, indexes).
+    Defaults to ~/.cache/jarvis, override with JARVIS_CACHE_DIR.
+    """
+    base = os.environ.get("JARVIS_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "jarvis"
+    )
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def project_cache_dir(project_root: str) -> str:
+    """Per-project state directory, keyed by a hash of the absolute root."""
+    digest = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return cache_dir("projects", digest)
@@ -1,45 +1,321 @@
 import os
+import json
+import math
+import heapq
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .paths import project_cache_dir
+from .project_index import hash_file
+from .feature_detector import FeatureDetector
+from .retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_EXTENSIONS = (".html", ".js", ".css", ".py")
+
+# Bump whenever _summarize_file changes so cached summaries are redone
+# (rule changes are covered by the detector fingerprint)
+SUMMARIZER_VERSION = 2
+
+# Summaries that say nothing about a file (left out of directory tags)
+PLAIN_SUMMARIES = ("General code file", "Could not read file.")
+
+
+class _Dir:
+    """Directory node of the summary tree; counts and tags include subdirectories."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: List[str] = []
+        self.dirs: Dict[str, "_Dir"] = {}
+        self.file_count = 0
+        self.tags: Counter = Counter()
 
 class ProjectContextLoader:
-    def __init__(self, project_root: str):
+    def __init__(
+        self,
+        project_root: str,
+        files: Optional[List[str]] = None,
+        hashes: Optional[Dict[str, str]] = None,
+        cache_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        detector: Optional[FeatureDetector] = None,
+    ):
+        """
+        `files`: relative paths from ContextEngine's index. When given, the
+        loader reuses that walk instead of scanning the tree again.
+        `hashes`: rel path -> content hash from the same index, so unchanged
+        files are recognised without reading them.
+
+        Summaries are cached on disk by content hash: a reload only reads
+        and summarizes files whose content changed, on a thread pool
+        (JARVIS_SUMMARY_WORKERS).
+        `detector`: summary rules, defaults to the built-in ones plus
+        JARVIS_SUMMARY_RULES.
+        """
         self.project_root = project_root
-        self.file_summaries = {}
+        self.files = files
+        self.detector = detector or FeatureDetector.from_env()
+        self.hashes = hashes or {}
+        self.cache_path = cache_path or os.path.join(project_cache_dir(project_root), "summaries.json")
+        self.max_workers = max_workers or int(
+            os.environ.get("JARVIS_SUMMARY_WORKERS", min(8, (os.cpu_count() or 1) + 4))
+        )
+
+        # rel path -> summary (rel paths keep same-named files apart)
+        self.file_summaries: Dict[str, str] = {}
+        # content hash -> summary
+        self.cache: Dict[str, str] = {}
+        self.summarized = 0
+
+        # Summary layout: "flat" (a line per file), "tree" (by directory) or
+        # "auto" (tree once there are more than `flat_limit` files)
+        self.mode = os.environ.get("JARVIS_SUMMARY_MODE", "auto")
+        self.flat_limit = int(os.environ.get("JARVIS_SUMMARY_FLAT_FILES", 60))
+        self.max_lines = int(os.environ.get("JARVIS_SUMMARY_MAX_LINES", 120))
+        # Files matching the message that are listed (with their folders expanded)
+        self.expand_files = int(os.environ.get("JARVIS_SUMMARY_EXPAND_FILES", 20))
+        # Built on first use after a change; renders cached by expanded set
+        self._tree: Optional[_Dir] = None
+        # rel path -> (words of the path, words of its feature tags)
+        self._path_terms: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self._term_counts: Counter = Counter()
+        self._rendered: "OrderedDict[Tuple, str]" = OrderedDict()
+        # Watcher updates (apply_changes) race with prompt rendering
+        self._lock = threading.RLock()
 
     def load(self):
+        with self._lock:
+            self._load_cache()
+            self.file_summaries = self._summarize_many(self._candidate_files())
+            self._save_cache()
+            self._invalidate_tree()
+
+    def apply_changes(self, changes: Dict[str, List[str]], hashes: Optional[Dict[str, str]] = None) -> bool:
+        """Re-summarizes only added/modified files, drops removed ones. True if anything changed."""
+        with self._lock:
+            return self._apply_changes(changes, hashes)
+
+    def _apply_changes(self, changes: Dict[str, List[str]], hashes: Optional[Dict[str, str]]) -> bool:
+        if hashes:
+            self.hashes.update(hashes)
+
+        touched = False
+        for rel_path in changes.get("removed", []):
+            self.hashes.pop(rel_path, None)
+            touched |= self.file_summaries.pop(rel_path, None) is not None
+
+        changed = [
+            p for p in changes.get("added", []) + changes.get("modified", [])
+            if p.endswith(SUMMARY_EXTENSIONS)
+        ]
+        if changed:
+            for rel_path in changed:
+                if not hashes or rel_path not in hashes:
+                    self.hashes.pop(rel_path, None)  # stale, rehash from disk
+            self.file_summaries.update(self._summarize_many(changed))
+            self.file_summaries = dict(sorted(self.file_summaries.items()))
+            self._save_cache()
+            touched = True
+        if touched:
+            self._invalidate_tree()
+        return touched
+
+    def _summarize_many(self, rel_paths: List[str]) -> Dict[str, str]:
+        summaries: Dict[str, str] = {}
+        missing: Dict[str, List[str]] = {}
+
+        for rel_path in rel_paths:
+            digest = self._hash(rel_path)
+            if digest is None:
+                summaries[rel_path] = "Could not read file."
+            elif digest in self.cache:
+                summaries[rel_path] = self.cache[digest]
+            else:
+                # Identical contents are summarized once
+                missing.setdefault(digest, []).append(rel_path)
+
+        if missing:
+            jobs = [(digest, paths[0]) for digest, paths in missing.items()]
+            workers = max(1, min(self.max_workers, len(jobs)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(
+                    lambda job: self._summarize_file(os.path.join(self.project_root, job[1])), jobs
+                )
+                for (digest, _), summary in zip(jobs, results):
+                    self.cache[digest] = summary
+                    for rel_path in missing[digest]:
+                        summaries[rel_path] = summary
+            self.summarized += len(jobs)
+
+        return dict(sorted(summaries.items()))
+
+    def _hash(self, rel_path: str) -> Optional[str]:
+        digest = self.hashes.get(rel_path)
+        if digest is None:
+            try:
+                digest = hash_file(os.path.join(self.project_root, rel_path))
+            except OSError:
+                return None
+            self.hashes[rel_path] = digest
+        return digest
+
+    # ---------------- cache persistence ---------------- #
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self._cache_version():
+            self.cache = data.get("summaries", {})
+
+    def _save_cache(self):
+        # Only keep summaries of contents that still exist in the project
+        live = {self.hashes[p] for p in self.file_summaries if p in self.hashes}
+        self.cache = {h: s for h, s in self.cache.items() if h in live}
+
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self._cache_version(), "summaries": self.cache}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save summary cache: {e}")
+
+    def _cache_version(self) -> str:
+        return f"{SUMMARIZER_VERSION}:{self.detector.fingerprint}"
+
+    def _candidate_files(self) -> List[str]:
+        if self.files is not None:
+            return [f for f in self.files if f.endswith(SUMMARY_EXTENSIONS)]
+
+        found = []
         for root, _, files in os.walk(self.project_root):
             for file in files:
-                if file.endswith((".html", ".js", ".css", ".py")):
-                    path = os.path.join(root, file)
-                    self.file_summaries[file] = self._summarize_file(path)
+                if file.endswith(SUMMARY_EXTENSIONS):
+                    found.append(os.path.relpath(os.path.join(root, file), self.project_root))
+        return found
 
     def _summarize_file(self, path: str) -> str:
         try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
+            features = self.detector.detect_file(path)
         except Exception:
             return "Could not read file."
+        return ", ".join(features) or "General code file"
+
+    # ---------------- rendering ---------------- #
+
+    def get_summary(self, message: str = "") -> str:
+        """
+        Project summary for a prompt. Small projects list every file; larger
+        ones (see `mode`) are summarized by directory with file counts and
+        rolled-up feature tags, expanding only the subtrees whose paths or
+        tags match `message`. Output stays within `max_lines` lines.
+        """
+        with self._lock:
+            if self.mode == "flat" or (self.mode == "auto" and len(self.file_summaries) <= self.flat_limit):
+                return "\n".join(f"- {file}: {desc}" for file, desc in self.file_summaries.items())
+
+            tree = self._build_tree()
+            relevant = self._relevant_files(message)
+            key = tuple(relevant)
+            summary = self._rendered.get(key)
+            if summary is None:
+                summary = self._render_tree(tree, relevant)
+                self._rendered[key] = summary
+                while len(self._rendered) > 32:
+                    self._rendered.popitem(last=False)
+            else:
+                self._rendered.move_to_end(key)
+            return summary
+
+    def _invalidate_tree(self):
+        self._tree = None
+        self._path_terms = {}
+        self._term_counts = Counter()
+        self._rendered.clear()
+
+    def _build_tree(self) -> _Dir:
+        if self._tree is not None:
+            return self._tree
+        root = _Dir("")
+        for rel_path, desc in self.file_summaries.items():
+            tags = [t for t in desc.split(", ") if t not in PLAIN_SUMMARIES]
+            node = root
+            node.file_count += 1
+            node.tags.update(tags)
+            parts = rel_path.split(os.sep)
+            for i, name in enumerate(parts[:-1]):
+                node = node.dirs.setdefault(name, _Dir(os.sep.join(parts[:i + 1])))
+                node.file_count += 1
+                node.tags.update(tags)
+            node.files.append(rel_path)
+            # Path and feature words a message may refer to
+            path_words = frozenset(tokenize(rel_path))
+            tag_words = frozenset(tokenize(" ".join(tags))) - path_words
+            self._path_terms[rel_path] = (path_words, tag_words)
+            self._term_counts.update(path_words | tag_words)
+        self._tree = root
+        return root
 
-        summary = []
+    def _relevant_files(self, message: str) -> List[str]:
+        terms = set(tokenize(message)) if message else set()
+        if not terms:
+            return []
+        # Rare words (a file or folder name) outweigh common ones ("src");
+        # a word in the path counts more than the same word in a feature tag
+        total = len(self._path_terms)
+        weight = {t: math.log(1 + total / self._term_counts[t]) for t in terms if t in self._term_counts}
+        scored = []
+        for rel_path, (path_words, tag_words) in self._path_terms.items():
+            score = sum(weight[t] for t in weight.keys() & path_words)
+            score += 0.5 * sum(weight[t] for t in weight.keys() & tag_words)
+            if score:
+                scored.append((score, rel_path))
+        best = heapq.nsmallest(self.expand_files, scored, key=lambda item: (-item[0], item[1]))
+        return sorted(rel_path for _, rel_path in best)
 
-        if "<html" in content.lower():
-            summary.append("HTML document")
+    def _render_tree(self, root: _Dir, relevant: List[str]) -> str:
+        relevant_set = set(relevant)
+        expanded = {""}
+        for rel_path in relevant:
+            parts = rel_path.split(os.sep)
+            expanded.update(os.sep.join(parts[:i]) for i in range(1, len(parts)))
 
-        if "three" in content.lower():
-            summary.append("Uses Three.js")
+        lines = [
+            f"{root.file_count} files, summarized by directory "
+            f"(directories related to the request are expanded):"
+        ]
 
-        if "particle" in content.lower():
-            summary.append("Contains particle system")
+        def walk(node: _Dir, depth: int):
+            indent = "  " * depth
+            for name in sorted(node.dirs):
+                child = node.dirs[name]
+                lines.append(f"{indent}- {child.path}{os.sep} ({child.file_count} files){_tags(child.tags)}")
+                if child.path in expanded:
+                    walk(child, depth + 1)
 
-        if "shapes" in content:
-            summary.append("Defines shapes object for layouts")
+            # Files of the root are listed when there are few of them
+            listed = [f for f in node.files if f in relevant_set or (node is root and len(node.files) <= 20)]
+            for rel_path in listed:
+                lines.append(f"{indent}- {rel_path}: {self.file_summaries[rel_path]}")
+            others = len(node.files) - len(listed)
+            if others:
+                lines.append(f"{indent}- ... {others} other file{'s' if others > 1 else ''}")
 
-        if "settarget" in content.lower():
-            summary.append("Uses setTarget() for particle positioning")
+        walk(root, 0)
+        if len(lines) > self.max_lines:
+            lines = lines[:self.max_lines] + [f"... ({len(lines) - self.max_lines} more lines)"]
+        return "\n".join(lines)
 
-        return ", ".join(summary) or "General code file"
 
-    def get_summary(self) -> str:
-        output = ["PROJECT SUMMARY:"]
-        for file, desc in self.file_summaries.items():
-            output.append(f"- {file}: {desc}")
-        return "\n".join(output)
+def _tags(tags: Counter, limit: int = 3) -> str:
+    if not tags:
+        return ""
+    return ": " + ", ".join(f"{tag} ({n})" for tag, n in tags.most_common(limit))
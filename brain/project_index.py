@@ -0,0 +1,239 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .paths import project_cache_dir
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ProjectIndex:
+    """
+    Persistent index of a project tree: path -> size, mtime, content hash.
+    Stored as JSON in the per-project cache dir and refreshed incrementally:
+    - directories whose mtime is unchanged reuse their cached listing
+      (no scandir), only their files are re-stat'ed
+    - files whose size + mtime are unchanged keep their hash (no read)
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ignore_names: Iterable[str] = (),
+        ignore_suffixes: Iterable[str] = (),
+        path: Optional[str] = None,
+    ):
+        self.root = os.path.abspath(root)
+        self.ignore_names = set(ignore_names)
+        self.ignore_suffixes = tuple(ignore_suffixes)
+        self.path = path or os.path.join(project_cache_dir(self.root), "index.json")
+
+        # rel_path -> {"size", "mtime_ns", "hash"}
+        self.files: Dict[str, Dict] = {}
+        # rel_dir -> {"mtime_ns", "dirs": [...], "files": [...]}
+        self.dirs: Dict[str, Dict] = {}
+        self.fingerprint = ""
+
+    # ---------------- persistence ---------------- #
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if (
+            data.get("version") != INDEX_VERSION
+            or data.get("root") != self.root
+            or data.get("rules") != self._rules()
+        ):
+            return False
+
+        self.files = data.get("files", {})
+        self.dirs = data.get("dirs", {})
+        self.fingerprint = data.get("fingerprint", "")
+        return True
+
+    def save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "rules": self._rules(),
+            "fingerprint": self.fingerprint,
+            "files": self.files,
+            "dirs": self.dirs,
+        }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save project index: {e}")
+
+    def _rules(self) -> List[str]:
+        """Ignore rules baked into cached listings; a change invalidates them."""
+        return sorted(self.ignore_names) + list(self.ignore_suffixes)
+
+    # ---------------- scanning ---------------- #
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Brings the index up to date; returns {"added", "modified", "removed"} rel paths."""
+        changes: Dict[str, List[str]] = {"added": [], "modified": [], "removed": []}
+        files: Dict[str, Dict] = {}
+        dirs: Dict[str, Dict] = {}
+
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            full_dir = os.path.join(self.root, rel_dir)
+            try:
+                mtime_ns = os.stat(full_dir).st_mtime_ns
+            except OSError:
+                continue
+
+            cached = self.dirs.get(rel_dir)
+            if cached and cached["mtime_ns"] == mtime_ns:
+                subdirs, names = cached["dirs"], cached["files"]
+            else:
+                subdirs, names = self._list_dir(full_dir)
+            dirs[rel_dir] = {"mtime_ns": mtime_ns, "dirs": subdirs, "files": names}
+
+            for name in subdirs:
+                stack.append(os.path.join(rel_dir, name))
+
+            for name in names:
+                rel_path = os.path.join(rel_dir, name)
+                entry, change = self._stat_file(rel_path)
+                if entry is None:
+                    continue
+                files[rel_path] = entry
+                if change:
+                    changes[change].append(rel_path)
+
+        changes["removed"] = sorted(set(self.files) - set(files))
+        self.files = files
+        self.dirs = dirs
+        self._update_fingerprint()
+        return changes
+
+    def update_paths(self, rel_paths: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Applies watcher events without walking the tree: each rel path is a
+        file or directory that was created, modified, deleted or renamed.
+        Listings of the touched directories are dropped so the next full
+        refresh re-lists them.
+        """
+        changes: Dict[str, List[str]] = {"added": [], "modified": [], "removed": []}
+        for rel_path in sorted(set(rel_paths)):
+            rel_path = os.path.normpath(rel_path)
+            full_path = os.path.join(self.root, rel_path)
+            self.dirs.pop(os.path.dirname(rel_path), None)
+
+            if os.path.isdir(full_path):
+                targets = self._walk_files(rel_path)
+            elif os.path.isfile(full_path) and not self._ignored(rel_path):
+                targets = [rel_path]
+            else:
+                targets = []
+
+            # Whatever the index had at or under this path but is gone now
+            prefix = rel_path + os.sep
+            keep = set(targets)
+            stale = [p for p in self.files if (p == rel_path or p.startswith(prefix)) and p not in keep]
+            for p in stale:
+                del self.files[p]
+                changes["removed"].append(p)
+            if stale:
+                for d in [d for d in self.dirs if d == rel_path or d.startswith(prefix)]:
+                    del self.dirs[d]
+
+            for p in targets:
+                entry, change = self._stat_file(p)
+                if entry is None:
+                    if self.files.pop(p, None) is not None:
+                        changes["removed"].append(p)
+                    continue
+                self.files[p] = entry
+                if change:
+                    changes[change].append(p)
+
+        if any(changes.values()):
+            self._update_fingerprint()
+        return changes
+
+    def _ignored(self, rel_path: str) -> bool:
+        parts = rel_path.split(os.sep)
+        return any(p in self.ignore_names for p in parts) or rel_path.endswith(self.ignore_suffixes)
+
+    def _walk_files(self, rel_dir: str) -> List[str]:
+        if self._ignored(rel_dir):
+            return []
+        out = []
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            subdirs, names = self._list_dir(os.path.join(self.root, current))
+            stack.extend(os.path.join(current, d) for d in subdirs)
+            out.extend(os.path.join(current, n) for n in names)
+        return out
+
+    def _list_dir(self, full_dir: str) -> Tuple[List[str], List[str]]:
+        subdirs, names = [], []
+        try:
+            with os.scandir(full_dir) as it:
+                for entry in it:
+                    if entry.name in self.ignore_names:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file() and not entry.name.endswith(self.ignore_suffixes):
+                        names.append(entry.name)
+        except OSError:
+            pass
+        return sorted(subdirs), sorted(names)
+
+    def _stat_file(self, rel_path: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """(entry, "added" | "modified" | None); entry is None if the file vanished."""
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None, None
+
+        previous = self.files.get(rel_path)
+        if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+            return previous, None
+
+        try:
+            digest = hash_file(full_path)
+        except OSError:
+            return None, None
+
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        if previous is None:
+            return entry, "added"
+        # Touched but identical content is not a change
+        return entry, ("modified" if previous["hash"] != digest else None)
+
+    def _update_fingerprint(self):
+        h = hashlib.sha1(self.root.encode("utf-8"))
+        for rel_path in sorted(self.files):
+            h.update(f"{rel_path}\0{self.files[rel_path]['hash']}\n".encode("utf-8"))
+        self.fingerprint = h.hexdigest()
+
+    def paths(self) -> List[str]:
+        return sorted(self.files)
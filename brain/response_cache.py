@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for model responses.
+    - Memory: LRU of the most recent `max_entries` results
+    - Disk: SQLite table, evicted by least-recent access once it exceeds
+      `max_disk_bytes`
+    Every entry carries an expiry (`ttl` seconds by default).
+
+    Env: JARVIS_CACHE_TTL (3600), JARVIS_CACHE_MAX_ENTRIES (256),
+         JARVIS_CACHE_MAX_MB (50)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.ttl = ttl if ttl is not None else float(os.environ.get("JARVIS_CACHE_TTL", 3600))
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("JARVIS_CACHE_MAX_ENTRIES", 256))
+        self.max_disk_bytes = (
+            max_disk_bytes if max_disk_bytes is not None
+            else int(float(os.environ.get("JARVIS_CACHE_MAX_MB", 50)) * 1024 * 1024)
+        )
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.path = path or os.path.join(cache_dir(), "responses.sqlite3")
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable hash of the parts that determine a response."""
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        data = json.dumps(value)
+        with self._lock:
+            self._remember(key, expires, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires, now),
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": rows,
+                "disk_bytes": size,
+            }
+
+    def _remember(self, key: str, expires: float, value: Dict[str, Any]):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        # Drop least recently used rows until under budget
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
@@ -0,0 +1,214 @@
+import os
+import re
+import math
+import heapq
+import logging
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Text files worth retrieving from
+RETRIEVAL_EXTENSIONS = (
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".html", ".css", ".json", ".md",
+    ".java", ".go", ".rs", ".c", ".h", ".cpp", ".cs", ".rb", ".php", ".sh",
+)
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "is", "it", "for", "on",
+    "with", "as", "be", "this", "that", "me", "my", "can", "you", "how", "what",
+    "add", "new", "make", "please", "code", "file", "give", "want", "do",
+}
+
+
+def _norm(token: str) -> str:
+    # Crude plural folding so "particle" finds "particles"
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Identifier-aware tokens: `setTarget` -> settarget, set, target;
+    `MAX_PARTICLES` -> max_particle, max, particle.
+    """
+    tokens = []
+    for ident in _IDENT.findall(text):
+        lowered = ident.lower()
+        parts = [p.lower() for p in _CAMEL.findall(ident.replace("_", " "))]
+        words = [lowered] + (parts if len(parts) > 1 else [])
+        tokens.extend(_norm(w) for w in words if len(w) > 1 and w not in STOPWORDS)
+    return tokens
+
+
+class Snippet:
+    def __init__(self, path: str, start: int, end: int, score: float):
+        self.path = path
+        self.start = start  # 1-based, inclusive
+        self.end = end
+        self.score = score
+
+    def __repr__(self):
+        return f"Snippet({self.path}:{self.start}-{self.end}, {self.score:.2f})"
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over fixed line windows of project files.
+    - each file is split into chunks of `chunk_lines` lines; a chunk is a
+      BM25 document, so hits point at the relevant part of a big file
+    - postings: term -> {(path, chunk_no): term frequency}
+    - `update(changes)` re-indexes only changed files (watcher friendly)
+    - chunk text is not kept; snippets are re-read from disk when rendered
+    """
+
+    def __init__(
+        self,
+        root: str,
+        chunk_lines: int = 40,
+        max_file_bytes: Optional[int] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.root = os.path.abspath(root)
+        self.chunk_lines = chunk_lines
+        self.max_file_bytes = max_file_bytes or int(
+            os.environ.get("JARVIS_RETRIEVAL_MAX_FILE_BYTES", 1024 * 1024)
+        )
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        # path -> [(start_line, end_line, length, term counts), ...]
+        self.chunks: Dict[str, List[Tuple[int, int, int, Counter]]] = {}
+        self.total_length = 0
+        self.chunk_count = 0
+        self._lock = threading.Lock()
+
+    def build(self, files: Iterable[str]):
+        for rel_path in files:
+            self._add_file(rel_path)
+        logger.info(f"Retrieval index: {len(self.chunks)} files, {self.chunk_count} chunks, {len(self.postings)} terms")
+
+    def update(self, changes: Dict[str, List[str]]):
+        for rel_path in changes.get("removed", []) + changes.get("modified", []):
+            self._remove_file(rel_path)
+        for rel_path in changes.get("modified", []) + changes.get("added", []):
+            self._add_file(rel_path)
+
+    def _add_file(self, rel_path: str):
+        if not rel_path.endswith(RETRIEVAL_EXTENSIONS):
+            return
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            if os.path.getsize(full_path) > self.max_file_bytes:
+                return
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+
+        entries = []
+        for start in range(0, len(lines), self.chunk_lines):
+            block = lines[start:start + self.chunk_lines]
+            # Path tokens make "the particle file" find particles.js
+            terms = tokenize("".join(block)) + tokenize(rel_path)
+            if terms:
+                entries.append((start + 1, start + len(block), len(terms), Counter(terms)))
+
+        with self._lock:
+            if rel_path in self.chunks:
+                self._remove_locked(rel_path)
+            self.chunks[rel_path] = entries
+            for no, (_, _, length, counts) in enumerate(entries):
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, {})[(rel_path, no)] = tf
+                self.total_length += length
+            self.chunk_count += len(entries)
+
+    def _remove_file(self, rel_path: str):
+        with self._lock:
+            self._remove_locked(rel_path)
+
+    def _remove_locked(self, rel_path: str):
+        entries = self.chunks.pop(rel_path, None)
+        if not entries:
+            return
+        for no, (_, _, length, counts) in enumerate(entries):
+            for term in counts:
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop((rel_path, no), None)
+                    if not docs:
+                        del self.postings[term]
+            self.total_length -= length
+        self.chunk_count -= len(entries)
+
+    # ---------------- querying ---------------- #
+
+    def search(self, query: str, k: int = 4) -> List[Snippet]:
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self.chunk_count:
+                return []
+            n = self.chunk_count
+            avgdl = self.total_length / n
+            scores: Dict[Tuple[str, int], float] = {}
+
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc, tf in docs.items():
+                    length = self.chunks[doc[0]][doc[1]][2]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avgdl)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                Snippet(path, self.chunks[path][no][0], self.chunks[path][no][1], score)
+                for (path, no), score in best
+            ]
+
+    def render(
+        self,
+        query: str,
+        k: int = 4,
+        max_chars: int = 6000,
+        exclude: Iterable[Tuple[str, int, int]] = (),
+    ) -> str:
+        """
+        Top-k snippets as a prompt section ("" when nothing matches).
+        `exclude`: (path, start, end) line ranges already in the prompt.
+        """
+        exclude = list(exclude)
+        blocks = []
+        used = 0
+        for hit in self.search(query, k + len(exclude)):
+            if len(blocks) >= k:
+                break
+            if any(p == hit.path and s <= hit.end and hit.start <= e for p, s, e in exclude):
+                continue
+            text = self._read_lines(hit.path, hit.start, hit.end)
+            if not text:
+                continue
+            block = f"file: {hit.path} (lines {hit.start}-{hit.end})\n```\n{text.rstrip()}\n```"
+            if used + len(block) > max_chars:
+                break
+            blocks.append(block)
+            used += len(block)
+        return "\n\n".join(blocks)
+
+    def _read_lines(self, rel_path: str, start: int, end: int) -> str:
+        try:
+            with open(os.path.join(self.root, rel_path), "r", encoding="utf-8", errors="ignore") as f:
+                return "".join(islice(f, start - 1, end))
+        except OSError:
+            return ""
@@ -0,0 +1,109 @@
+import asyncio
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _Broadcast:
+    """Events of one in-flight stream, replayable by late joiners."""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.cond = asyncio.Condition()
+        # Strong reference: the loop keeps only weak ones to running tasks
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work.
+    Callers with the same key while a call is in flight share its result
+    (`do`) or its event stream (`stream`) instead of starting another one.
+    The shared work runs in its own task, so one caller going away does not
+    cancel it for the others; a stream is cancelled once its last
+    subscriber has gone. State is kept per event loop.
+    """
+
+    def __init__(self):
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._streams: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _Broadcast]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            calls[key] = task
+
+            def forget(done: asyncio.Task):
+                if calls.get(key) is done:
+                    del calls[key]
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        streams = self._streams.setdefault(asyncio.get_running_loop(), {})
+        broadcast = streams.get(key)
+        if broadcast is None:
+            broadcast = streams[key] = _Broadcast()
+            broadcast.task = asyncio.create_task(self._pump(streams, key, broadcast, factory()))
+        else:
+            self.coalesced += 1
+
+        broadcast.subscribers += 1
+        seen = 0
+        try:
+            while True:
+                async with broadcast.cond:
+                    await broadcast.cond.wait_for(lambda: len(broadcast.events) > seen or broadcast.done)
+                    pending = broadcast.events[seen:]
+                    finished = broadcast.done
+
+                for event in pending:
+                    yield event
+                seen += len(pending)
+
+                if finished and seen == len(broadcast.events):
+                    if broadcast.error:
+                        raise broadcast.error
+                    return
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Nobody is listening: stop pulling provider tokens
+                if streams.get(key) is broadcast:
+                    del streams[key]
+                broadcast.task.cancel()
+
+    async def _pump(self, streams: Dict[str, _Broadcast], key: str, broadcast: _Broadcast, agen: AsyncIterator[Any]):
+        try:
+            async for event in agen:
+                async with broadcast.cond:
+                    broadcast.events.append(event)
+                    broadcast.cond.notify_all()
+        except BaseException as e:
+            broadcast.error = e
+        finally:
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if streams.get(key) is broadcast:
+                del streams[key]
+            async with broadcast.cond:
+                broadcast.done = True
+                broadcast.cond.notify_all()
+
+    def in_flight(self) -> int:
+        return sum(len(calls) for calls in self._calls.values()) + sum(
+            len(streams) for streams in self._streams.values()
+        )
@@ -0,0 +1,400 @@
+import os
+import re
+import ast
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .paths import project_cache_dir
+
+logger = logging.getLogger(__name__)
+
+SYMBOLS_VERSION = 1
+
+PY_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx")
+HTML_EXTENSIONS = (".html", ".htm")
+SYMBOL_EXTENSIONS = PY_EXTENSIONS + JS_EXTENSIONS + HTML_EXTENSIONS
+
+
+def _symbol(name: str, kind: str, line: int, end: int, parent: Optional[str] = None) -> Dict:
+    sym = {"name": name, "kind": kind, "line": line, "end": end}
+    if parent:
+        sym["parent"] = parent
+    return sym
+
+
+# ---------------- Python ---------------- #
+
+def python_symbols(source: str) -> List[Dict]:
+    """Top-level functions/classes/assignments and class methods via `ast`."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    out = []
+
+    def visit(body, parent=None):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+                kind = "method" if parent else "function"
+                out.append(_symbol(node.name, kind, start, node.end_lineno, parent))
+            elif isinstance(node, ast.ClassDef):
+                start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+                out.append(_symbol(node.name, "class", start, node.end_lineno, parent))
+                visit(node.body, node.name)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and parent is None:
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        out.append(_symbol(target.id, "variable", node.lineno, node.end_lineno))
+
+    visit(tree.body)
+    return out
+
+
+# ---------------- JavaScript ---------------- #
+
+_JS_TOKEN = re.compile(
+    r"""
+    (?P<nl>\n)
+    | (?P<ws>[ \t\r\f\v]+)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<str>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+    | (?P<ident>[A-Za-z_$][\w$]*)
+    | (?P<num>\d[\w.]*)
+    | (?P<punct>=>|.)
+    """,
+    re.X | re.S,
+)
+
+_OPEN = {"{": "}", "(": ")", "[": "]"}
+_CLOSE = {"}", ")", "]"}
+_STATEMENT_START = {
+    "const", "let", "var", "function", "class", "export", "import",
+    "if", "for", "while", "return", "switch", "try", "do",
+}
+_METHOD_PREFIX = {"static", "async", "get", "set", "*"}
+
+
+def _js_tokens(source: str, first_line: int = 1) -> List[Tuple[str, str, int]]:
+    """(kind, text, line) with whitespace and comments dropped."""
+    tokens = []
+    line = first_line
+    for m in _JS_TOKEN.finditer(source):
+        kind = m.lastgroup
+        text = m.group()
+        if kind not in ("nl", "ws", "comment"):
+            tokens.append((kind, text, line))
+        line += text.count("\n")
+    return tokens
+
+
+def _match_brackets(tokens) -> Tuple[Dict[int, int], List[int]]:
+    """Index of each opening bracket's partner, and brace depth per token."""
+    match: Dict[int, int] = {}
+    depth: List[int] = []
+    stack: List[int] = []
+    braces = 0
+    for i, (kind, text, _) in enumerate(tokens):
+        if kind == "punct" and text in _CLOSE and stack:
+            j = stack.pop()
+            match[j] = i
+            if text == "}":
+                braces = max(0, braces - 1)
+        depth.append(braces)
+        if kind == "punct" and text in _OPEN:
+            stack.append(i)
+            if text == "{":
+                braces += 1
+    # Unbalanced (truncated / unparsable) groups run to the end
+    for j in stack:
+        match[j] = len(tokens) - 1
+    return match, depth
+
+
+def js_symbols(source: str, first_line: int = 1) -> List[Dict]:
+    """
+    Lightweight JS/TS scan, no full parser:
+    - `function f(...) {}` and `class C {}` at any depth, class methods
+    - top-level `const|let|var NAME = ...`; object literal values also
+      yield their keys (e.g. every layout in `const shapes = {...}`)
+    Line ranges come from bracket matching over the token stream.
+    """
+    tokens = _js_tokens(source, first_line)
+    if not tokens:
+        return []
+    match, depth = _match_brackets(tokens)
+    n = len(tokens)
+    out: List[Dict] = []
+
+    def text(i):
+        return tokens[i][1] if i < n else ""
+
+    def line(i):
+        return tokens[min(i, n - 1)][2]
+
+    def is_open(i, ch):
+        return i < n and tokens[i][0] == "punct" and tokens[i][1] == ch
+
+    def expression_end(start: int, stop=(";",)) -> int:
+        """Last token index of the expression starting at `start`."""
+        i, last = start, start
+        while i < n:
+            kind, t, ln = tokens[i]
+            if kind == "punct" and (t in stop or t in _CLOSE):
+                break
+            # No semicolon: a new statement on a later line ends it
+            if i > start and kind == "ident" and t in _STATEMENT_START and ln > line(last):
+                break
+            last = match[i] if kind == "punct" and t in _OPEN else i
+            i = last + 1
+        return last
+
+    def object_keys(open_i: int, parent: str):
+        i, close = open_i + 1, match[open_i]
+        while i < close:
+            kind, t, _ = tokens[i]
+            j = i
+            while text(j) in _METHOD_PREFIX and j + 1 < close and tokens[j + 1][0] in ("ident", "str"):
+                j += 1
+            if tokens[j][0] in ("ident", "str", "num") and text(j + 1) == ":":
+                name = tokens[j][1].strip("'\"`")
+                end = expression_end(j + 2, stop=(",",))
+                out.append(_symbol(name, "key", line(i), line(end), parent))
+                i = end + 1
+            elif tokens[j][0] == "ident" and is_open(j + 1, "("):
+                body = match[j + 1] + 1
+                end = match[body] if is_open(body, "{") else match[j + 1]
+                out.append(_symbol(tokens[j][1], "method", line(i), line(end), parent))
+                i = end + 1
+            elif kind == "punct" and t in _OPEN:
+                i = match[i] + 1
+            else:
+                i += 1
+
+    def class_members(open_i: int, parent: str):
+        i, close = open_i + 1, match[open_i]
+        while i < close:
+            j = i
+            while text(j) in _METHOD_PREFIX and j + 1 < close:
+                j += 1
+            if tokens[j][0] == "ident" and is_open(j + 1, "("):
+                body = match[j + 1] + 1
+                if is_open(body, "{"):
+                    out.append(_symbol(tokens[j][1], "method", line(i), line(match[body]), parent))
+                    i = match[body] + 1
+                    continue
+            if tokens[i][0] == "punct" and tokens[i][1] in _OPEN:
+                i = match[i] + 1
+            else:
+                i += 1
+
+    for i, (kind, t, ln) in enumerate(tokens):
+        if kind != "ident":
+            continue
+
+        if t == "function" and i + 1 < n:
+            j = i + 1
+            if text(j) == "*":
+                j += 1
+            if j < n and tokens[j][0] == "ident" and is_open(j + 1, "("):
+                body = match[j + 1] + 1
+                end = match[body] if is_open(body, "{") else match[j + 1]
+                out.append(_symbol(tokens[j][1], "function", ln, line(end)))
+
+        elif t == "class" and i + 1 < n and tokens[i + 1][0] == "ident":
+            j = i + 2
+            while j < n and not is_open(j, "{"):
+                j += 1
+            if j < n:
+                out.append(_symbol(tokens[i + 1][1], "class", ln, line(match[j])))
+                class_members(j, tokens[i + 1][1])
+
+        elif t in ("const", "let", "var") and depth[i] == 0 and i + 2 < n:
+            if tokens[i + 1][0] != "ident" or text(i + 2) != "=":
+                continue
+            name = tokens[i + 1][1]
+            value = i + 3
+            end = expression_end(value, stop=(";", ","))
+            kind_name = "variable"
+            if is_open(value, "{"):
+                kind_name = "object"
+            elif text(value) in ("function", "async") or text(value + 1) == "=>" or (
+                is_open(value, "(") and text(match[value] + 1) == "=>"
+            ):
+                kind_name = "function"
+            out.append(_symbol(name, kind_name, ln, line(end)))
+            if kind_name == "object":
+                object_keys(value, name)
+
+    return out
+
+
+_SCRIPT = re.compile(r"<script\b[^>]*>(.*?)</script\s*>", re.I | re.S)
+
+
+def html_symbols(source: str) -> List[Dict]:
+    """JS symbols of inline <script> blocks, with file line numbers."""
+    out = []
+    for m in _SCRIPT.finditer(source):
+        first_line = source.count("\n", 0, m.start(1)) + 1
+        out.extend(js_symbols(m.group(1), first_line))
+    return out
+
+
+def extract_symbols(rel_path: str, source: str) -> List[Dict]:
+    lowered = rel_path.lower()
+    if lowered.endswith(PY_EXTENSIONS):
+        return python_symbols(source)
+    if lowered.endswith(JS_EXTENSIONS):
+        return js_symbols(source)
+    if lowered.endswith(HTML_EXTENSIONS):
+        return html_symbols(source)
+    return []
+
+
+# ---------------- index ---------------- #
+
+_MENTION = re.compile(r"[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)?")
+
+class SymbolIndex:
+    """
+    Project-wide symbol table: name -> [(path, {kind, line, end, parent})].
+    - built from the ProjectIndex hashes: only files whose content hash
+      changed are re-parsed
+    - persisted as JSON next to the project index
+    """
+
+    def __init__(self, root: str, path: Optional[str] = None, max_file_bytes: int = 2 * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.path = path or os.path.join(project_cache_dir(self.root), "symbols.json")
+        self.max_file_bytes = max_file_bytes
+
+        # rel_path -> {"hash", "symbols": [...]}
+        self.files: Dict[str, Dict] = {}
+        self.by_name: Dict[str, List[Tuple[str, Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != SYMBOLS_VERSION or data.get("root") != self.root:
+            return False
+        with self._lock:
+            self.files = data.get("files", {})
+            self._rebuild_names()
+        return True
+
+    def save(self):
+        with self._lock:
+            data = {"version": SYMBOLS_VERSION, "root": self.root, "files": self.files}
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save symbol index: {e}")
+
+    def refresh(self, hashes: Dict[str, str]) -> int:
+        """Syncs with the file index (rel path -> content hash); returns files re-parsed or dropped."""
+        wanted = {p: h for p, h in hashes.items() if p.lower().endswith(SYMBOL_EXTENSIONS)}
+        parsed = {}
+        for rel_path, digest in wanted.items():
+            cached = self.files.get(rel_path)
+            if cached is None or cached["hash"] != digest:
+                parsed[rel_path] = {"hash": digest, "symbols": self._parse(rel_path)}
+
+        with self._lock:
+            stale = set(self.files) - set(wanted)
+            for rel_path in stale:
+                del self.files[rel_path]
+            self.files.update(parsed)
+            if parsed or stale:
+                self._rebuild_names()
+        return len(parsed) + len(stale)
+
+    def update(self, changes: Dict[str, List[str]], hashes: Dict[str, str]) -> int:
+        """Applies watcher changes (added/modified/removed); returns files re-parsed or dropped."""
+        touched = changes.get("added", []) + changes.get("modified", []) + changes.get("removed", [])
+        subset = {p: hashes[p] for p in touched if p in hashes}
+        parsed = {
+            p: {"hash": h, "symbols": self._parse(p)}
+            for p, h in subset.items() if p.lower().endswith(SYMBOL_EXTENSIONS)
+        }
+        with self._lock:
+            dropped = [p for p in changes.get("removed", []) if self.files.pop(p, None) is not None]
+            self.files.update(parsed)
+            if parsed or dropped:
+                self._rebuild_names()
+        return len(parsed) + len(dropped)
+
+    def _parse(self, rel_path: str) -> List[Dict]:
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            if os.path.getsize(full_path) > self.max_file_bytes:
+                return []
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                return extract_symbols(rel_path, f.read())
+        except OSError:
+            return []
+
+    def _rebuild_names(self):
+        by_name: Dict[str, List[Tuple[str, Dict]]] = {}
+        for rel_path in sorted(self.files):
+            for sym in self.files[rel_path]["symbols"]:
+                by_name.setdefault(sym["name"], []).append((rel_path, sym))
+        self.by_name = by_name
+
+    # ---------------- lookups ---------------- #
+
+    def find(self, name: str, path: Optional[str] = None) -> List[Tuple[str, Dict]]:
+        """Definitions of `name` ("shapes", or "shapes.cone" for a member), optionally in one file."""
+        parent = None
+        if "." in name:
+            parent, name = name.rsplit(".", 1)
+        hits = self.by_name.get(name, [])
+        return [
+            (p, s) for p, s in hits
+            if (path is None or p == path) and (parent is None or s.get("parent") == parent)
+        ]
+
+    def mentioned(self, text: str, limit: int = 3) -> List[Tuple[str, Dict]]:
+        """
+        Definitions of symbols named in free text ("add a cone to shapes"),
+        containers (classes/objects/functions) first, nested ones skipped.
+        """
+        rank = {"class": 0, "object": 0, "function": 0, "method": 1, "key": 1, "variable": 2}
+        candidates = []
+        for order, m in enumerate(_MENTION.finditer(text)):
+            name = m.group()
+            if len(name.rsplit(".", 1)[-1]) < 3:
+                continue
+            for rel_path, sym in self.find(name):
+                candidates.append((rank.get(sym["kind"], 2), order, rel_path, sym))
+
+        chosen: List[Tuple[str, Dict]] = []
+        for _, _, rel_path, sym in sorted(candidates, key=lambda c: (c[0], c[1])):
+            inside = any(
+                p == rel_path and s["line"] <= sym["line"] and sym["end"] <= s["end"]
+                for p, s in chosen
+            )
+            if not inside:
+                chosen.append((rel_path, sym))
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+    def symbols_in(self, rel_path: str) -> List[Dict]:
+        entry = self.files.get(rel_path)
+        return list(entry["symbols"]) if entry else []
+
+    def __len__(self):
+        return sum(len(e["symbols"]) for e in self.files.values())
@@ -0,0 +1,99 @@
+import os
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+
+from brain.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from brain.model_router import ModelRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("groq", failure_rate=0.5, min_calls=3, window=60, cooldown=30, clock=self.clock)
+
+    def test_opens_after_failure_rate(self):
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_single_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 31
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_old_outcomes_expire(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 120
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class FailingGroqRouter(ModelRouter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    async def _call_model(self, provider, model, prompt):
+        self.calls.append(provider)
+        if provider == "groq":
+            request = httpx.Request("POST", "http://groq/chat/completions")
+            raise httpx.HTTPStatusError("down", request=request, response=httpx.Response(503, request=request))
+        return "ok"
+
+
+class TestRouterBreakers(unittest.TestCase):
+    def setUp(self):
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_dead_provider_is_skipped(self):
+        router = FailingGroqRouter()
+
+        async def run():
+            for _ in range(4):
+                result = await router._call_chain(router._route("code"), "prompt")
+                self.assertEqual(result["provider"], "openrouter")
+
+        asyncio.run(run())
+        # Three failures open the breaker; the fourth request goes straight to OpenRouter
+        self.assertEqual(router.calls.count("groq"), 3)
+        self.assertEqual(router.status()["breakers"]["groq/llama-3.3-70b-versatile"]["state"], OPEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
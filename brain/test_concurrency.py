@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+
+from brain.concurrency import ConcurrencyLimiter, OverloadedError
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_runs_in_parallel_up_to_limit(self):
+        limiter = ConcurrencyLimiter(max_concurrent=3, max_queue=10)
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.active)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(job() for _ in range(9)))
+
+        asyncio.run(run())
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.active, 0)
+
+    def test_rejects_when_queue_full(self):
+        async def run():
+            limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1)
+            release = asyncio.Event()
+
+            async def hold():
+                async with limiter:
+                    await release.wait()
+
+            running = asyncio.create_task(hold())
+            queued = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+
+            with self.assertRaises(OverloadedError):
+                async with limiter:
+                    pass
+
+            release.set()
+            await asyncio.gather(running, queued)
+
+        asyncio.run(run())
+
+    def test_queue_timeout(self):
+        async def run():
+            limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout=0.01)
+            async with limiter:
+                with self.assertRaises(OverloadedError):
+                    async with limiter:
+                        pass
+
+        asyncio.run(run())
+
+    def test_zero_queue_timeout_fails_fast(self):
+        async def run():
+            limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout=0)
+            self.assertEqual(limiter.queue_timeout, 0)
+            async with limiter:
+                with self.assertRaises(OverloadedError):
+                    async with limiter:
+                        pass
+            # A free slot is still taken immediately
+            async with limiter:
+                self.assertEqual(limiter.active, 1)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
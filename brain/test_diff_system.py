@@ -1,5 +1,6 @@
 import os
 import unittest
+from unittest import mock
 from pathlib import Path
 import tempfile
 import shutil
@@ -96,5 +97,54 @@ class TestDiffSystem(unittest.TestCase):
         except Exception as e:
             self.assertIn("Context mismatch", str(e))
 
+class TestStreamingValidator(unittest.TestCase):
+    DIFF = (
+        "--- a/a.py\n+++ b/a.py\n"
+        "@@ -1,3 +1,4 @@\n def a():\n-    return 1\n+    x = 1\n+    return x\n\n"
+        "@@ -10,2 +11,1 @@\n-gone()\n kept()\n\\ No newline at end of file\n"
+        "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -5 +5 @@\n-old\n+new\n"
+    )
+
+    def test_stats_match_in_any_chunking(self):
+        stats = DiffValidator().validate(self.DIFF)
+        self.assertEqual((stats.added, stats.removed, stats.hunks), (3, 3, 3))
+        self.assertEqual([(f.new_path, f.added, f.removed) for f in stats.files], [("b/a.py", 2, 2), ("b/b.py", 1, 1)])
+        self.assertEqual(stats.files[0].hunks[0].context, 2)
+
+        for size in (1, 3, 17):
+            validator = DiffValidator()
+            for i in range(0, len(self.DIFF), size):
+                validator.feed(self.DIFF[i:i + size])
+            streamed = validator.close()
+            self.assertEqual((streamed.added, streamed.removed, streamed.hunks), (3, 3, 3))
+
+    def test_header_counts_must_match_body(self):
+        short = self.DIFF.replace("@@ -1,3 +1,4 @@", "@@ -1,3 +1,5 @@")
+        with self.assertRaises(DiffValidationError) as cm:
+            DiffValidator().validate(short)
+        self.assertIn("line counts do not match", str(cm.exception))
+        long = self.DIFF.replace("@@ -5 +5 @@", "@@ -5,0 +5 @@")
+        with self.assertRaisesRegex(DiffValidationError, "more lines"):
+            DiffValidator().validate(long)
+        self.assertEqual(DiffValidator(strict_counts=False).validate(long).added, 3)
+
+    def test_configurable_thresholds(self):
+        removal = "--- a\n+++ b\n@@ -1,3 +1,1 @@\n-a\n-b\n+c\n-d\n"
+        DiffValidator().validate(removal)
+        with self.assertRaisesRegex(DiffValidationError, "removes too much"):
+            DiffValidator(max_removed_ratio=2).validate(removal)
+        with mock.patch.dict(os.environ, {"JARVIS_DIFF_MAX_LINES": "3"}):
+            with self.assertRaisesRegex(DiffValidationError, "too large"):
+                DiffValidator().validate(removal)
+
+    def test_large_diff_fails_while_streaming(self):
+        validator = DiffValidator(max_changed_lines=10)
+        validator.feed("--- a\n+++ b\n@@ -1,0 +1,1000 @@\n")
+        with self.assertRaisesRegex(DiffValidationError, "too large"):
+            for i in range(1000):
+                validator.feed(f"+line {i}\n")
+        self.assertLess(i, 20)
+
+
 if __name__ == '__main__':
     unittest.main()
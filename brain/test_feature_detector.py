@@ -0,0 +1,64 @@
+import os
+import json
+import random
+import unittest
+from unittest import mock
+
+from brain import bench_feature_detector
+from brain.bench_feature_detector import legacy_summarize
+from brain.feature_detector import FeatureDetector, Rule
+from brain.test_support import TempDirMixin
+
+
+class TestFeatureDetector(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+
+    def test_matches_legacy_summarizer(self):
+        rng = random.Random(7)
+        pieces = ["<html", "<HTML", "Three", "PARTICLE", "shapes", "Shapes", "setTarget", "x = 1;", "\n", "{", "}"]
+        detector = FeatureDetector(chunk_size=16)
+        for _ in range(300):
+            path = self.write("f.js", "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12))))
+            self.assertEqual(detector.detect_file(path), legacy_summarize(path))
+
+    def test_matches_across_chunk_boundaries(self):
+        detector = FeatureDetector(chunk_size=8)
+        for offset in range(12):
+            path = self.write("f.js", "." * offset + "particle + setTarget")
+            self.assertEqual(
+                detector.detect_file(path),
+                ["Contains particle system", "Uses setTarget() for particle positioning"],
+            )
+
+    def test_stops_reading_once_every_rule_matched(self):
+        detector = FeatureDetector([Rule("Uses Three.js", ["three"])], chunk_size=4)
+        reads = []
+        chunks = iter(["thr", "ee!", "more", "text"])
+        found = detector._scan(c for c in chunks if not reads.append(c))
+        self.assertEqual(found, {0})
+        self.assertEqual(reads, ["thr", "ee!"])
+
+    def test_user_rules_and_regex(self):
+        rules_path = self.write("rules.json", json.dumps([
+            {"label": "Uses React", "patterns": ["useState", "useEffect"], "ignore_case": False},
+            {"label": "Exports default", "patterns": [r"export\s+default"], "regex": True},
+        ]))
+        with mock.patch.dict(os.environ, {"JARVIS_SUMMARY_RULES": rules_path}):
+            detector = FeatureDetector.from_env()
+
+        labels = detector.detect_text("const [a] = useState(0);\nexport   default App;")
+        self.assertEqual(labels, ["Uses React", "Exports default"])
+        self.assertEqual(detector.detect_text("USESTATE export default"), ["Exports default"])
+        self.assertNotEqual(detector.fingerprint, FeatureDetector().fingerprint)
+
+    def test_benchmark_runs(self):
+        results = bench_feature_detector.run(size=1024 * 1024, repeat=1)
+        self.assertEqual(set(results), {"features_start", "features_end", "features_none"})
+        # Chunked scanning keeps memory bounded regardless of file size
+        for r in results.values():
+            self.assertLess(r["detector_peak"], r["legacy_peak"])
+
+
+if __name__ == '__main__':
+    unittest.main()
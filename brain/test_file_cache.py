@@ -0,0 +1,95 @@
+import os
+import unittest
+from unittest import mock
+
+from brain.file_cache import FileCache
+from brain.context_engine import ContextEngine
+from brain.test_support import TempDirMixin
+
+
+class TestFileCache(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.env = mock.patch.dict(os.environ, {"JARVIS_CACHE_DIR": self.state})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def write(self, rel_path, content, mtime=None):
+        path = super().write(rel_path, content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_hits_until_file_changes(self):
+        cache = FileCache(max_bytes=1024)
+        path = self.write("a.js", "one", mtime=1000)
+        self.assertEqual(cache.read(path), "one")
+        self.assertEqual(cache.read(path), "one")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Same size, new mtime
+        self.write("a.js", "two", mtime=2000)
+        self.assertEqual(cache.read(path), "two")
+        # Same mtime, new size
+        self.write("a.js", "three", mtime=2000)
+        self.assertEqual(cache.read(path), "three")
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(cache.stats()["bytes"], 5)
+
+    def test_evicts_least_recently_read(self):
+        cache = FileCache(max_bytes=10)
+        a = self.write("a.txt", "aaaa")
+        b = self.write("b.txt", "bbbb")
+        c = self.write("c.txt", "cccc")
+        cache.read(a)
+        cache.read(b)
+        cache.read(a)  # b is now least recent
+        cache.read(c)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertLessEqual(cache.size, 10)
+
+        cache.read(a)
+        self.assertEqual(cache.hits, 2)
+        cache.read(b)
+        self.assertEqual(cache.misses, 4)
+
+    def test_large_files_are_not_cached(self):
+        cache = FileCache(max_bytes=100, max_file_bytes=5)
+        path = self.write("big.txt", "0123456789")
+        self.assertIsNone(cache.read(path))
+        self.assertEqual(cache.stats()["entries"], 0)
+        with self.assertRaises(OSError):
+            cache.read(os.path.join(self.root, "missing.txt"))
+
+    def test_engine_invalidates_on_watch_events(self):
+        self.write("a.js", "old", mtime=1000)
+        engine = ContextEngine()
+        engine.set_project(self.root)
+        engine.activate_file("a.js")
+        self.assertEqual(engine.get_original_file(), "old")
+
+        # Rewritten within the same mtime tick: only the watcher can tell
+        self.write("a.js", "new", mtime=1000)
+        with mock.patch.object(engine.index, "update_paths", return_value={
+            "added": [], "modified": ["a.js"], "removed": [],
+        }):
+            engine._on_fs_events({"a.js"})
+        self.assertEqual(engine.get_original_file(), "new")
+        self.assertEqual(engine.file_cache.misses, 2)
+    def test_engine_line_ranges_ignore_form_feeds(self):
+        self.write("m.py", "def f():\n    return 1\n\x0c\ndef g():\n    return 3\n")
+        engine = ContextEngine()
+        engine.set_project(self.root)
+        expected = "def g():\n    return 3\n"
+        # Cold read from disk, then from the cache
+        self.assertEqual(engine.read_symbol("g"), expected)
+        self.assertEqual(engine.read_symbol("g"), expected)
+        self.assertGreater(engine.file_cache.hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
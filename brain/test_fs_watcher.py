@@ -0,0 +1,131 @@
+import os
+import time
+import shutil
+import threading
+import unittest
+from unittest import mock
+
+from brain.fs_watcher import ProjectWatcher, PollingBackend, InotifyUnavailable
+from brain.project_index import ProjectIndex
+from brain.context_engine import ContextEngine
+from brain.project_context_loader import ProjectContextLoader
+from brain.test_support import TempDirMixin
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class WatcherTestCase(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.write("main.py", "print('hi')\n")
+        self.write("src/app.js", "const shapes = {};\n")
+
+
+class TestIndexUpdatePaths(WatcherTestCase):
+    def test_update_paths_handles_files_and_directories(self):
+        index = ProjectIndex(self.root, {"node_modules"}, (".png",), path=os.path.join(self.state, "i.json"))
+        index.refresh()
+        before = index.fingerprint
+
+        self.write("src/app.js", "const shapes = { cone: 1 };\n")
+        self.write("lib/util.py", "x = 1\n")
+        self.write("logo.png", "ignored\n")
+        os.remove(os.path.join(self.root, "main.py"))
+
+        changes = index.update_paths(["src/app.js", "lib", "logo.png", "main.py"])
+        self.assertEqual(changes["modified"], [os.path.join("src", "app.js")])
+        self.assertEqual(changes["added"], [os.path.join("lib", "util.py")])
+        self.assertEqual(changes["removed"], ["main.py"])
+        self.assertNotEqual(index.fingerprint, before)
+
+        shutil.rmtree(os.path.join(self.root, "src"))
+        self.assertEqual(index.update_paths(["src"])["removed"], [os.path.join("src", "app.js")])
+        self.assertEqual(index.paths(), [os.path.join("lib", "util.py")])
+
+
+class TestProjectWatcher(WatcherTestCase):
+    def run_watcher(self, backend):
+        batches = []
+        watcher = ProjectWatcher(self.root, batches.append, debounce=0.2, poll_interval=0.1, backend=backend)
+        try:
+            watcher.start()
+        except InotifyUnavailable as e:
+            self.skipTest(str(e))
+        self.addCleanup(watcher.stop)
+        return watcher, batches
+
+    def check_backend(self, backend):
+        watcher, batches = self.run_watcher(backend)
+        time.sleep(0.15)
+
+        # A burst of writes to one file arrives as one debounced batch
+        for i in range(5):
+            self.write("main.py", f"print({i})\n")
+        self.write("src/new.py", "y = 2\n")
+
+        self.assertTrue(wait_for(lambda: batches))
+        time.sleep(0.4)
+        changed = set().union(*batches)
+        self.assertIn("main.py", changed)
+        self.assertIn(os.path.join("src", "new.py"), changed)
+        self.assertEqual(len(batches), 1)
+
+    def test_polling_backend(self):
+        self.check_backend("poll")
+
+    def test_inotify_backend(self):
+        self.check_backend("inotify")
+
+    def test_inotify_watches_new_directories(self):
+        watcher, batches = self.run_watcher("inotify")
+        os.makedirs(os.path.join(self.root, "pkg"))
+        self.assertTrue(wait_for(lambda: batches))
+        self.write("pkg/mod.py", "z = 3\n")
+        self.assertTrue(wait_for(lambda: os.path.join("pkg", "mod.py") in set().union(*batches)))
+
+    def test_auto_falls_back_to_polling(self):
+        with mock.patch("brain.fs_watcher.InotifyBackend", side_effect=InotifyUnavailable("no")):
+            watcher, _ = self.run_watcher("auto")
+        self.assertIsInstance(watcher.backend, PollingBackend)
+
+
+class TestLiveContext(WatcherTestCase):
+    def test_engine_and_summaries_follow_the_disk(self):
+        with mock.patch.dict(os.environ, {"JARVIS_CACHE_DIR": self.state}):
+            engine = ContextEngine()
+            engine.set_project(self.root)
+            loader = ProjectContextLoader(engine.project_root, engine.file_index, engine.file_hashes())
+            loader.load()
+        summarized = threading.Event()
+
+        def listener(changes):
+            if loader.apply_changes(changes, engine.file_hashes()):
+                engine.project_summary = loader.get_summary()
+                summarized.set()
+
+        engine.change_listeners.append(listener)
+        with mock.patch.dict(os.environ, {"JARVIS_WATCH_POLL_INTERVAL": "0.1"}):
+            self.assertTrue(engine.watch(debounce=0.1, backend="poll"))
+        self.addCleanup(engine.unwatch)
+
+        before = engine.index_fingerprint
+        with mock.patch.object(loader, "_summarize_file", wraps=loader._summarize_file) as summarize:
+            self.write("scene.js", "particle setTarget\n")
+            self.assertTrue(summarized.wait(5))
+        summarize.assert_called_once_with(os.path.join(self.root, "scene.js"))
+
+        self.assertIn("scene.js", engine.file_index)
+        self.assertNotEqual(engine.index_fingerprint, before)
+        self.assertIn("scene.js: Contains particle system", engine.project_summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
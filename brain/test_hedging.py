@@ -0,0 +1,101 @@
+import os
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from brain.latency import LatencyTracker
+from brain.model_router import ModelRouter
+
+
+class FakeRouter(ModelRouter):
+    """Provider calls replaced by scripted (delay, result) per model."""
+
+    def __init__(self, script, **kwargs):
+        super().__init__(**kwargs)
+        self.script = script
+        self.started = []
+        self.cancelled = []
+
+    async def _call_model(self, provider, model, prompt):
+        self.started.append(model)
+        delay, result = self.script[model]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestHedging(unittest.TestCase):
+    def setUp(self):
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o", "DEEPSEEK_KEY_1": "d"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def run_chain(self, router):
+        async def run():
+            result = await router._call_chain(router._reasoning_chain(), "prompt")
+            await asyncio.sleep(0)  # let cancellations land
+            return result
+        return asyncio.run(run())
+
+    def test_hedge_beats_hanging_primary(self):
+        router = FakeRouter({
+            "deepseek-reasoner": (5.0, "slow"),
+            "meta-llama/llama-3.1-70b-instruct": (0.01, "fast"),
+            "qwen/qwen2.5-32b-instruct": (0.01, "unused"),
+        }, hedge=True, hedge_delay=0.05)
+
+        start = time.monotonic()
+        result = self.run_chain(router)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(result["response"], "fast")
+        self.assertEqual(router.cancelled, ["deepseek-reasoner"])
+        self.assertNotIn("qwen/qwen2.5-32b-instruct", router.started)
+
+    def test_failure_starts_next_immediately(self):
+        router = FakeRouter({
+            "deepseek-reasoner": (0.0, RuntimeError("boom")),
+            "meta-llama/llama-3.1-70b-instruct": (0.0, "second"),
+            "qwen/qwen2.5-32b-instruct": (0.0, "third"),
+        }, hedge=True, hedge_delay=10.0)
+
+        self.assertEqual(self.run_chain(router)["response"], "second")
+
+    def test_without_hedging_is_sequential(self):
+        router = FakeRouter({
+            "deepseek-reasoner": (0.1, "first"),
+            "meta-llama/llama-3.1-70b-instruct": (0.0, "second"),
+            "qwen/qwen2.5-32b-instruct": (0.0, "third"),
+        }, hedge=False)
+
+        self.assertEqual(self.run_chain(router)["response"], "first")
+        self.assertEqual(router.started, ["deepseek-reasoner"])
+
+    def test_adaptive_delay_uses_p95(self):
+        router = FakeRouter({}, hedge=True)
+        for i in range(1, 21):
+            router.latency.record(("deepseek", "deepseek-reasoner"), float(i))
+        self.assertEqual(router._hedge_delay("deepseek", "deepseek-reasoner"), 19.0)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(window=10)
+        self.assertIsNone(tracker.percentile("x", 0.95))
+        for i in range(20):
+            tracker.record("x", float(i))
+        # Only the last 10 samples (10..19) are kept
+        self.assertEqual(tracker.count("x"), 10)
+        self.assertEqual(tracker.percentile("x", 0.5), 14.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import json
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from brain.http_client import ProviderClientPool
+from brain.model_router import ModelRouter
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.requests.append({"path": self.path, "body": body, "port": self.client_address[1]})
+
+        status, reply = server.responses.get(self.path, (200, "stub reply"))
+        if body.get("stream"):
+            # OpenAI-style SSE: one delta per word, then [DONE]
+            events = [
+                {"choices": [{"delta": {"content": token}}]}
+                for token in reply.split(" ") if token
+            ]
+            data = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+            data = data.encode()
+            content_type = "text/event-stream"
+        else:
+            data = json.dumps({"choices": [{"message": {"content": reply}}]}).encode()
+            content_type = "application/json"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubProviderServer:
+    """Local OpenAI-compatible server; each provider gets its own path prefix."""
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.requests = []
+        self.httpd.responses = {}
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def providers(self):
+        return {
+            name: {"base_url": f"{self.url}/{name}", "timeout": 5.0}
+            for name in ("groq", "deepseek", "openrouter")
+        }
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestProviderClientPool(unittest.TestCase):
+    def setUp(self):
+        self.server = StubProviderServer()
+        self.pool = ProviderClientPool(self.server.providers(), http2=False)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_reuses_connection(self):
+        async def run():
+            for _ in range(3):
+                resp = await self.pool.post_json("groq", "/chat/completions", {"n": 1})
+                self.assertEqual(resp.status_code, 200)
+            await self.pool.aclose()
+
+        asyncio.run(run())
+        ports = {r["port"] for r in self.server.httpd.requests}
+        self.assertEqual(len(self.server.httpd.requests), 3)
+        self.assertEqual(len(ports), 1)
+
+    def test_unknown_provider(self):
+        async def run():
+            await self.pool.post_json("nope", "/chat/completions", {})
+
+        with self.assertRaises(KeyError):
+            asyncio.run(run())
+
+
+class TestRouterAgainstStub(unittest.TestCase):
+    def setUp(self):
+        self.server = StubProviderServer()
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o", "DEEPSEEK_KEY_1": "d"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+        self.router = ModelRouter(http=ProviderClientPool(self.server.providers(), http2=False))
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.close()
+
+    def test_code_goes_to_groq(self):
+        result = self.router.call("code", "add a function")
+        self.assertEqual(result["provider"], "groq")
+        self.assertEqual(result["response"], "stub reply")
+        self.assertEqual(self.server.httpd.requests[0]["path"], "/groq/chat/completions")
+
+    def test_groq_failure_falls_back(self):
+        self.server.httpd.responses["/groq/chat/completions"] = (429, "")
+        result = self.router.call("code", "add a function")
+        self.assertEqual(result["provider"], "deepseek")
+
+    def test_stream_yields_tokens(self):
+        self.server.httpd.responses["/groq/chat/completions"] = (500, "")
+
+        async def collect():
+            return [e async for e in self.router.astream("code", "add a function")]
+
+        events = asyncio.run(collect())
+        self.assertEqual(events[0], {"type": "start", "provider": "deepseek", "model": "deepseek-reasoner"})
+        self.assertEqual([e["text"] for e in events if e["type"] == "token"], ["stub", "reply"])
+        self.assertEqual(events[-1]["type"], "end")
+        self.assertEqual(events[-1]["response"], "stubreply")
+
+
+if __name__ == '__main__':
+    unittest.main()
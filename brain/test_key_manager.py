@@ -0,0 +1,194 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from brain.key_manager import KeyManager, KeyExhaustedError, parse_retry_after, parse_reset
+from brain.key_store import SharedKeyStore
+
+
+def make_manager(n_keys=2, store=None, **env):
+    values = {f"TEST_KEY_{i + 1}": f"k{i + 1}" for i in range(n_keys)}
+    values.update(env)
+    with mock.patch.dict(os.environ, values):
+        return KeyManager("TEST", store=store)
+
+
+class TestKeyManager(unittest.TestCase):
+    def test_spreads_concurrent_requests_by_load(self):
+        km = make_manager(3)
+
+        async def run():
+            return [await km.acquire() for _ in range(3)]
+
+        keys = asyncio.run(run())
+        self.assertEqual(sorted(keys), ["k1", "k2", "k3"])
+        self.assertEqual([s["in_flight"] for s in km.stats()], [1, 1, 1])
+
+        for key in keys:
+            km.release(key)
+        self.assertEqual([s["in_flight"] for s in km.stats()], [0, 0, 0])
+
+    def test_rpm_budget_moves_to_next_key_then_exhausts(self):
+        km = make_manager(2, TEST_RPM="1", JARVIS_KEY_MAX_WAIT="0")
+
+        async def run():
+            first = await km.acquire()
+            km.release(first)
+            second = await km.acquire()
+            km.release(second)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertNotEqual(first, second)
+        with self.assertRaises(KeyExhaustedError):
+            asyncio.run(km.acquire())
+
+    def test_tpm_budget_reconciles_actual_usage(self):
+        km = make_manager(1, TEST_TPM="1000")
+
+        async def run():
+            key = await km.acquire(tokens=900)
+            km.release(key, estimated_tokens=900, used_tokens=100)
+            return await km.acquire(tokens=800)
+
+        self.assertEqual(asyncio.run(run()), "k1")
+
+    def test_retry_after_overrides_default_cooldown(self):
+        km = make_manager(1)
+        km.report_failure("k1", status=429, retry_after=2)
+        cooldown = km.stats()[0]["cooldown"]
+        self.assertGreater(cooldown, 1)
+        self.assertLessEqual(cooldown, 2)
+
+    def test_server_errors_never_block_the_last_key(self):
+        km = make_manager(2, JARVIS_KEY_MAX_WAIT="0")
+        km.report_failure("k1", status=503)
+        self.assertEqual(asyncio.run(km.acquire()), "k2")
+        km.report_failure("k2", status=0)
+        # Both cooling down after blips: the one that frees up first is used
+        self.assertEqual(asyncio.run(km.acquire()), "k1")
+
+        km.report_failure("k1", status=429)
+        self.assertEqual(asyncio.run(km.acquire()), "k2")
+        km.report_failure("k2", status=429)
+        with self.assertRaises(KeyExhaustedError):
+            asyncio.run(km.acquire())
+
+    def test_rate_limit_headers_park_key(self):
+        km = make_manager(2)
+        km.observe_headers("k1", {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m"})
+
+        async def run():
+            return await km.acquire()
+
+        self.assertEqual(asyncio.run(run()), "k2")
+
+    def test_thread_safe_counters(self):
+        km = make_manager(4)
+
+        def worker():
+            for _ in range(200):
+                key = asyncio.run(km.acquire())
+                km.release(key)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(s["in_flight"] for s in km.stats()), 0)
+
+    def test_parsers(self):
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertAlmostEqual(parse_reset("2m59.5s"), 179.5)
+        self.assertAlmostEqual(parse_reset("120ms"), 0.12)
+
+
+class TestSharedKeyState(unittest.TestCase):
+    """Two managers with separate connections to one file stand in for two workers."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "keys.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_cooldown_is_seen_by_other_worker(self):
+        worker_a = make_manager(2, store=SharedKeyStore(self.path))
+        worker_b = make_manager(2, store=SharedKeyStore(self.path))
+
+        worker_a.report_failure("k1", status=429, retry_after=30)
+
+        self.assertEqual(asyncio.run(worker_b.acquire()), "k2")
+        self.assertGreater(worker_b.stats()[0]["cooldown"], 25)
+
+    def test_rate_budget_is_shared(self):
+        env = {"TEST_RPM": "2", "JARVIS_KEY_MAX_WAIT": "0"}
+        worker_a = make_manager(1, store=SharedKeyStore(self.path), **env)
+        worker_b = make_manager(1, store=SharedKeyStore(self.path), **env)
+
+        asyncio.run(worker_a.acquire())
+        asyncio.run(worker_b.acquire())
+        with self.assertRaises(KeyExhaustedError):
+            asyncio.run(worker_a.acquire())
+
+    def test_racing_workers_never_overshoot_shared_budget(self):
+        env = {"TEST_RPM": "5", "JARVIS_KEY_MAX_WAIT": "0"}
+        workers = [make_manager(1, store=SharedKeyStore(self.path), **env) for _ in range(8)]
+        results = []
+        barrier = threading.Barrier(len(workers))
+
+        def run(worker):
+            barrier.wait()
+            try:
+                results.append(asyncio.run(worker.acquire()))
+            except KeyExhaustedError:
+                results.append(None)
+
+        threads = [threading.Thread(target=run, args=(w,)) for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results.count("k1"), 5)
+
+    def test_async_variants_keep_store_io_off_the_loop(self):
+        worker = make_manager(1, store=SharedKeyStore(self.path), TEST_TPM="1000")
+        threads = []
+
+        def recorded(method):
+            def wrapper(*args):
+                threads.append(threading.get_ident())
+                return method(*args)
+            return wrapper
+
+        async def run():
+            key = await worker.acquire(100)
+            await worker.aobserve_headers(key, {"x-ratelimit-remaining-tokens": "0"})
+            await worker.areport_failure(key, status=429)
+            await worker.arelease(key, estimated_tokens=100, used_tokens=50)
+
+        store = worker.store
+        with mock.patch.object(store, "set_cooldown", recorded(store.set_cooldown)), \
+                mock.patch.object(store, "bucket_add", recorded(store.bucket_add)):
+            asyncio.run(run())
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(worker.stats()[0]["in_flight"], 0)
+
+    def test_raw_keys_are_not_stored(self):
+        worker = make_manager(1, store=SharedKeyStore(self.path))
+        worker.report_failure("k1", status=429)
+        for name in os.listdir(self.test_dir):  # includes the WAL file
+            with open(os.path.join(self.test_dir, name), "rb") as f:
+                self.assertNotIn(b"k1", f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from brain.mcp import MCPRead, MCPError
+from brain.file_cache import FileCache
+from brain.context_engine import ContextEngine
+from brain.model_router import ModelRouter
+from brain.test_support import TempDirMixin
+
+
+class TestMCPRead(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.env = mock.patch.dict(os.environ, {"JARVIS_CACHE_DIR": self.state})
+        self.env.start()
+
+        lines = [f"line {i}\n" for i in range(1, 1001)]
+        self.write("big.js", "".join(lines) + "function setTarget(p) {\n  p.t = 1;\n}\n")
+        self.write("empty.txt", "")
+
+        self.engine = ContextEngine()
+        self.engine.set_project(self.root)
+        self.mcp = MCPRead(self.engine, max_chars=500)
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_whole_file_is_capped(self):
+        content = self.mcp.read_file("big.js")
+        self.assertTrue(content.startswith("line 1\nline 2\n"))
+        self.assertIn("[TRUNCATED]", content)
+        self.assertEqual(self.mcp.read_file("empty.txt"), "")
+
+    def test_line_range(self):
+        self.assertEqual(self.mcp.read_file("big.js", start_line=500, end_line=502), "line 500\nline 501\nline 502\n")
+        self.assertEqual(self.mcp.read_file("big.js", start_line=1003), "}\n")
+        self.assertEqual(self.mcp.read_file("big.js", end_line=1), "line 1\n")
+        self.assertIn("[TRUNCATED]", self.mcp.read_file("big.js", start_line=1, end_line=900))
+        with self.assertRaises(MCPError):
+            self.mcp.read_file("big.js", start_line=2000)
+        with self.assertRaises(MCPError):
+            self.mcp.read_file("big.js", start_line=5, end_line=4)
+
+    def test_byte_range(self):
+        self.assertEqual(self.mcp.read_file("big.js", start_byte=7, end_byte=14), "line 2\n")
+        self.assertIn("[TRUNCATED]", self.mcp.read_file("big.js", start_byte=0, end_byte=10_000))
+
+    def test_symbol(self):
+        expected = "function setTarget(p) {\n  p.t = 1;\n}\n"
+        self.assertEqual(self.mcp.read_file(None, symbol="setTarget"), expected)
+        self.assertEqual(self.mcp.read_file("big.js", symbol="setTarget"), expected)
+        with self.assertRaises(MCPError):
+            self.mcp.read_file(None, symbol="missing")
+
+    def test_read_request_coerces_params(self):
+        call = {"tool": "read_file", "path": "big.js", "start_line": "2", "end_line": 2}
+        self.assertEqual(self.mcp.read_request(call), "line 2\n")
+        with self.assertRaises(MCPError):
+            self.mcp.read_request({"tool": "read_file", "path": "big.js", "start_line": "two"})
+
+    def test_cached_and_mmap_reads_agree(self):
+        uncached = MCPRead(self.engine, max_chars=500, cache=FileCache(max_file_bytes=16))
+        for start, end in ((1, 1), (999, 1003), (10, 400)):
+            self.assertEqual(self.mcp.read_file("big.js", start, end), uncached.read_file("big.js", start, end))
+        self.assertEqual(self.mcp.read_file("big.js"), uncached.read_file("big.js"))
+        self.assertGreater(self.engine.file_cache.hits, 0)
+        self.assertEqual(uncached.cache.stats()["entries"], 0)
+
+    def test_outside_project_is_denied(self):
+        with self.assertRaises(MCPError):
+            self.mcp.read_file("../etc/passwd", start_line=1)
+
+
+class TestToolCallSchema(unittest.TestCase):
+    def setUp(self):
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+        self.router = ModelRouter()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_extracts_scoped_calls(self):
+        calls = self.router._extract_tool_calls('{"tool":"read_file","path":"a.js","start_line":10,"end_line":40}')
+        self.assertEqual(calls[0]["start_line"], 10)
+        calls = self.router._extract_tool_calls('{"tool": "read_file", "symbol": "shapes"}')
+        self.assertEqual(calls[0]["symbol"], "shapes")
+        self.assertEqual(self.router._extract_tool_calls('{"tool": "read_file"}'), [])
+
+    def test_extracts_every_call_block(self):
+        text = (
+            'I need two files.\n```json\n{"tool": "read_file", "path": "a.js"}\n```\n'
+            'and\n{"path": "b.py", "tool": "read_file", "symbol": "run"}\n'
+            '{"tool": "read_file", "path": "a.js"}'
+        )
+        calls = self.router._extract_tool_calls(text)
+        self.assertEqual([c.get("path") for c in calls], ["a.js", "b.py"])
+        self.assertEqual(calls[1]["symbol"], "run")
+
+    def test_extracts_batched_call(self):
+        text = '{"files": ["a.js", {"path": "b.py", "start_line": 3}, {"symbol": "shapes"}, {}], "tool": "read_files"}'
+        calls = self.router._extract_tool_calls(text)
+        self.assertEqual(calls, [
+            {"tool": "read_file", "path": "a.js"},
+            {"tool": "read_file", "path": "b.py", "start_line": 3},
+            {"tool": "read_file", "symbol": "shapes"},
+        ])
+        self.router.tool_max_files = 2
+        self.assertEqual(len(self.router._extract_tool_calls(text)), 2)
+
+    def test_native_tools_are_opt_in(self):
+        self.router.mcp = mock.Mock()
+        _, payload, _ = self.router._provider_request("groq", "m", "PROMPT")
+        self.assertNotIn("tools", payload)
+        self.router.native_tools = True
+        for provider in ("groq", "openrouter"):
+            _, payload, _ = self.router._provider_request(provider, "m", "PROMPT")
+            self.assertEqual({t["function"]["name"] for t in payload["tools"]}, {"read_file", "read_files"})
+
+    def test_followup_prompt_names_the_scope(self):
+        self.router.mcp = mock.Mock()
+        self.router.mcp.read_request.return_value = "line 10\n"
+        call = {"tool": "read_file", "path": "a.js", "start_line": 10, "end_line": 10}
+        messages = [{"role": "user", "content": "PROMPT"}]
+        followup = asyncio.run(self.router._tool_followup(messages, '{"tool": "read_file"}', [call]))
+        prompt = followup[-1]["content"]
+        self.router.mcp.read_request.assert_called_once_with(call)
+        self.assertIn("FILE: a.js (lines 10-10)\n", prompt)
+        self.assertIn("line 10\n", prompt)
+        # The conversation is extended, the original prompt is not copied
+        self.assertIs(followup[0], messages[0])
+        self.assertEqual([m["role"] for m in followup], ["user", "assistant", "user"])
+        self.assertNotIn("PROMPT", prompt)
+
+    def test_system_prefix_is_stable(self):
+        first = self.router._prepare_messages("code", "add a cube", system="SYSTEM RULES")
+        second = self.router._prepare_messages("code", "add a sphere", system="SYSTEM RULES")
+        self.assertEqual([m["role"] for m in first], ["system", "user"])
+        self.assertIs(first[0]["content"], second[0]["content"])
+        self.assertIn("SYSTEM RULES", first[0]["content"])
+        self.assertEqual(second[1]["content"], "add a sphere")
+        # Reasoning adds grounding after the shared part
+        reason = self.router._prepare_messages("reason", "why?", system="SYSTEM RULES")[0]["content"]
+        self.assertTrue(reason.startswith(first[0]["content"]))
+        _, payload, _ = self.router._provider_request("groq", "m", first)
+        self.assertEqual(payload["messages"], first)
+
+    def test_followup_prompt_reads_files_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read_request(call):
+            if call["path"] == "missing.js":
+                raise MCPError("File not found: missing.js")
+            barrier.wait()  # only passes if all three reads run at once
+            return f"<{call['path']}>"
+
+        self.router.mcp = mock.Mock()
+        self.router.mcp.read_request.side_effect = read_request
+        calls = [{"tool": "read_file", "path": p} for p in ("a.js", "missing.js", "b.js", "c.js")]
+        messages = [{"role": "user", "content": "PROMPT"}]
+        prompt = asyncio.run(self.router._tool_followup(messages, "", calls))[-1]["content"]
+
+        self.assertIn("following 4 files", prompt)
+        self.assertLess(prompt.index("FILE: a.js"), prompt.index("FILE: b.js"))
+        self.assertIn("<c.js>", prompt)
+        self.assertIn("TOOL ERROR: Failed to read file 'missing.js'. Reason: File not found", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import os
+import unittest
+from unittest import mock
+
+from brain.mcp_write import MCPWrite, MCPWriteError
+from brain.patch import PatchError, PatchRejected, PatchTransaction, apply_hunks, parse_patch
+from brain.test_diff_system import MockContextEngine
+from brain.test_support import TempDirMixin
+
+SOURCE = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+def hunks(diff):
+    return [h for p in parse_patch(diff) for h in p.hunks]
+
+
+class TestPatch(unittest.TestCase):
+    def test_parse_multi_file(self):
+        diff = (
+            "diff --git a/a.py b/a.py\nindex 1..2 100644\n"
+            "--- a/a.py\n+++ b/a.py\n@@ -1,2 +1,2 @@\n-x\n+y\n z\n"
+            "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1 @@\n+hello\n"
+        )
+        patches = parse_patch(diff)
+        self.assertEqual([(p.old_path, p.new_path) for p in patches], [("a.py", "a.py"), (None, "new.py")])
+        self.assertEqual(patches[0].hunks[0].lines, ["-x", "+y", " z"])
+        self.assertEqual(patches[1].hunks[0].new_lines(), ["hello"])
+        with self.assertRaises(PatchError):
+            parse_patch("@@ -1 +1 @@\n-x\n+y\n")
+
+    def test_hunks_apply_with_offsets(self):
+        diff = (
+            "--- a\n+++ b\n"
+            "@@ -2,3 +2,4 @@\n line 2\n+inserted\n line 3\n line 4\n"
+            "@@ -10,3 +11,2 @@\n line 10\n-line 11\n line 12\n"
+        )
+        result = apply_hunks(SOURCE, hunks(diff))
+        expected = SOURCE.replace("line 2\n", "line 2\ninserted\n").replace("line 11\n", "")
+        self.assertEqual(result, expected)
+
+    def test_fuzzy_matching(self):
+        # Wrong line numbers, whitespace drift and one stale context line
+        diff = "--- a\n+++ b\n@@ -1,4 +1,4 @@\n stale\n line  14\n-line 15\n+LINE 15\n line 16\n"
+        self.assertEqual(apply_hunks(SOURCE, hunks(diff)), SOURCE.replace("line 15\n", "LINE 15\n"))
+        # Context lines keep the file's own text
+        self.assertIn("line 14\n", apply_hunks(SOURCE, hunks(diff)))
+
+    def test_mismatch_reports_hunk(self):
+        diff = (
+            "--- a\n+++ b\n@@ -1,2 +1,2 @@\n line 1\n-line 2\n+two\n"
+            "@@ -5,2 +5,2 @@\n line 5\n-missing\n+six\n"
+        )
+        with self.assertRaises(PatchRejected) as cm:
+            apply_hunks(SOURCE, hunks(diff), path="f.txt")
+        self.assertEqual([e.index for e in cm.exception.errors], [2])
+        self.assertIn("Context mismatch", str(cm.exception))
+        self.assertIn("'missing'", str(cm.exception))
+
+    def test_line_endings_and_final_newline(self):
+        diff = "--- a\n+++ b\n@@ -1,2 +1,2 @@\n a\n-b\n+c\n"
+        self.assertEqual(apply_hunks("a\r\nb\r\n", hunks(diff)), "a\r\nc\r\n")
+        self.assertEqual(apply_hunks("a\nb", hunks(diff)), "a\nc")
+        marker = "--- a\n+++ b\n@@ -1,2 +1,2 @@\n a\n-b\n+c\n\\ No newline at end of file\n"
+        self.assertEqual(apply_hunks("a\nb\n", hunks(marker)), "a\nc")
+        self.assertEqual(apply_hunks("", hunks("--- /dev/null\n+++ b\n@@ -0,0 +1 @@\n+new\n")), "new\n")
+
+
+class TestMCPWrite(TempDirMixin, unittest.TestCase):
+    DIFF = "--- a/other.py\n+++ b/other.py\n@@ -3,1 +3,1 @@\n-line 3\n+three\n"
+
+    def setUp(self):
+        # Not a git checkout
+        self.root = self.make_dir()
+        self.path = self.write("f.txt", SOURCE)
+        os.chmod(self.path, 0o640)
+        self.writer = MCPWrite(MockContextEngine(self.root, "f.txt"))
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_check_leaves_file_untouched(self):
+        self.assertIn("applies cleanly", self.writer.apply_diff(self.DIFF, check=True))
+        self.assertEqual(self.read(), SOURCE)
+
+    def test_apply_is_atomic(self):
+        self.writer.apply_diff(self.DIFF)
+        self.assertEqual(self.read(), SOURCE.replace("line 3\n", "three\n"))
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.root), ["f.txt"])
+
+        with self.assertRaises(MCPWriteError):
+            self.writer.apply_diff(self.DIFF)
+        self.assertEqual(self.read(), SOURCE.replace("line 3\n", "three\n"))
+
+    def test_apply_patch_uses_header_paths(self):
+        diff = self.DIFF.replace("other.py", "f.txt")
+        self.assertIn("1 file(s): f.txt", self.writer.apply_patch(diff, check=True))
+        self.assertEqual(self.read(), SOURCE)
+        self.writer.apply_patch(diff)
+        self.assertEqual(self.read(), SOURCE.replace("line 3\n", "three\n"))
+        with self.assertRaises(MCPWriteError) as cm:
+            self.writer.apply_patch(self.DIFF)
+        self.assertIn("other.py", str(cm.exception))
+
+
+def file_diff(path, old, new):
+    return f"--- a/{path}\n+++ b/{path}\n@@ -1 +1 @@\n-{old}\n+{new}\n"
+
+
+class TestPatchTransaction(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.names = [f"pkg/m{i}.py" for i in range(20)]
+        for name in self.names:
+            self.write(name, f"old {name}\n")
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), encoding="utf-8") as f:
+            return f.read()
+
+    def snapshot(self):
+        return {
+            os.path.relpath(os.path.join(d, n), self.root): self.read(os.path.relpath(os.path.join(d, n), self.root))
+            for d, _, files in os.walk(self.root) for n in files
+        }
+
+    def test_applies_many_files_and_creates_deletes(self):
+        diff = "".join(file_diff(n, f"old {n}", f"new {n}") for n in self.names[1:])
+        diff += "--- /dev/null\n+++ b/pkg/sub/new.py\n@@ -0,0 +1 @@\n+created\n"
+        diff += "--- a/pkg/m0.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-old pkg/m0.py\n"
+
+        written = PatchTransaction(self.root).prepare(parse_patch(diff)).commit()
+        self.assertEqual(len(written), 21)
+        self.assertEqual(self.read("pkg/m7.py"), "new pkg/m7.py\n")
+        self.assertEqual(self.read("pkg/sub/new.py"), "created\n")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "pkg/m0.py")))
+
+    def test_failing_hunk_writes_nothing(self):
+        before = self.snapshot()
+        diff = "".join(file_diff(n, f"old {n}", "x") for n in self.names[:5])
+        diff += file_diff("pkg/m5.py", "stale", "x") + file_diff("pkg/m6.py", "stale", "x")
+        with self.assertRaises(PatchRejected) as cm:
+            PatchTransaction(self.root).prepare(parse_patch(diff))
+        self.assertEqual([e.path for e in cm.exception.errors], ["pkg/m5.py", "pkg/m6.py"])
+        self.assertEqual(self.snapshot(), before)
+
+    def test_write_failure_rolls_back(self):
+        before = self.snapshot()
+        diff = "".join(file_diff(n, f"old {n}", "x") for n in self.names[:3])
+        diff += "--- /dev/null\n+++ b/newdir/a.py\n@@ -0,0 +1 @@\n+a\n"
+        transaction = PatchTransaction(self.root).prepare(parse_patch(diff))
+        real_replace = os.replace
+        calls = []
+
+        def failing_replace(src, dst):
+            calls.append(dst)
+            if len(calls) == 3:
+                raise OSError("disk full")
+            real_replace(src, dst)
+
+        with mock.patch("brain.patch.os.replace", failing_replace):
+            with self.assertRaises(OSError):
+                transaction.commit()
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "newdir")))
+
+    def test_rejects_paths_outside_root_and_stale_files(self):
+        with self.assertRaises(PatchError):
+            PatchTransaction(self.root).prepare(parse_patch(file_diff("../escape.py", "a", "b")))
+        transaction = PatchTransaction(self.root).prepare(parse_patch(file_diff("pkg/m1.py", "old pkg/m1.py", "x")))
+        self.write("pkg/m1.py", "edited meanwhile\n")
+        with self.assertRaises(PatchError):
+            transaction.commit()
+        self.assertEqual(self.read("pkg/m1.py"), "edited meanwhile\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest import mock
+
+from brain.project_context_loader import ProjectContextLoader
+from brain.test_support import TempDirMixin
+
+
+class TestProjectContextLoader(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.cache_path = os.path.join(self.state, "summaries.json")
+        self.write("index.html", "<html><script src='three.js'></script></html>")
+        self.write("src/app.js", "const shapes = {};\n")
+        self.write("lib/app.js", "p.setTarget(x, y, z);\n")
+        self.write("notes.txt", "not summarized\n")
+
+    def make_loader(self):
+        with mock.patch.dict(os.environ, {"JARVIS_SUMMARY_FLAT_FILES": "20"}):
+            return ProjectContextLoader(self.root, cache_path=self.cache_path, max_workers=4)
+
+    def test_same_named_files_are_kept_apart(self):
+        loader = self.make_loader()
+        loader.load()
+        self.assertEqual(
+            loader.file_summaries,
+            {
+                "index.html": "HTML document, Uses Three.js",
+                os.path.join("lib", "app.js"): "Uses setTarget() for particle positioning",
+                os.path.join("src", "app.js"): "Defines shapes object for layouts",
+            },
+        )
+        self.assertIn(f"- {os.path.join('lib', 'app.js')}: Uses setTarget()", loader.get_summary())
+
+    def test_reload_only_summarizes_changed_files(self):
+        self.make_loader().load()
+
+        loader = self.make_loader()
+        with mock.patch.object(loader, "_summarize_file", side_effect=AssertionError("resummarized")):
+            loader.load()
+        self.assertEqual(loader.summarized, 0)
+        self.assertEqual(len(loader.file_summaries), 3)
+
+        self.write("src/app.js", "const particles = [];\n")
+        loader = self.make_loader()
+        with mock.patch.object(loader, "_summarize_file", wraps=loader._summarize_file) as summarize:
+            loader.load()
+        summarize.assert_called_once_with(os.path.join(self.root, "src", "app.js"))
+        self.assertEqual(loader.file_summaries[os.path.join("src", "app.js")], "Contains particle system")
+
+    def test_apply_changes_updates_by_path(self):
+        loader = self.make_loader()
+        loader.load()
+
+        self.write("lib/app.js", "const shapes = {};\n")
+        os.remove(os.path.join(self.root, "index.html"))
+        self.assertTrue(loader.apply_changes({"added": [], "modified": ["lib/app.js"], "removed": ["index.html"]}))
+
+        self.assertNotIn("index.html", loader.file_summaries)
+        self.assertEqual(loader.file_summaries["lib/app.js"], "Defines shapes object for layouts")
+
+    def test_tree_summary_expands_only_relevant_directories(self):
+        for i in range(30):
+            self.write(f"src/render/mod{i}.js", "particles.push(p);\n")
+            self.write(f"server/api/route{i}.py", "def route(): pass\n")
+        self.write("server/api/auth.py", "def login(): pass\n")
+        loader = self.make_loader()
+        loader.load()
+
+        flat = "\n".join(f"- {f}: {d}" for f, d in loader.file_summaries.items())
+        collapsed = loader.get_summary()
+        self.assertNotIn("PROJECT SUMMARY", collapsed)
+        self.assertIn(f"- src{os.sep} (31 files): Contains particle system (30), Defines shapes object for layouts (1)", collapsed)
+        self.assertIn(f"- server{os.sep} (31 files)", collapsed)
+        self.assertNotIn("route1.py", collapsed)
+        self.assertIn("- index.html: HTML document, Uses Three.js", collapsed)
+        self.assertLess(len(collapsed), len(flat) / 4)
+
+        summary = loader.get_summary("add rate limiting to the auth route")
+        auth = os.path.join("server", "api", "auth.py")
+        self.assertIn(f"    - {auth}: General code file", summary)
+        self.assertNotIn(os.path.join("src", "render", "mod1.js"), summary)
+
+        # Rendered once per set of expanded files, until the project changes
+        with mock.patch.object(loader, "_render_tree", wraps=loader._render_tree) as render:
+            self.assertEqual(loader.get_summary("the auth route"), summary)
+            self.assertEqual(render.call_count, 0)
+            loader.apply_changes({"added": [], "modified": [], "removed": [auth]})
+            self.assertNotIn("auth.py", loader.get_summary("the auth route"))
+            self.assertEqual(render.call_count, 1)
+
+    def test_small_projects_stay_flat(self):
+        loader = self.make_loader()
+        loader.load()
+        self.assertEqual(loader.get_summary("anything").splitlines()[0], "- index.html: HTML document, Uses Three.js")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+from unittest import mock
+
+from brain import project_index
+from brain.project_index import ProjectIndex
+from brain.context_engine import ContextEngine
+from brain.test_support import TempDirMixin
+
+
+class TestProjectIndex(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.write("main.py", "print('hi')\n")
+        self.write("src/app.js", "const shapes = {};\n")
+        self.write("node_modules/lib.js", "ignored\n")
+        self.write("logo.png", "ignored\n")
+
+    def make_index(self):
+        return ProjectIndex(
+            self.root,
+            ignore_names={"node_modules"},
+            ignore_suffixes=(".png",),
+            path=os.path.join(self.state, "index.json"),
+        )
+
+    def test_initial_scan_respects_ignores(self):
+        index = self.make_index()
+        changes = index.refresh()
+        self.assertEqual(sorted(changes["added"]), ["main.py", os.path.join("src", "app.js")])
+        self.assertEqual(index.paths(), ["main.py", os.path.join("src", "app.js")])
+
+    def test_incremental_refresh_reports_changes(self):
+        index = self.make_index()
+        index.refresh()
+        before = index.fingerprint
+
+        self.write("src/app.js", "const shapes = { square: 1 };\n")
+        self.write("src/new.py", "x = 1\n")
+        os.remove(os.path.join(self.root, "main.py"))
+
+        changes = index.refresh()
+        self.assertEqual(changes["modified"], [os.path.join("src", "app.js")])
+        self.assertEqual(changes["added"], [os.path.join("src", "new.py")])
+        self.assertEqual(changes["removed"], ["main.py"])
+        self.assertNotEqual(index.fingerprint, before)
+
+    def test_persisted_index_skips_rehashing(self):
+        index = self.make_index()
+        index.refresh()
+        index.save()
+
+        reloaded = self.make_index()
+        self.assertTrue(reloaded.load())
+        with mock.patch.object(project_index, "hash_file", side_effect=AssertionError("rehashed")):
+            changes = reloaded.refresh()
+        self.assertEqual(changes, {"added": [], "modified": [], "removed": []})
+        self.assertEqual(reloaded.fingerprint, index.fingerprint)
+
+    def test_touch_without_content_change_is_not_a_change(self):
+        index = self.make_index()
+        index.refresh()
+        path = os.path.join(self.root, "main.py")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(index.refresh()["modified"], [])
+
+    def test_context_engine_uses_persistent_index(self):
+        with mock.patch.dict(os.environ, {"JARVIS_CACHE_DIR": self.state}):
+            engine = ContextEngine()
+            engine.set_project(self.root)
+            self.assertIn("main.py", engine.file_index)
+            self.assertNotIn(os.path.join("node_modules", "lib.js"), engine.file_index)
+            self.assertTrue(os.path.exists(engine.index.path))
+
+            self.write("extra.py", "y = 2\n")
+            self.assertEqual(engine.refresh_index()["added"], ["extra.py"])
+            self.assertIn("extra.py", engine.file_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from brain.response_cache import ResponseCache
+from brain.model_router import ModelRouter
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "cache.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_roundtrip_and_persistence(self):
+        cache = ResponseCache(self.path)
+        key = ResponseCache.make_key("code", "prompt", "fp")
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {"response": "hi", "provider": "groq", "model": "m"})
+        self.assertEqual(cache.get(key)["response"], "hi")
+
+        # New instance: memory tier empty, served from disk
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened.get(key)["response"], "hi")
+        self.assertEqual(reopened.stats()["hits"], 1)
+
+    def test_key_depends_on_fingerprint(self):
+        self.assertNotEqual(
+            ResponseCache.make_key("code", "prompt", "fp1"),
+            ResponseCache.make_key("code", "prompt", "fp2"),
+        )
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(self.path, ttl=-1)
+        cache.set("k", {"response": "old"})
+        self.assertIsNone(cache.get("k"))
+
+    def test_explicit_zero_limits_are_kept(self):
+        with mock.patch.dict(os.environ, {"JARVIS_CACHE_MAX_ENTRIES": "99"}):
+            cache = ResponseCache(self.path, max_entries=0)
+        self.assertEqual(cache.max_entries, 0)
+        cache.set("k", {"response": "disk only"})
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+        self.assertEqual(cache.get("k")["response"], "disk only")
+
+    def test_memory_lru_and_disk_budget(self):
+        cache = ResponseCache(self.path, max_entries=2, max_disk_bytes=100)
+        for i in range(5):
+            cache.set(f"k{i}", {"response": "x" * 30})
+
+        stats = cache.stats()
+        self.assertEqual(stats["memory_entries"], 2)
+        self.assertLessEqual(stats["disk_bytes"], 100)
+        self.assertIsNotNone(cache.get("k4"))
+        self.assertIsNone(cache.get("k0"))
+
+
+class CountingRouter(ModelRouter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    async def _call_model(self, provider, model, prompt):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+class TestRouterCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+        cache = ResponseCache(os.path.join(self.test_dir, "cache.sqlite3"))
+        self.router = CountingRouter(cache=cache)
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.test_dir)
+
+    def test_repeat_query_is_served_from_cache(self):
+        async def run():
+            first = await self.router.acall("reason", "explain main.py")
+            second = await self.router.acall("reason", "explain main.py")
+            bypass = await self.router.acall("reason", "explain main.py", use_cache=False)
+            return first, second, bypass
+
+        first, second, bypass = asyncio.run(run())
+        self.assertEqual(first["response"], "answer 1")
+        self.assertEqual(second["response"], "answer 1")
+        self.assertEqual(bypass["response"], "answer 2")
+        self.assertEqual(self.router.calls, 2)
+
+    def test_rejected_result_is_not_cached(self):
+        async def run():
+            for _ in range(3):
+                await self.router.acall("code", "add a cone shape", accept=lambda r: False)
+            return await self.router.acall("code", "add a cone shape", accept=lambda r: True)
+
+        result = asyncio.run(run())
+        self.assertEqual(result["response"], "answer 4")
+        self.assertEqual(self.router.calls, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import unittest
+
+from brain.retrieval import LexicalIndex, tokenize
+from brain.test_support import TempDirMixin
+
+
+class TestTokenize(unittest.TestCase):
+    def test_splits_identifiers(self):
+        self.assertEqual(tokenize("setTarget"), ["settarget", "set", "target"])
+        self.assertEqual(tokenize("MAX_PARTICLES"), ["max_particle", "max", "particle"])
+        self.assertEqual(tokenize("add the new cone"), ["cone"])
+
+
+class TestLexicalIndex(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        filler = "".join(f"const v{i} = {i};\n" for i in range(50))
+        self.write("particles.js", filler + "function setTarget(p, x, y, z) {\n  p.target = [x, y, z];\n}\n")
+        self.write("shapes.js", "const shapes = {\n  sphere: sphereLayout,\n  cube: cubeLayout,\n};\n")
+        self.write("server.py", "def handle_request(message):\n    return route(message)\n")
+        self.write("logo.png", "shapes shapes shapes\n")
+
+    def make_index(self):
+        index = LexicalIndex(self.root, chunk_lines=20)
+        index.build(["particles.js", "shapes.js", "server.py", "logo.png"])
+        return index
+
+    def test_ranks_relevant_chunk_first(self):
+        index = self.make_index()
+        hits = index.search("add a cone to the shapes object")
+        self.assertEqual(hits[0].path, "shapes.js")
+
+        hits = index.search("how does setTarget position particles?")
+        self.assertEqual((hits[0].path, hits[0].start, hits[0].end), ("particles.js", 41, 53))
+        self.assertNotIn("logo.png", index.chunks)
+
+    def test_render_reads_only_the_hit_lines(self):
+        text = self.make_index().render("setTarget", k=1)
+        self.assertTrue(text.startswith("file: particles.js (lines 41-53)\n```\n"))
+        self.assertIn("function setTarget(p, x, y, z)", text)
+        self.assertNotIn("const v0 =", text)
+        self.assertEqual(self.make_index().render("zebra"), "")
+
+    def test_update_reindexes_changed_files(self):
+        index = self.make_index()
+        chunks = index.chunk_count
+
+        self.write("shapes.js", "const layouts = {};\n")
+        self.write("cone.js", "function coneLayout() {}\n")
+        os.remove(os.path.join(self.root, "server.py"))
+        index.update({"added": ["cone.js"], "modified": ["shapes.js"], "removed": ["server.py"]})
+
+        self.assertEqual(index.search("cone")[0].path, "cone.js")
+        self.assertEqual(index.search("handle_request"), [])
+        self.assertNotIn("sphere", index.postings)
+        self.assertEqual(index.chunk_count, chunks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import asyncio
+import unittest
+from unittest import mock
+
+from brain.model_router import ModelRouter
+from brain.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        runs = 0
+
+        async def work():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return {"response": "shared"}
+
+        async def run():
+            results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+            # Finished calls are forgotten: the next one runs again
+            await flight.do("k", work)
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(runs, 2)
+        self.assertEqual(flight.coalesced, 4)
+        self.assertTrue(all(r["response"] == "shared" for r in results))
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("k", work) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.create_task(flight.do("k", work))
+            second = asyncio.create_task(flight.do("k", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+    def test_late_stream_joiner_replays_events(self):
+        flight = SingleFlight()
+        started = 0
+
+        async def produce():
+            nonlocal started
+            started += 1
+            for i in range(3):
+                yield i
+                await asyncio.sleep(0.01)
+
+        async def consume(delay):
+            await asyncio.sleep(delay)
+            return [e async for e in flight.stream("k", produce)]
+
+        async def run():
+            return await asyncio.gather(consume(0), consume(0.015))
+
+        first, late = asyncio.run(run())
+        self.assertEqual(first, [0, 1, 2])
+        self.assertEqual(late, [0, 1, 2])
+        self.assertEqual(started, 1)
+
+    def test_stream_is_cancelled_when_last_subscriber_leaves(self):
+        flight = SingleFlight()
+        produced = []
+
+        async def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+                await asyncio.sleep(0.001)
+
+        async def take(n):
+            out = []
+            stream = flight.stream("k", produce)
+            async for event in stream:
+                out.append(event)
+                if len(out) == n:
+                    break
+            await stream.aclose()
+            return out
+
+        async def run():
+            results = await asyncio.gather(take(2), take(5))
+            await asyncio.sleep(0.02)
+            return results
+
+        self.assertEqual(asyncio.run(run()), [[0, 1], [0, 1, 2, 3, 4]])
+        self.assertLess(len(produced), 10)
+        self.assertEqual(flight.in_flight(), 0)
+
+
+class SlowRouter(ModelRouter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    async def _call_model(self, provider, model, prompt):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return "answer"
+
+
+class TestRouterCoalescing(unittest.TestCase):
+    def test_duplicate_submissions_make_one_provider_call(self):
+        with mock.patch.dict(os.environ, {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o"}):
+            router = SlowRouter()
+
+        async def run():
+            return await asyncio.gather(
+                router.acall("code", "add a square shape"),
+                router.acall("code", "add a square shape"),
+                router.acall("code", "add a cone shape"),
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual([r["response"] for r in results], ["answer"] * 3)
+        self.assertEqual(router.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
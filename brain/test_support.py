@@ -0,0 +1,24 @@
+"""Helpers shared by the brain test modules (no tests of its own)."""
+import os
+import shutil
+import tempfile
+
+
+class TempDirMixin:
+    """
+    For unittest.TestCase classes that work on files:
+    - make_dir() creates a temporary directory removed after the test
+    - write() creates a file (and its parents) under `self.root`
+    """
+
+    def make_dir(self) -> str:
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        return path
+
+    def write(self, rel_path: str, content: str) -> str:
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
@@ -0,0 +1,114 @@
+import os
+import unittest
+from unittest import mock
+
+from brain import symbol_index
+from brain.symbol_index import SymbolIndex, js_symbols, html_symbols, python_symbols
+from brain.context_engine import ContextEngine
+from brain.test_support import TempDirMixin
+
+SHAPES_JS = """import * as THREE from 'three';
+// const fake = { in a comment }
+const shapes = {
+  sphere: (i, n) => {
+    return [Math.cos(i), 0, 0];
+  },
+  "cube": cubeLayout,
+  spiral(i) { return i; },
+};
+let count = 100
+function setTarget(p, x, y, z) {
+  p.target = [x, y, z];
+}
+class Particle extends Base {
+  constructor(x) { super(); this.label = "}"; }
+  static create() {
+    return new Particle(0);
+  }
+}
+"""
+
+
+def names(symbols):
+    return [(s["name"], s["kind"], s["line"], s["end"], s.get("parent")) for s in symbols]
+
+
+class TestExtraction(unittest.TestCase):
+    def test_js_symbols(self):
+        self.assertEqual(names(js_symbols(SHAPES_JS)), [
+            ("shapes", "object", 3, 9, None),
+            ("sphere", "key", 4, 6, "shapes"),
+            ("cube", "key", 7, 7, "shapes"),
+            ("spiral", "method", 8, 8, "shapes"),
+            ("count", "variable", 10, 10, None),
+            ("setTarget", "function", 11, 13, None),
+            ("Particle", "class", 14, 19, None),
+            ("constructor", "method", 15, 15, "Particle"),
+            ("create", "method", 16, 18, "Particle"),
+        ])
+
+    def test_html_script_lines_are_file_lines(self):
+        html = "<html>\n<body>\n<script type=\"module\">\nconst layouts = {\n  grid: 1 };\n</script>\n"
+        self.assertEqual(names(html_symbols(html)), [
+            ("layouts", "object", 4, 5, None),
+            ("grid", "key", 5, 5, "layouts"),
+        ])
+
+    def test_python_symbols(self):
+        source = "import os\nLIMIT = 1\n\n@cached\ndef load():\n    pass\n\nclass Engine:\n    def run(self):\n        return 1\n"
+        self.assertEqual(names(python_symbols(source)), [
+            ("LIMIT", "variable", 2, 2, None),
+            ("load", "function", 4, 6, None),
+            ("Engine", "class", 8, 10, None),
+            ("run", "method", 9, 10, "Engine"),
+        ])
+        self.assertEqual(python_symbols("def broken(:\n"), [])
+
+
+class TestSymbolIndex(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        self.root = self.make_dir()
+        self.state = self.make_dir()
+        self.write("shapes.js", SHAPES_JS)
+        self.write("app.py", "def handle(msg):\n    return msg\n")
+
+    def test_persisted_and_incremental(self):
+        path = os.path.join(self.state, "symbols.json")
+        index = SymbolIndex(self.root, path=path)
+        self.assertEqual(index.refresh({"shapes.js": "h1", "app.py": "h2", "notes.txt": "h3"}), 2)
+        index.save()
+
+        reloaded = SymbolIndex(self.root, path=path)
+        self.assertTrue(reloaded.load())
+        with mock.patch.object(symbol_index, "extract_symbols", side_effect=AssertionError("reparsed")):
+            self.assertEqual(reloaded.refresh({"shapes.js": "h1", "app.py": "h2"}), 0)
+        self.assertEqual(reloaded.find("shapes.cube")[0][0], "shapes.js")
+
+        self.write("app.py", "def handle(msg):\n    return msg\n\ndef route():\n    pass\n")
+        self.assertEqual(reloaded.update({"added": [], "modified": ["app.py"], "removed": []}, {"app.py": "h4"}), 1)
+        self.assertEqual(reloaded.find("route")[0][1]["line"], 4)
+
+        self.assertEqual(reloaded.refresh({"app.py": "h4"}), 1)
+        self.assertEqual(reloaded.find("shapes"), [])
+
+    def test_mentioned_prefers_containers(self):
+        index = SymbolIndex(self.root, path=os.path.join(self.state, "symbols.json"))
+        index.refresh({"shapes.js": "h1"})
+        hits = index.mentioned("add a cone next to the sphere in shapes")
+        self.assertEqual([s["name"] for _, s in hits], ["shapes"])
+
+    def test_context_engine_reads_only_the_definition(self):
+        with mock.patch.dict(os.environ, {"JARVIS_CACHE_DIR": self.state}):
+            engine = ContextEngine()
+            engine.set_project(self.root)
+        self.assertEqual(engine.find_symbol("setTarget")[0][0], "shapes.js")
+        self.assertEqual(
+            engine.read_symbol("setTarget"),
+            "function setTarget(p, x, y, z) {\n  p.target = [x, y, z];\n}\n",
+        )
+        self.assertIsNone(engine.read_symbol("missing"))
+        self.assertTrue(os.path.exists(engine.symbols.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import unittest
+from unittest import mock
+
+from brain.model_router import ModelRouter, OMITTED_TOOL_OUTPUT
+from brain.token_budget import Part, count_tokens, message_tokens, pack, share, truncate
+
+CODE = "function setTarget(i, x, y, z) {\n    particles[i].target.set(x, y, z);\n}\n"
+
+
+class TestTokenBudget(unittest.TestCase):
+    def test_count_tokens_is_roughly_bpe_sized(self):
+        self.assertEqual(count_tokens(""), 0)
+        text = CODE * 100
+        # Code runs ~2-4 chars per token; the estimate errs high
+        self.assertTrue(len(text) / 5 < count_tokens(text) < len(text) / 1.5)
+        self.assertLess(count_tokens(CODE), count_tokens(CODE * 2))
+
+    def test_truncate_fits_budget(self):
+        text = CODE * 200
+        cut = truncate(text, 300)
+        self.assertLessEqual(count_tokens(cut), 300)
+        self.assertTrue(cut.endswith("[TRUNCATED]"))
+        self.assertGreater(count_tokens(cut), 200)
+        self.assertEqual(truncate(CODE, 300), CODE)
+
+    def test_share_is_fair(self):
+        self.assertEqual(share([10, 500, 500], 410), [10, 200, 200])
+        self.assertEqual(share([10, 20], 100), [10, 20])
+        self.assertEqual(share([50, 50], 0), [0, 0])
+
+    def test_pack_fills_by_priority(self):
+        parts = [
+            Part("code", CODE * 100, priority=1),
+            Part("message", "add a cube", priority=3, min_tokens=0),
+            Part("summary", CODE * 10, priority=2),
+        ]
+        budget = count_tokens("add a cube") + count_tokens(CODE * 10) + 100
+        packed = pack(parts, budget)
+        self.assertEqual(packed["message"], "add a cube")
+        self.assertEqual(packed["summary"], CODE * 10)
+        self.assertTrue(packed["code"].endswith("[TRUNCATED]"))
+        self.assertLessEqual(sum(count_tokens(t) for t in packed.values()), budget)
+
+        packed = pack(parts, count_tokens("add a cube") + 10)
+        self.assertEqual((packed["summary"], packed["code"]), ("", ""))
+
+
+class TestPromptBudget(unittest.TestCase):
+    def setUp(self):
+        env = {"GROQ_KEY_1": "g", "OPENROUTER_KEY_1": "o", "JARVIS_CONTEXT_WINDOW": "8000"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+        self.router = ModelRouter()
+        self.router.response_reserve = 1000
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_prompt_budget_leaves_room_for_prefix_and_answer(self):
+        budget = self.router.prompt_budget("code", "SYSTEM")
+        messages = self.router._prepare_messages("code", "x", "SYSTEM")
+        self.assertEqual(budget, 8000 - 1000 - message_tokens(messages[:1]) - 4)
+        # Oversized prompts are cut to the budget instead of overflowing
+        messages = self.router._prepare_messages("code", CODE * 2000, "SYSTEM")
+        self.assertLessEqual(message_tokens(messages), 7000)
+
+    def test_tool_output_is_fitted(self):
+        self.router.mcp = mock.Mock()
+        self.router.mcp.read_request.side_effect = lambda call: {"small.js": CODE, "big.js": CODE * 3000}[call["path"]]
+        messages = [{"role": "system", "content": "S"}, {"role": "user", "content": "R"}]
+        calls = [{"tool": "read_file", "path": "small.js"}, {"tool": "read_file", "path": "big.js"}]
+
+        followup = asyncio.run(self.router._tool_followup(messages, "{}", calls, budget=3000))
+        self.assertLessEqual(message_tokens(followup), 3000)
+        self.assertIn(CODE, followup[-1]["content"])
+        self.assertIn("[TRUNCATED] Request a smaller line range", followup[-1]["content"])
+
+    def test_older_tool_output_is_dropped_first(self):
+        self.router.mcp = mock.Mock()
+        self.router.mcp.read_request.return_value = CODE * 20
+        messages = [
+            {"role": "system", "content": "S"},
+            {"role": "user", "content": "R"},
+            {"role": "assistant", "content": "{}"},
+            {"role": "user", "content": CODE * 400},
+        ]
+        budget = message_tokens(messages) + 100
+        followup = asyncio.run(self.router._tool_followup(messages, "{}", [{"tool": "read_file", "path": "a"}], budget))
+        self.assertEqual(followup[3]["content"], OMITTED_TOOL_OUTPUT)
+        self.assertEqual(followup[1]["content"], "R")
+        self.assertIn(CODE * 20, followup[-1]["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import random
+import unittest
+
+from brain import bench_tool_calls
+from brain.bench_tool_calls import make_output, chunked
+from brain.tool_calls import (
+    ToolCallScanner, NativeCallAccumulator, scan_tool_calls, from_native, as_text,
+)
+
+
+def feed_all(chunks, **kwargs):
+    scanner = ToolCallScanner(**kwargs)
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return scanner.calls
+
+
+class TestToolCallScanner(unittest.TestCase):
+    def test_finds_every_call_after_code(self):
+        text = (
+            'Sure.\n```js\nconst a = {b: "}"};\n```\n'
+            '{"tool": "read_file", "path": "a.js"}\n'
+            'then {"files": [{"path": "b.py", "symbol": "x"}], "tool": "read_files"} and code: { }'
+        )
+        self.assertEqual(scan_tool_calls(text), [
+            {"tool": "read_file", "path": "a.js"},
+            {"files": [{"path": "b.py", "symbol": "x"}], "tool": "read_files"},
+        ])
+
+    def test_strings_with_braces_and_escapes(self):
+        call = {"tool": "read_file", "path": 'we"ird} {name\\.js'}
+        text = "x " + json.dumps(call) + " y"
+        self.assertEqual(scan_tool_calls(text), [call])
+        # Split right after the backslash
+        cut = text.index("\\\\") + 1
+        self.assertEqual(feed_all([text[:cut], text[cut:]]), [call])
+
+    def test_recovers_from_stray_braces_and_quotes(self):
+        text = (
+            'An unbalanced { brace, a "quote that never ends\n'
+            'another { and then {"tool": "read_file", "path": "a.js"} done'
+        )
+        self.assertEqual(scan_tool_calls(text), [{"tool": "read_file", "path": "a.js"}])
+
+    def test_long_open_object_is_dropped(self):
+        text = "{ " + "x" * 5000 + ' {"tool": "read_file", "path": "a.js"}'
+        scanner = ToolCallScanner(max_object_chars=1000)
+        for chunk in chunked(text, random.Random(0)):
+            scanner.feed(chunk)
+        self.assertEqual(scanner.calls, [{"tool": "read_file", "path": "a.js"}])
+        self.assertLessEqual(len(scanner._text), 1000 + 64)
+
+    def test_fuzz_chunked_matches_embedded_calls(self):
+        rng = random.Random(42)
+        for seed in range(40):
+            calls = [
+                rng.choice([
+                    {"tool": "read_file", "path": f"f{seed}_{i}.js", "start_line": i},
+                    {"tool": "read_files", "files": [f"a{i}.py", {"path": "b {c}.js", "symbol": 'q"'}]},
+                    {"path": "x.js", "tool": "read_file"},
+                ])
+                for i in range(rng.randint(0, 4))
+            ]
+            text = make_output(rng.randint(0, 4000), calls, seed=seed)
+            expected = scan_tool_calls(text)
+            self.assertEqual(sorted(map(json.dumps, expected)), sorted(map(json.dumps, calls)))
+            for max_len in (1, 7, 200):
+                self.assertEqual(feed_all(chunked(text, rng, max_len)), expected)
+
+    def test_benchmark_runs(self):
+        results = bench_tool_calls.run(size=32 * 1024, repeat=1)
+        # The greedy regex spans from the first "{" and misses the call
+        self.assertFalse(results["call"]["legacy_found"])
+        # ...and backtracks quadratically when there is no call at all
+        self.assertLess(results["mention"]["scanner_s"], results["mention"]["legacy_s"])
+
+
+class TestNativeToolCalls(unittest.TestCase):
+    def test_from_native(self):
+        calls = from_native([
+            {"id": "1", "type": "function", "function": {"name": "read_file", "arguments": '{"path": "a.js"}'}},
+            {"function": {"name": "read_file", "arguments": "{broken"}},
+            {"function": {"name": "read_files", "arguments": {"files": ["b.js"]}}},
+        ])
+        self.assertEqual(calls, [
+            {"tool": "read_file", "path": "a.js"},
+            {"tool": "read_files", "files": ["b.js"]},
+        ])
+        # The text form goes through the same scanner
+        self.assertEqual(scan_tool_calls("answer" + as_text(calls)), calls)
+
+    def test_accumulates_stream_deltas(self):
+        acc = NativeCallAccumulator()
+        acc.add([{"index": 0, "id": "c", "function": {"name": "read_file", "arguments": ""}}])
+        acc.add([{"index": 1, "function": {"name": "read_file", "arguments": '{"pa'}}])
+        acc.add([{"index": 0, "function": {"arguments": '{"path": "a.js"}'}}])
+        acc.add([{"index": 1, "function": {"arguments": 'th": "b.js"}'}}])
+        self.assertEqual(acc.calls(), [
+            {"tool": "read_file", "path": "a.js"},
+            {"tool": "read_file", "path": "b.js"},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import re
+import logging
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken  # optional: exact counts for OpenAI-style BPE vocabularies
+except ImportError:
+    tiktoken = None
+
+# Context window (tokens) per model; unknown models get DEFAULT_CONTEXT_WINDOW
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "llama-3.3-70b-versatile": 131072,
+    "deepseek-reasoner": 65536,
+    "meta-llama/llama-3.1-70b-instruct": 131072,
+    "qwen/qwen2.5-32b-instruct": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens every chat message costs besides its content (role, separators)
+MESSAGE_OVERHEAD = 4
+
+TRUNCATED_MARKER = "\n...[TRUNCATED]"
+
+# Letter runs, digit runs, punctuation runs, whitespace runs
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]+|\s+")
+_encoding = None
+
+
+def _tiktoken_encoding():
+    global _encoding, tiktoken
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+            tiktoken = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text`: exact with tiktoken installed, otherwise a BPE-like
+    estimate (letters cost one token per 4 chars, punctuation one per 2,
+    digits one per 3) that errs on the high side for code.
+    """
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        first = piece[0]
+        if first.isspace():
+            # Indentation mostly merges into the next token
+            tokens += 1 if "\n" in piece or len(piece) > 4 else 0
+        elif first.isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif first.isdigit():
+            tokens += 1
+        else:
+            tokens += (len(piece) + 1) // 2
+    return tokens
+
+
+def message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def context_window(model: str) -> int:
+    """Model's context window, capped by JARVIS_CONTEXT_WINDOW when set."""
+    window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    cap = os.environ.get("JARVIS_CONTEXT_WINDOW")
+    return min(window, int(cap)) if cap else window
+
+
+def truncate(text: str, max_tokens: int, marker: str = TRUNCATED_MARKER) -> str:
+    """`text` cut (at a line break when one is near) to fit `max_tokens`, marker included."""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    room = max_tokens - count_tokens(marker)
+    if room <= 0:
+        return ""
+
+    # Proportional first guess, then shrink until it fits
+    cut = len(text) * room // total
+    while cut > 0 and count_tokens(text[:cut]) > room:
+        cut = cut * 9 // 10
+    newline = text.rfind("\n", 0, cut)
+    if newline > cut * 4 // 5:
+        cut = newline
+    return text[:cut] + marker
+
+
+def share(sizes: List[int], budget: int) -> List[int]:
+    """
+    Splits `budget` tokens over parts of `sizes` tokens: parts smaller than an
+    equal share keep all they need, the rest split what remains evenly.
+    """
+    shares = [0] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    remaining = max(budget, 0)
+    for n, i in enumerate(order):
+        fair = remaining // (len(sizes) - n)
+        shares[i] = min(sizes[i], fair)
+        remaining -= shares[i]
+    return shares
+
+
+class Part:
+    """One prompt section for `pack`; higher `priority` is filled first."""
+
+    def __init__(self, name: str, text: str, priority: int = 0, min_tokens: int = 64):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        # A part that would be cut below this is dropped instead
+        self.min_tokens = min_tokens
+
+
+def pack(parts: List[Part], budget: int) -> Dict[str, str]:
+    """
+    Fits `parts` into `budget` tokens by priority: each part gets what it
+    needs while the budget lasts, the first one that does not fit is
+    truncated, parts left with too little room come back empty.
+    """
+    packed: Dict[str, str] = {}
+    remaining = budget
+    for part in sorted(parts, key=lambda p: -p.priority):
+        size = count_tokens(part.text)
+        if size <= remaining:
+            packed[part.name] = part.text
+            remaining -= size
+        elif remaining >= part.min_tokens:
+            packed[part.name] = truncate(part.text, remaining)
+            used = count_tokens(packed[part.name])
+            remaining -= used
+            logger.info(f"Prompt packing: {part.name} cut from {size} to {used} tokens")
+        else:
+            packed[part.name] = ""
+            if size:
+                logger.info(f"Prompt packing: {part.name} ({size} tokens) dropped, {remaining} left")
+    return packed
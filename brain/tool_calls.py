@@ -0,0 +1,229 @@
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tool-call objects are small; a brace left open longer than this is prose
+MAX_OBJECT_CHARS = 64 * 1024
+
+_OBJECT_TOKEN = re.compile(r'[{}"]')
+_STRING_TOKEN = re.compile(r'["\\\n]')
+
+
+class ToolCallScanner:
+    """
+    Finds JSON tool-call objects ({"tool": ..., ...}) in model output in one
+    linear pass. Text can be fed in stream chunks of any size.
+    - outside objects only "{" is looked for; inside, only braces and
+      string delimiters, jumping between them with a regex (no per-char loop)
+    - an object is decoded only when it closes and one of its own strings
+      was "tool", so each candidate is parsed once
+    - prose never poisons the scan: a raw newline inside a "string" or an
+      object open for more than `max_object_chars` drops the stray braces,
+      and a tool call nested in an unbalanced "{" is still found
+    """
+
+    def __init__(self, max_object_chars: int = MAX_OBJECT_CHARS):
+        self.max_object_chars = max_object_chars
+        self.calls: List[Dict[str, Any]] = []
+        self._text = ""        # from the outermost open "{" onwards
+        self._offset = 0       # absolute position of _text[0]
+        self._pos = 0          # next position of _text to scan
+        self._frames: List[list] = []  # [absolute start, saw "tool"] per open object
+        self._string: Optional[int] = None  # absolute start of the open string
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Scans `chunk`; returns the tool calls completed by it."""
+        found: List[Dict[str, Any]] = []
+        if not self._frames:
+            start = chunk.find("{")
+            if start < 0:
+                self._offset += len(chunk)
+                return found
+            self._offset += start
+            chunk = chunk[start:]
+            self._pos = 0
+        self._text += chunk
+        self._scan(found)
+        self._trim()
+        self.calls.extend(found)
+        return found
+
+    def _scan(self, found: List[Dict[str, Any]]):
+        text = self._text
+        pos = self._pos
+        while True:
+            if not self._frames:
+                start = text.find("{", pos)
+                if start < 0:
+                    pos = len(text)
+                    break
+                self._frames.append([self._offset + start, False])
+                pos = start + 1
+                continue
+
+            if self._string is not None:
+                m = _STRING_TOKEN.search(text, pos)
+                if m is None:
+                    pos = len(text)
+                    break
+                ch = m.group()
+                if ch == "\\":
+                    if m.end() >= len(text):
+                        pos = m.start()  # escaped char not here yet
+                        break
+                    pos = m.end() + 1
+                elif ch == "\n":
+                    # JSON strings cannot span lines: this was prose
+                    self._frames.clear()
+                    self._string = None
+                    pos = m.end()
+                else:
+                    start = self._string - self._offset
+                    if text[start + 1:m.start()] == "tool":
+                        self._frames[-1][1] = True
+                    self._string = None
+                    pos = m.end()
+                continue
+
+            m = _OBJECT_TOKEN.search(text, pos)
+            if m is None:
+                pos = len(text)
+                break
+            ch = m.group()
+            pos = m.end()
+            if ch == '"':
+                self._string = self._offset + m.start()
+            elif ch == "{":
+                self._frames.append([self._offset + m.start(), False])
+            else:
+                start, has_tool = self._frames.pop()
+                if has_tool:
+                    call = _decode(text[start - self._offset:pos])
+                    if call is not None:
+                        found.append(call)
+
+        self._pos = pos
+
+    def _trim(self):
+        """Forgets text no open object needs; drops objects open too long."""
+        end = self._offset + len(self._text)
+        while self._frames and end - self._frames[0][0] > self.max_object_chars:
+            self._frames.pop(0)
+        if self._string is not None and not self._frames:
+            self._string = None
+        keep = self._frames[0][0] if self._frames else self._offset + self._pos
+        if keep > self._offset:
+            cut = keep - self._offset
+            self._text = self._text[cut:]
+            self._pos -= cut
+            self._offset = keep
+
+
+def _decode(span: str) -> Optional[Dict[str, Any]]:
+    try:
+        obj = json.loads(span)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) and isinstance(obj.get("tool"), str) else None
+
+
+def scan_tool_calls(text: str) -> List[Dict[str, Any]]:
+    scanner = ToolCallScanner()
+    scanner.feed(text)
+    return scanner.calls
+
+
+# ---------------- native function calling ---------------- #
+
+# OpenAI-compatible `tools` definitions for the read_file protocol
+TOOL_SCHEMAS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read a project file, or only a line range, byte range or symbol of it.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Path relative to the project root"},
+                    "start_line": {"type": "integer"},
+                    "end_line": {"type": "integer"},
+                    "start_byte": {"type": "integer"},
+                    "end_byte": {"type": "integer"},
+                    "symbol": {"type": "string", "description": "Function, class or object name"},
+                },
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_files",
+            "description": "Read several project files at once.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "files": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "path": {"type": "string"},
+                                "start_line": {"type": "integer"},
+                                "end_line": {"type": "integer"},
+                                "symbol": {"type": "string"},
+                            },
+                        },
+                    },
+                },
+                "required": ["files"],
+            },
+        },
+    },
+]
+
+
+def from_native(tool_calls: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Provider `message.tool_calls` ([{"function": {"name", "arguments"}}])
+    as {"tool": name, **arguments} objects; malformed entries are skipped.
+    """
+    calls = []
+    for entry in tool_calls or []:
+        function = entry.get("function") or {}
+        name = function.get("name")
+        arguments = function.get("arguments") or {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments or "{}")
+            except ValueError:
+                logger.warning(f"Ignoring tool call {name} with malformed arguments")
+                continue
+        if name and isinstance(arguments, dict):
+            calls.append({"tool": name, **arguments})
+    return calls
+
+
+def as_text(calls: List[Dict[str, Any]]) -> str:
+    """Native calls in the text protocol, so one extraction path serves both."""
+    return "".join(f"\n{json.dumps(call)}" for call in calls)
+
+
+class NativeCallAccumulator:
+    """Merges streamed `delta.tool_calls` fragments (keyed by index)."""
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, str]] = {}
+
+    def add(self, deltas: Optional[List[Dict[str, Any]]]):
+        for delta in deltas or []:
+            call = self._calls.setdefault(delta.get("index", 0), {"name": "", "arguments": ""})
+            function = delta.get("function") or {}
+            call["name"] += function.get("name") or ""
+            call["arguments"] += function.get("arguments") or ""
+
+    def calls(self) -> List[Dict[str, Any]]:
+        return from_native([{"function": self._calls[i]} for i in sorted(self._calls)])
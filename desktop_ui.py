@@ -1,6 +1,10 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
-from brain.main import handle_request
+from brain.main import handle_request_stream_sync
+
+STREAM_POLL_MS = 30
 
 
 class JarvisDesktopUI:
@@ -12,6 +16,10 @@ class JarvisDesktopUI:
 
         self.code_blocks = []  # store code blocks for copy
 
+        # Streaming state: worker thread -> queue -> Tk main loop
+        self.stream_events = queue.Queue()
+        self.streaming = False
+
         # Chat display
         self.chat_area = scrolledtext.ScrolledText(
             root,
@@ -81,7 +89,11 @@ class JarvisDesktopUI:
     def add_jarvis_response(self, text):
         self.chat_area.configure(state="normal")
         self.chat_area.insert(tk.END, "JARVIS:\n", "role_jarvis")
+        self._insert_response_body(text)
+        self.chat_area.configure(state="disabled")
+        self.chat_area.yview(tk.END)
 
+    def _insert_response_body(self, text):
         parts = text.split("```")
         for i, part in enumerate(parts):
             if not part.strip():
@@ -103,9 +115,6 @@ class JarvisDesktopUI:
                 self.code_blocks.append(code_text)
                 self._insert_copy_button(len(self.code_blocks) - 1, start_index)
 
-        self.chat_area.configure(state="disabled")
-        self.chat_area.yview(tk.END)
-
     def _add_simple_message(self, role, text, role_tag):
         self.chat_area.configure(state="normal")
         self.chat_area.insert(tk.END, f"{role}:\n", role_tag)
@@ -133,9 +142,69 @@ class JarvisDesktopUI:
 
         self.chat_area.window_create(position, window=btn)
 
+    # ---------------- STREAMING ---------------- #
+
+    def _begin_stream(self):
+        self.chat_area.configure(state="normal")
+        self.chat_area.insert(tk.END, "JARVIS:\n", "role_jarvis")
+        self.chat_area.mark_set("stream_start", "end-1c")
+        self.chat_area.mark_gravity("stream_start", tk.LEFT)
+        self.chat_area.configure(state="disabled")
+
+    def _append_stream(self, text):
+        self.chat_area.configure(state="normal")
+        self.chat_area.insert(tk.END, text, "text")
+        self.chat_area.configure(state="disabled")
+        self.chat_area.yview(tk.END)
+
+    def _reset_stream(self, text):
+        self.chat_area.configure(state="normal")
+        self.chat_area.delete("stream_start", tk.END)
+        self.chat_area.configure(state="disabled")
+        self._append_stream(text)
+
+    def _finish_stream(self, text):
+        # Replace the raw streamed text with the formatted response
+        self.chat_area.configure(state="normal")
+        self.chat_area.delete("stream_start", tk.END)
+        self._insert_response_body(text)
+        self.chat_area.configure(state="disabled")
+        self.chat_area.yview(tk.END)
+        self.streaming = False
+
+    def _stream_worker(self, message):
+        try:
+            for event in handle_request_stream_sync(message):
+                self.stream_events.put(event)
+        except Exception as e:
+            self.stream_events.put({"type": "error", "error": str(e)})
+
+    def _drain_stream(self):
+        while True:
+            try:
+                event = self.stream_events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event["type"] == "token":
+                self._append_stream(event["text"])
+            elif event["type"] == "tool":
+                self._reset_stream(f"Reading {event['path']}…\n")
+            elif event["type"] == "done":
+                self._finish_stream(event.get("response", ""))
+                return
+            elif event["type"] == "error":
+                self._finish_stream(f"Error: {event['error']}")
+                return
+
+        self.root.after(STREAM_POLL_MS, self._drain_stream)
+
     # ---------------- SEND ---------------- #
 
     def send_message(self, event=None):
+        if self.streaming:
+            return
+
         message = self.input_box.get().strip()
         if not message:
             return
@@ -143,10 +212,10 @@ class JarvisDesktopUI:
         self.input_box.delete(0, tk.END)
         self.add_user_message(message)
 
-        result = handle_request(message)
-        response_text = result.get("response", "")
-
-        self.add_jarvis_response(response_text)
+        self.streaming = True
+        self._begin_stream()
+        threading.Thread(target=self._stream_worker, args=(message,), daemon=True).start()
+        self.root.after(STREAM_POLL_MS, self._drain_stream)
 
 
 if __name__ == "__main__":
@@ -14,6 +14,52 @@ function addMessage(role, text) {
     chat.scrollTop = chat.scrollHeight;
 }
 
+// Reads the /chat/stream SSE body and renders tokens as they arrive
+async function streamChat(message, bubble) {
+    const res = await fetch("/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message })
+    });
+
+    if (!res.ok || !res.body) {
+        throw new Error(res.status === 503 ? "Server busy, please retry shortly." : "HTTP " + res.status);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            if (!raw.startsWith("data:")) continue;
+
+            const event = JSON.parse(raw.slice(5));
+            if (event.type === "token") {
+                text += event.text;
+                bubble.textContent = text;
+            } else if (event.type === "tool") {
+                // Model asked for a file; its answer restarts
+                text = "";
+                bubble.textContent = "Reading " + event.path + "…";
+            } else if (event.type === "done") {
+                bubble.textContent = event.response;
+            } else if (event.type === "error") {
+                throw new Error(event.error);
+            }
+            chat.scrollTop = chat.scrollHeight;
+        }
+    }
+}
+
 send.onclick = async () => {
     const message = input.value.trim();
     if (!message) return;
@@ -22,22 +68,13 @@ send.onclick = async () => {
     input.value = "";
 
     addMessage("assistant", "Thinking…");
+    const bubble = chat.lastChild;
 
     try {
-        const res = await fetch("/chat", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ message })
-        });
-
-        const data = await res.json();
-        // Support both 'reply' (ui v1 spec) and 'response' (legacy) if needed
-        // But V1 spec says backend returns {reply: result}
-        // We will align backend to this.
-        chat.lastChild.textContent = data.reply || data.response;
+        await streamChat(message, bubble);
     } catch (e) {
-        chat.lastChild.textContent = "Error: " + e;
-        chat.lastChild.classList.add("text-red-400");
+        bubble.textContent = "Error: " + e.message;
+        bubble.classList.add("text-red-400");
     }
 };
 